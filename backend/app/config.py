@@ -15,9 +15,94 @@ class Settings:
     UPLOAD_DIR = Path("uploads")
     OUTPUT_DIR = Path("outputs")
     PROMPTS_DIR = Path("prompts")
+    CACHE_DIR = Path("cache")
     
     # API Keys
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+    # Concurrent LLM calls per process (further requests wait without blocking the event loop)
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    # Gemini quota (0 = unlimited); bursts wait for budget instead of failing with 429
+    LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+    LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+    # SQLite file holding the quota buckets shared by all processes on this host (empty = per-process quota)
+    LLM_QUOTA_PATH = os.getenv("LLM_QUOTA_PATH", str(CACHE_DIR / "llm_quota.db"))
+    # 429 retries with jittered exponential backoff (server retry delays above LLM_RETRY_MAX_DELAY are not waited out)
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+    LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "60"))
+    # Per-call token budget: decks whose estimated prompt or script exceeds it are scripted in concurrent windows
+    LLM_MAX_INPUT_TOKENS = int(os.getenv("LLM_MAX_INPUT_TOKENS", "100000"))
+    LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "8192"))
+    # Upper bound on slides per generation call (0 = only the token budget decides)
+    GENERATION_WINDOW_SIZE = int(os.getenv("GENERATION_WINDOW_SIZE", "30"))
+    GENERATION_WINDOW_CONCURRENCY = int(os.getenv("GENERATION_WINDOW_CONCURRENCY", "4"))
+    # Batch generation: variants generated at the same time per job, and the most variants one job may hold
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "3"))
+    BATCH_MAX_VARIANTS = int(os.getenv("BATCH_MAX_VARIANTS", "20"))
+    # Incremental regeneration falls back to a full generation above this share of changed slides
+    INCREMENTAL_MAX_CHANGED_RATIO = float(os.getenv("INCREMENTAL_MAX_CHANGED_RATIO", "0.5"))
+    # Local mock LLM (request provider="mock") for load tests and offline benchmarks; works without GEMINI_API_KEY
+    MOCK_LLM_ENABLED = os.getenv("MOCK_LLM_ENABLED", "false").lower() == "true"
+    MOCK_LLM_LATENCY = float(os.getenv("MOCK_LLM_LATENCY", "0.5"))
+    MOCK_LLM_TOKENS_PER_SECOND = float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", "50"))
+    MOCK_LLM_CHUNK_TOKENS = int(os.getenv("MOCK_LLM_CHUNK_TOKENS", "8"))
+    # Share of mock calls answered with a 429, and the retry delay they carry (empty = none)
+    MOCK_LLM_ERROR_RATE = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+    MOCK_LLM_RETRY_AFTER = float(os.getenv("MOCK_LLM_RETRY_AFTER")) if os.getenv("MOCK_LLM_RETRY_AFTER") else None
+    MOCK_LLM_SEED = int(os.getenv("MOCK_LLM_SEED", "0"))
+    # Persistent LLM response cache keyed by model + prompt hash (LRU beyond LLM_CACHE_MAX_MB; 0 disables the cache)
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(CACHE_DIR / "llm_cache.db"))
+    LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+    # Translation memory: translated script sections keyed by source hash + language (0 disables it)
+    TRANSLATION_MEMORY_PATH = os.getenv("TRANSLATION_MEMORY_PATH", str(CACHE_DIR / "translation_memory.db"))
+    TRANSLATION_MEMORY_MAX_MB = int(os.getenv("TRANSLATION_MEMORY_MAX_MB", "128"))
+    # Script sections translated at the same time per request
+    TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+    
+    # State backend: "memory" (default, process-local) or "sqlite" (persistent, shared by all workers on the host)
+    STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+    STATE_DB_PATH = os.getenv("STATE_DB_PATH", str(CACHE_DIR / "state.db"))
+    
+    # Memory backend limits (0 disables a limit)
+    STATE_MAX_FILES = int(os.getenv("STATE_MAX_FILES", "200"))
+    STATE_MAX_JOBS = int(os.getenv("STATE_MAX_JOBS", "500"))
+    STATE_TTL_HOURS = float(os.getenv("STATE_TTL_HOURS", "24"))
+    GENERATION_CACHE_MAX_MB = int(os.getenv("GENERATION_CACHE_MAX_MB", "64"))
+    
+    # Disk retention (sweeper runs in a background thread; 0 disables a limit)
+    RETENTION_SWEEP_INTERVAL_MIN = float(os.getenv("RETENTION_SWEEP_INTERVAL_MIN", "15"))
+    UPLOAD_RETENTION_HOURS = float(os.getenv("UPLOAD_RETENTION_HOURS", "72"))
+    OUTPUT_RETENTION_HOURS = float(os.getenv("OUTPUT_RETENTION_HOURS", "24"))
+    UPLOAD_SESSION_RETENTION_HOURS = float(os.getenv("UPLOAD_SESSION_RETENTION_HOURS", "24"))
+    DISK_QUOTA_MB = int(os.getenv("DISK_QUOTA_MB", "10240"))
+    RETENTION_GRACE_MIN = float(os.getenv("RETENTION_GRACE_MIN", "10"))
+    
+    # Background jobs: "inline" (default, FastAPI BackgroundTasks inside the API process) or
+    # "queue" (durable SQLite queue consumed by worker processes, needs STATE_BACKEND=sqlite)
+    JOB_BACKEND = os.getenv("JOB_BACKEND", "inline")
+    JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", str(CACHE_DIR / "jobs.db"))
+    # Worker processes started with the API in queue mode (0 = run `python -m app.worker` separately)
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+    JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "5"))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+    
+    # Upload limits (chunked uploads use UPLOAD_CHUNK_SIZE_MB per request)
+    MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "500"))
+    UPLOAD_CHUNK_SIZE_MB = int(os.getenv("UPLOAD_CHUNK_SIZE_MB", "8"))
+    
+    # PPT parsing engine: "xml" (zip/lxml fast path) or "pptx" (python-pptx object model)
+    PARSER_ENGINE = os.getenv("PARSER_ENGINE", "xml")
+    # Decks with at least this many slides are parsed across a process pool (0 disables)
+    PARSER_PARALLEL_MIN_SLIDES = int(os.getenv("PARSER_PARALLEL_MIN_SLIDES", "200"))
+    # Process pool size for parallel parsing (0 = number of CPU cores)
+    PARSER_MAX_WORKERS = int(os.getenv("PARSER_MAX_WORKERS", "0"))
+    
+    # Legacy .ppt conversion (headless LibreOffice)
+    LIBREOFFICE_PATH = os.getenv("LIBREOFFICE_PATH", "")
+    LEGACY_CONVERTER_WORKERS = int(os.getenv("LEGACY_CONVERTER_WORKERS", "2"))
+    LEGACY_CONVERT_TIMEOUT = float(os.getenv("LEGACY_CONVERT_TIMEOUT", "120"))
     
     # CORS
     CORS_ORIGINS = ["*"]
@@ -30,6 +115,7 @@ class Settings:
         self.UPLOAD_DIR.mkdir(exist_ok=True)
         self.OUTPUT_DIR.mkdir(exist_ok=True)
         self.PROMPTS_DIR.mkdir(exist_ok=True, parents=True)
+        self.CACHE_DIR.mkdir(exist_ok=True)
 
 # Global settings instance
 settings = Settings()
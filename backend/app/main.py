@@ -1,15 +1,24 @@
 from pathlib import Path
+import asyncio
+import json
 import os
-import shutil
+import time
 import uuid
+import zipfile
 from typing import Dict, List, Optional
 
-from fastapi import FastAPI, File, HTTPException, UploadFile, BackgroundTasks
+import aiohttp
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.models import (
+    BatchGenerateRequest,
+    BatchGenerateStatusResponse,
     ErrorResponse,
     GenerateScriptRequest,
     GenerateScriptResponse,
@@ -19,14 +28,27 @@ from app.models import (
     TTSGenerateRequest,
     TTSGenerateResponse,
     ParseStatusResponse,
+    UploadInitRequest,
+    UploadSessionResponse,
     NarratedPPTStatusResponse,
+    to_api_slides,
 )
 # Updated imports for modular structure
 from app.config import settings
 from app.utils.state_manager import state
+from app.utils.content_store import CHUNK_SIZE, BlobWriter, ContentStore, ParseCache, UploadTooLarge
+from app.utils.upload_sessions import UploadError, UploadSessionManager
+from app.utils.retention import RetentionRule, RetentionSweeper
+from app.utils.job_queue import JobQueue
+from app.utils.llm_cache import LLMCache
+from app.utils.single_flight import SingleFlight
+from app.utils.translation_memory import TranslationMemory
 from app.services.ppt_parser import PPTParser
-from app.services.script import ScriptGenerator
+from app.services.ppt_converter import ConversionError, LegacyPPTConverter
+from app.services.script import MockProvider, PromptPlanner, QuotaScheduler, ScriptGenerator
+from app.services.script.llm_provider import shutdown_executor as shutdown_llm_executor
 from app.services.tts import TTSService
+from app.worker import start_workers, stop_workers
 
 app = FastAPI(
     title="PPT Presentation Script API",
@@ -34,6 +56,23 @@ app = FastAPI(
     version="1.0.0",
 )
 
+MAX_UPLOAD_BYTES = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+# Allowance for multipart boundaries and headers around the file part
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject oversized uploads from Content-Length before the body is read."""
+    if request.method == "POST" and request.url.path == "/api/upload":
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": str(UploadTooLarge(MAX_UPLOAD_BYTES))},
+            )
+    return await call_next(request)
+
 # Standard permissive CORS for development
 app.add_middleware(
     CORSMiddleware,
@@ -54,35 +93,168 @@ async def global_exception_handler(request, exc):
     )
 
 # Services (initialized with config)
-ppt_parser = PPTParser()
+ppt_parser = PPTParser(
+    engine=settings.PARSER_ENGINE,
+    parallel_min_slides=settings.PARSER_PARALLEL_MIN_SLIDES,
+    max_workers=settings.PARSER_MAX_WORKERS,
+)
 script_generator: Optional[ScriptGenerator] = None
+prompt_planner = PromptPlanner(
+    max_input_tokens=settings.LLM_MAX_INPUT_TOKENS,
+    max_output_tokens=settings.LLM_MAX_OUTPUT_TOKENS,
+    max_window=settings.GENERATION_WINDOW_SIZE,
+)
+# Pacing, adaptive concurrency and 429 retries in front of every Gemini call in this process
+llm_scheduler = QuotaScheduler(
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_retries=settings.LLM_MAX_RETRIES,
+    base_delay=settings.LLM_RETRY_BASE_DELAY,
+    max_delay=settings.LLM_RETRY_MAX_DELAY,
+    shared_path=settings.LLM_QUOTA_PATH or None,
+)
+# Persistent (model, prompt) -> response cache shared by every generator
+llm_cache = LLMCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_MB * 1024 * 1024) if settings.LLM_CACHE_MAX_MB > 0 else None
+# Translated script sections keyed by (source hash, target language), shared by every generator
+translation_memory = (
+    TranslationMemory(settings.TRANSLATION_MEMORY_PATH, settings.TRANSLATION_MEMORY_MAX_MB * 1024 * 1024)
+    if settings.TRANSLATION_MEMORY_MAX_MB > 0 else None
+)
+# Providers selectable per request besides Gemini (provider="mock" for load tests)
+llm_providers = {}
+if settings.MOCK_LLM_ENABLED:
+    llm_providers["mock"] = MockProvider(
+        latency=settings.MOCK_LLM_LATENCY,
+        tokens_per_second=settings.MOCK_LLM_TOKENS_PER_SECOND,
+        chunk_tokens=settings.MOCK_LLM_CHUNK_TOKENS,
+        error_rate=settings.MOCK_LLM_ERROR_RATE,
+        retry_after=settings.MOCK_LLM_RETRY_AFTER,
+        seed=settings.MOCK_LLM_SEED,
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        cache=llm_cache,
+        scheduler=llm_scheduler,
+    )
+# Identical generation/translation requests in flight share one LLM call
+llm_flights = SingleFlight()
+content_store = ContentStore(settings.UPLOAD_DIR)
+parse_cache = ParseCache(settings.CACHE_DIR / "parse", PPTParser.VERSION)
+# Durable job queue for parsing and narration; worker processes need the shared SQLite state
+job_queue: Optional[JobQueue] = None
+if settings.JOB_BACKEND == "queue":
+    if settings.STATE_BACKEND == "sqlite":
+        job_queue = JobQueue(
+            settings.JOB_QUEUE_PATH,
+            lease_seconds=settings.JOB_LEASE_SECONDS,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            retry_delay=settings.JOB_RETRY_DELAY,
+        )
+    else:
+        print("WARNING: JOB_BACKEND=queue requires STATE_BACKEND=sqlite; running jobs in-process.")
+job_workers = []
+upload_sessions = UploadSessionManager(content_store, MAX_UPLOAD_BYTES, settings.UPLOAD_CHUNK_SIZE_MB * 1024 * 1024)
+retention_sweeper = RetentionSweeper(
+    state,
+    rules=[
+        RetentionRule(settings.UPLOAD_DIR, "*", settings.UPLOAD_RETENTION_HOURS * 3600),
+        RetentionRule(settings.CACHE_DIR / "converted", "*.pptx", settings.UPLOAD_RETENTION_HOURS * 3600),
+        RetentionRule(settings.CACHE_DIR / "parse", "*/*.json", settings.UPLOAD_RETENTION_HOURS * 3600),
+        RetentionRule(settings.OUTPUT_DIR, "*", settings.OUTPUT_RETENTION_HOURS * 3600),
+    ],
+    upload_retention=settings.UPLOAD_RETENTION_HOURS * 3600,
+    job_retention=settings.OUTPUT_RETENTION_HOURS * 3600,
+    quota_bytes=settings.DISK_QUOTA_MB * 1024 * 1024,
+    grace=settings.RETENTION_GRACE_MIN * 60,
+    interval=settings.RETENTION_SWEEP_INTERVAL_MIN * 60,
+    extra_sweeps=[lambda: upload_sessions.expire(settings.UPLOAD_SESSION_RETENTION_HOURS * 3600)]
+    + ([lambda: (job_queue.purge(settings.OUTPUT_RETENTION_HOURS * 3600), 0)] if job_queue else []),
+)
+
+
+def create_ppt_converter(workers: int = settings.LEGACY_CONVERTER_WORKERS, first_slot: int = 0) -> LegacyPPTConverter:
+    """LibreOffice pool for legacy .ppt uploads (job workers get their own slots, see app.worker)."""
+    return LegacyPPTConverter(
+        settings.CACHE_DIR / "converted",
+        workers=workers,
+        timeout=settings.LEGACY_CONVERT_TIMEOUT,
+        soffice_path=settings.LIBREOFFICE_PATH,
+        first_slot=first_slot,
+    )
+
+
+ppt_converter = create_ppt_converter()
 tts_service = TTSService(output_dir=settings.OUTPUT_DIR)
 
 # Serve generated assets (audio, narrated ppt)
 app.mount("/outputs", StaticFiles(directory="outputs"), name="outputs")
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services that require API keys."""
+def init_script_generator():
+    """Create the shared ScriptGenerator from the configured API key and providers."""
     global script_generator
     if not settings.GEMINI_API_KEY:
         print("WARNING: GEMINI_API_KEY not found; generation requires per-request api_key.")
-    else:
-        script_generator = ScriptGenerator(api_key=settings.GEMINI_API_KEY, prompts_dir=str(settings.PROMPTS_DIR))
-        print("[Init] Script generator ready.")
+    if settings.GEMINI_API_KEY or llm_providers:
+        script_generator = ScriptGenerator(
+            api_key=settings.GEMINI_API_KEY or None,
+            prompts_dir=str(settings.PROMPTS_DIR),
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            cache=llm_cache,
+            planner=prompt_planner,
+            scheduler=llm_scheduler,
+            providers=llm_providers,
+            translation_memory=translation_memory,
+        )
+        print(f"[Init] Script generator ready (providers: {', '.join(script_generator.providers)}).")
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Initialize services that require API keys."""
+    init_script_generator()
+    retention_sweeper.start()
+    if job_queue and settings.JOB_WORKERS > 0:
+        job_workers.extend(start_workers(settings.JOB_WORKERS))
+        print(f"[Init] Started {settings.JOB_WORKERS} job worker processes.")
+
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the parser process pool, LibreOffice workers, job workers, the retention sweeper and the LLM pool."""
+    await run_in_threadpool(stop_workers, job_workers)
+    job_workers.clear()
+    ppt_parser.shutdown()
+    ppt_converter.shutdown()
+    retention_sweeper.stop()
+    shutdown_llm_executor()
 
-def ensure_generator(api_key: Optional[str] = None) -> ScriptGenerator:
-    """Return a ScriptGenerator instance, preferring the global one."""
-    if script_generator:
+
+def ensure_generator(api_key: Optional[str] = None, provider: str = "gemini") -> ScriptGenerator:
+    """
+    Return a ScriptGenerator that can serve `provider`, preferring the global one.
+
+    Translation passes the default: it always needs Gemini, so a global generator
+    with only the mock provider is not used and the request's api_key is.
+    """
+    if script_generator and (
+        "gemini" in script_generator.providers or (provider or "gemini").lower() in script_generator.providers
+    ):
         return script_generator
     if not api_key:
         raise HTTPException(
             status_code=400,
             detail="Gemini API key is required. Configure GEMINI_API_KEY or provide api_key in request.",
         )
-    return ScriptGenerator(api_key=api_key, prompts_dir=str(settings.PROMPTS_DIR))
+    return ScriptGenerator(
+        api_key=api_key,
+        prompts_dir=str(settings.PROMPTS_DIR),
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        cache=llm_cache,
+        planner=prompt_planner,
+        scheduler=llm_scheduler,
+        providers=llm_providers,
+        translation_memory=translation_memory,
+    )
 
 
 @app.get("/")
@@ -101,76 +273,309 @@ async def health_check():
         "prompts_available": len(list(settings.PROMPTS_DIR.glob("*.md"))) if settings.PROMPTS_DIR.exists() else 0,
     }
 
+@app.get("/api/metrics")
+async def metrics():
+    """Internal counters for monitoring (state sizes, evictions, disk retention, job queue, LLM cache, scheduler, coalescing, translation memory)."""
+    return {
+        "state": state.stats(),
+        "retention": retention_sweeper.stats(),
+        "jobs": job_queue.stats() if job_queue else None,
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "llm_scheduler": llm_scheduler.stats(),
+        "llm_coalescing": llm_flights.stats(),
+        "translation_memory": translation_memory.stats() if translation_memory else None,
+    }
+
 @app.get("/api/ping")
 async def ping():
     return {"message": "pong"}
 
 
-@app.post("/api/upload", response_model=PPTUploadResponse)
-def upload_ppt(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    """Phase 1: Upload file and return file_id immediately."""
-    import time
-    print(f"[API] >>> 收到上傳請求: {file.filename} (Size: {file.size if hasattr(file, 'size') else 'unknown'})")
-    print(f"[API] >>> Content-Type: {file.content_type}")
-
-    if not file.filename.lower().endswith((".ppt", ".pptx")):
+def validate_upload_request(filename: str, previous_file_id: Optional[str]):
+    """Reject unsupported files and unknown revisions before any bytes are stored."""
+    if not filename.lower().endswith((".ppt", ".pptx")):
         raise HTTPException(status_code=400, detail="Only .ppt and .pptx files are supported.")
 
+    if previous_file_id and not state.get_uploaded_file(previous_file_id):
+        raise HTTPException(status_code=404, detail="Previous revision not found.")
+
+
+def register_upload(
+    background_tasks: BackgroundTasks,
+    filename: str,
+    content_hash: str,
+    save_path: Path,
+    previous_file_id: Optional[str],
+) -> PPTUploadResponse:
+    """Create the file entry for a stored blob and start (or skip) parsing."""
     file_id = str(uuid.uuid4())
-    file_extension = Path(file.filename).suffix
-    save_path = settings.UPLOAD_DIR / f"{file_id}{file_extension}"
+    revision_of = previous_file_id or state.find_latest_file_by_name(filename)
 
-    try:
-        # Save file
-        with open(save_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        state.add_uploaded_file(file_id, {
-            "filename": file.filename,
-            "path": str(save_path),
-            "status": "pending",
-            "slides": [],
-            "summary": {}
-        })
-        state.set_parse_status(file_id, {"status": "pending", "progress": 0, "message": "Queued for parsing"})
-        
-        # Start background parsing
-        background_tasks.add_task(background_parse_ppt, file_id, str(save_path))
+    state.add_uploaded_file(file_id, {
+        "filename": filename,
+        "path": str(save_path),
+        "content_hash": content_hash,
+        "revision_of": revision_of,
+        "uploaded_at": time.time(),
+        "status": "pending",
+        "slides": [],
+        "summary": {}
+    })
 
+    # Legacy .ppt decks need their converted .pptx before a cached parse can be used
+    converted_path = ppt_converter.cached_path(content_hash)
+    if is_legacy_ppt(save_path) and converted_path.exists():
+        state.update_uploaded_file(file_id, {"pptx_path": str(converted_path)})
+    cached = parse_cache.get(content_hash)
+    if cached and (not is_legacy_ppt(save_path) or converted_path.exists()):
+        complete_parse(file_id, cached)
         return PPTUploadResponse(
             success=True,
-            message="File uploaded, parsing started in background",
+            message="File uploaded, parse result loaded from cache",
             file_id=file_id,
-            slides=[], # Return empty list, frontend will poll
+            slides=[],  # Frontend still polls the status endpoint
             summary={}
         )
+
+    state.set_parse_status(file_id, {"status": "pending", "progress": 0, "message": "Queued for parsing"})
+    
+    # Start background parsing
+    submit_job(background_tasks, "parse", background_parse_ppt, file_id=file_id, save_path=str(save_path))
+
+    return PPTUploadResponse(
+        success=True,
+        message="File uploaded, parsing started in background",
+        file_id=file_id,
+        slides=[], # Return empty list, frontend will poll
+        summary={}
+    )
+
+
+@app.post("/api/upload", response_model=PPTUploadResponse)
+async def upload_ppt(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    previous_file_id: Optional[str] = Form(None),
+):
+    """
+    Phase 1: Upload file and return file_id immediately.
+
+    previous_file_id declares the upload as a revision of an earlier file; otherwise the
+    latest parsed upload with the same filename is used. Unchanged slides are reused from it.
+    Large decks over unreliable links should use the chunked /api/upload/init flow instead.
+    """
+    print(f"[API] >>> 收到上傳請求: {file.filename} (Size: {file.size if hasattr(file, 'size') else 'unknown'})")
+    print(f"[API] >>> Content-Type: {file.content_type}")
+
+    validate_upload_request(file.filename, previous_file_id)
+    if getattr(file, "size", None) and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=str(UploadTooLarge(MAX_UPLOAD_BYTES)))
+
+    tmp_path = content_store.temp_path()
+    writer = BlobWriter(tmp_path, MAX_UPLOAD_BYTES)
+    try:
+        # Stream to disk and hash in the same pass; each write is a short threadpool hop
+        # instead of holding a worker for the whole copy
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            await run_in_threadpool(writer.write, chunk)
+        writer.close()
+        content_hash = writer.hexdigest()
+        save_path, deduplicated = content_store.commit(tmp_path, content_hash, Path(file.filename).suffix)
+        if deduplicated:
+            print(f"[API] >>> 相同內容已存在: {save_path.name}")
+
+        return await run_in_threadpool(
+            register_upload, background_tasks, file.filename, content_hash, save_path, previous_file_id
+        )
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
     except Exception as exc:
         print(f"[API] ERROR: 上傳失敗 - {exc}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(exc)}")
+    finally:
+        writer.close()
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+@app.post("/api/upload/init", response_model=UploadSessionResponse)
+async def init_chunked_upload(request: UploadInitRequest):
+    """Start a resumable upload; send chunks with PUT, then call complete."""
+    validate_upload_request(request.filename, request.previous_file_id)
+    try:
+        return upload_sessions.create(request.filename, request.size, request.sha256, request.previous_file_id)
+    except UploadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc))
+
+
+@app.get("/api/upload/{upload_id}", response_model=UploadSessionResponse)
+async def get_chunked_upload(upload_id: str):
+    """Report received_bytes so an interrupted client knows where to resume."""
+    try:
+        return await run_in_threadpool(upload_sessions.status, upload_id)
+    except UploadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc))
+
+
+@app.put("/api/upload/{upload_id}/chunk", response_model=UploadSessionResponse)
+async def put_upload_chunk(upload_id: str, offset: int, request: Request):
+    """Append the raw request body at `offset` (must equal received_bytes)."""
+    limit = upload_sessions.chunk_size
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=413, detail=f"Chunk exceeds {limit} bytes.")
+    # Read incrementally so a body without Content-Length cannot grow past the chunk limit
+    data = bytearray()
+    async for piece in request.stream():
+        data += piece
+        if len(data) > limit:
+            raise HTTPException(status_code=413, detail=f"Chunk exceeds {limit} bytes.")
+    data = bytes(data)
+    try:
+        await run_in_threadpool(upload_sessions.append, upload_id, offset, data)
+        return await run_in_threadpool(upload_sessions.status, upload_id)
+    except UploadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc))
+
+
+@app.post("/api/upload/{upload_id}/complete", response_model=PPTUploadResponse)
+async def complete_chunked_upload(upload_id: str, background_tasks: BackgroundTasks):
+    """Verify the assembled file and hand it to the normal parse pipeline."""
+    try:
+        session, content_hash, save_path, deduplicated = await run_in_threadpool(upload_sessions.complete, upload_id)
+    except UploadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc))
+    if deduplicated:
+        print(f"[API] >>> 相同內容已存在: {save_path.name}")
+    previous_file_id = session["previous_file_id"]
+    if previous_file_id and not state.get_uploaded_file(previous_file_id):
+        previous_file_id = None  # revision was deleted while the upload was in flight
+    return await run_in_threadpool(
+        register_upload, background_tasks, session["filename"], content_hash, save_path, previous_file_id
+    )
+
+
+@app.delete("/api/upload/{upload_id}")
+async def abort_chunked_upload(upload_id: str):
+    """Discard a chunked upload and its partial data."""
+    try:
+        await run_in_threadpool(upload_sessions.abort, upload_id)
+    except UploadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc))
+    return {"success": True, "message": "Upload aborted"}
+
+def submit_job(background_tasks: BackgroundTasks, kind: str, task, **payload):
+    """Hand a job to the worker processes, or run it in this process when the queue is disabled."""
+    if job_queue is not None:
+        job_queue.enqueue(kind, payload)
+    else:
+        background_tasks.add_task(task, **payload)
+
+def is_legacy_ppt(path) -> bool:
+    """Binary .ppt decks must be converted to .pptx before parsing or embedding."""
+    return Path(path).suffix.lower() == ".ppt"
+
+def previous_parse_result(file_id: str) -> Optional[Dict]:
+    """Parse result of the revision this upload replaces, if it is still available."""
+    revision_of = state.get_uploaded_file(file_id).get("revision_of")
+    previous = state.get_uploaded_file(revision_of) if revision_of else None
+    if not previous or previous.get("status") != "completed":
+        return None
+    return {"slides": previous["slides"], "part_hashes": previous.get("part_hashes", [])}
+
+def complete_parse(file_id: str, result: Dict):
+    """Store a finished parse result and mark the file as completed."""
+    previous = previous_parse_result(file_id)
+    state.update_uploaded_file(file_id, {
+        "slides": result["slides"],
+        "summary": result["summary"],
+        "part_hashes": result.get("part_hashes", []),
+        "changed_slides": PPTParser.changed_slides(result, previous) if previous else None,
+        "status": "completed",
+        "warnings": []
+    })
+    last_status = state.get_parse_status(file_id) or {}
+    # File data is written first so a reader that sees "completed" also sees the slides
+    state.transition_parse_status(file_id, (None, "pending", "processing"), {
+        "status": "completed",
+        "progress": 100,
+        "message": "Analysis complete",
+        "parsed_slides": len(result["slides"]),
+        "total_slides": last_status.get("total_slides"),
+    })
+
+def is_transient_error(exc: Exception) -> bool:
+    """Failures a queued job retries (up to JOB_MAX_ATTEMPTS): I/O, network, timeouts, a busy converter."""
+    if isinstance(exc, ConversionError):
+        return exc.transient
+    if isinstance(exc, (FileNotFoundError, IsADirectoryError, zipfile.BadZipFile)):
+        return False
+    return isinstance(exc, (OSError, TimeoutError, aiohttp.ClientError))
 
-def background_parse_ppt(file_id: str, save_path: str):
-    """CPU-bound parsing in a background thread."""
-    state.set_parse_status(file_id, {"status": "processing", "progress": 10, "message": "Analyzing PPT structure..."})
+
+def background_parse_ppt(file_id: str, save_path: str, retry: bool = False, raise_transient: bool = False):
+    """
+    CPU-bound parsing in a background thread or job worker.
+
+    With raise_transient (job queue) transient errors propagate so the queue
+    retries the job; everything else marks the parse as failed.
+    """
+    # Claim the job: only one worker may move it out of "pending".
+    # A retried queue job holds the lease, so it may also take over an interrupted "processing" parse.
+    first_message = "Converting legacy .ppt..." if is_legacy_ppt(save_path) else "Analyzing PPT structure..."
+    claim_from = ("pending", "processing") if retry else ("pending",)
+    if not state.transition_parse_status(file_id, claim_from, {"status": "processing", "progress": 0, "message": first_message}):
+        print(f"[Background] Parse for {file_id} already claimed or finished; skipping")
+        return
+    if retry:
+        state.update_uploaded_file(file_id, {"slides": []})  # drop slides published by the interrupted attempt
     try:
-        slides = ppt_parser.parse(save_path)
+        if is_legacy_ppt(save_path):
+            content_hash = state.get_uploaded_file(file_id)["content_hash"]
+            save_path = ppt_converter.convert(save_path, content_hash)
+            state.update_uploaded_file(file_id, {"pptx_path": save_path})
+            state.transition_parse_status(file_id, ("processing",), {"status": "processing", "progress": 0, "message": "Analyzing PPT structure..."})
+        slides = []
+        part_hashes = []
+        # Slides are published as they are extracted so the status endpoint can stream them
+        for parsed in ppt_parser.iter_slides(save_path, previous_parse_result(file_id)):
+            slides.append(parsed.slide)
+            if parsed.part_hash:
+                part_hashes.append(parsed.part_hash)
+            state.append_parsed_slide(file_id, parsed.slide)
+            state.transition_parse_status(file_id, ("processing",), {
+                "status": "processing",
+                "progress": min(99, parsed.position * 100 // parsed.total),
+                "message": f"Parsed slide {parsed.slide.slide_no}",
+                "parsed_slides": len(slides),
+                "total_slides": parsed.total,
+            })
         
         # Text optimization removed - caused API quota issues
         # Users can manually edit scripts in the frontend
         
-        summary = ppt_parser.get_summary(slides)
-        
-        file_data = state.get_uploaded_file(file_id)
-        file_data.update({
-            "slides": slides,
-            "summary": summary,
-            "status": "completed",
-            "warnings": []
-        })
-        state.add_uploaded_file(file_id, file_data) # This will update the existing entry
-        state.set_parse_status(file_id, {"status": "completed", "progress": 100, "message": "Analysis complete"})
+        result = {"slides": slides, "summary": ppt_parser.get_summary(slides), "part_hashes": part_hashes}
+
+        content_hash = state.get_uploaded_file(file_id).get("content_hash")
+        if content_hash:
+            try:
+                parse_cache.set(content_hash, result)
+            except OSError as exc:
+                print(f"[Background] Parse cache write failed for {file_id}: {exc}")
+
+        complete_parse(file_id, result)
     except Exception as exc:
+        if raise_transient and is_transient_error(exc):
+            print(f"[Background] Analysis of {file_id} hit a transient error, leaving it to the job queue: {exc}")
+            state.transition_parse_status(file_id, ("processing",), {
+                "status": "processing", "progress": 0, "message": f"Retrying after error: {exc}"
+            })
+            raise
         print(f"[Background] Analysis failed for {file_id}: {exc}")
-        state.set_parse_status(file_id, {"status": "failed", "progress": 0, "message": str(exc)})
+        state.transition_parse_status(file_id, ("pending", "processing"), {"status": "failed", "progress": 0, "message": str(exc)})
 
 @app.get("/api/parse/{file_id}/status", response_model=ParseStatusResponse)
 async def get_parse_status(file_id: str):
@@ -183,34 +588,28 @@ async def get_parse_status(file_id: str):
         "file_id": file_id,
         "status": status_data["status"],
         "progress": status_data["progress"],
-        "message": status_data["message"]
+        "message": status_data["message"],
+        "parsed_slides": status_data.get("parsed_slides"),
+        "total_slides": status_data.get("total_slides"),
     }
     
-    if status_data["status"] == "completed":
+    if status_data["status"] == "processing":
+        # Slides extracted so far (snapshot, the parser keeps appending)
+        response["slides"] = to_api_slides(state.get_parsed_slides(file_id))
+    elif status_data["status"] == "completed":
         file_data = state.get_uploaded_file(file_id)
-        response["slides"] = file_data["slides"]
+        response["slides"] = to_api_slides(file_data["slides"])
         response["summary"] = file_data["summary"]
+        response["revision_of"] = file_data.get("revision_of")
+        response["changed_slides"] = file_data.get("changed_slides")
         
     return response
 
 
-@app.post("/api/generate/{file_id}", response_model=GenerateScriptResponse)
-async def generate_script(file_id: str, request: GenerateScriptRequest):
-    """Generate presentation script for a previously uploaded PPT."""
-    print(f"[API] >>> 收到文稿生成請求: {file_id}")
-    print(f"[API] >>> 參數: provider={request.provider}, model={request.model}, audience={request.audience}")
-    
-    file_data = state.get_uploaded_file(file_id)
-    if not file_data:
-        print(f"[API] ERROR: file_id {file_id} not found in uploaded_files")
-        raise HTTPException(status_code=404, detail="PPT file not found.")
-
-    current_generator = ensure_generator(request.api_key)
-
-    # Build cache key to avoid duplicate LLM calls for same PPT + config
-    cache_key = "|".join(
+def generation_settings_key(request: GenerateScriptRequest) -> str:
+    """Request settings that determine the generated script"""
+    return "|".join(
         [
-            file_id,
             request.provider.lower(),
             request.model or "",
             request.audience,
@@ -223,32 +622,141 @@ async def generate_script(file_id: str, request: GenerateScriptRequest):
         ]
     )
 
+
+def generation_cache_key(file_id: str, request: GenerateScriptRequest, window_size: int) -> str:
+    """Cache key to avoid duplicate LLM calls for same PPT + config"""
+    return "|".join([file_id, generation_settings_key(request), str(window_size)])
+
+
+def lineage_cache_key(file_id: str, request: GenerateScriptRequest) -> str:
+    """Last generation of a file with these settings, used by later revisions for incremental regeneration"""
+    return f"{file_id}|lineage|{generation_settings_key(request)}"
+
+
+def previous_generation(file_id: str, request: GenerateScriptRequest) -> Optional[Dict]:
+    """Most recent generation with the same settings for this file or its earlier revisions."""
+    seen = set()
+    current = file_id
+    while current and current not in seen:
+        seen.add(current)
+        entry = state.get_generation_cache(lineage_cache_key(current, request))
+        if entry:
+            return entry
+        data = state.get_uploaded_file(current)
+        current = data.get("revision_of") if data else None
+    return None
+
+
+async def incremental_generation(
+    generator: ScriptGenerator, file_id: str, slides: List, request: GenerateScriptRequest
+) -> Optional[Dict]:
+    """Regenerate only changed slides when requested and a previous generation exists (None = full generation)."""
+    if not request.incremental:
+        return None
+    previous = previous_generation(file_id, request)
+    if not previous:
+        return None
+    return await generator.regenerate_changed_async(
+        slides,
+        previous["result"],
+        previous["fingerprints"],
+        **generation_options(request),
+        # The changed slides are budgeted on their own unless the request fixes the window
+        window_size=request.window_size,
+        window_concurrency=settings.GENERATION_WINDOW_CONCURRENCY,
+        max_changed_ratio=settings.INCREMENTAL_MAX_CHANGED_RATIO,
+    )
+
+
+def generation_options(request: GenerateScriptRequest) -> Dict:
+    """Keyword arguments for ScriptGenerator taken from the request"""
+    return {
+        "audience": request.audience,
+        "purpose": request.purpose,
+        "context": request.context,
+        "tone": request.tone,
+        "duration_sec": request.duration_sec,
+        "include_transitions": request.include_transitions,
+        "language": request.language,
+        "provider": request.provider,
+        "model": request.model,
+        "api_key": request.api_key,
+    }
+
+
+async def store_generation(file_id: str, cache_key: str, result: Dict, request: GenerateScriptRequest, slides: List):
+    """Write the script file and remember the result for identical requests and later revisions"""
+    output_file = settings.OUTPUT_DIR / f"{file_id}_script.txt"
+    await run_in_threadpool(output_file.write_text, result["full_script"], encoding="utf-8")
+    state.set_generation_cache(cache_key, result)
+    state.set_generation_cache(lineage_cache_key(file_id, request), {
+        "result": result,
+        "fingerprints": [slide.content_fingerprint() for slide in slides],
+    })
+
+
+async def run_generation(
+    generator: ScriptGenerator, file_id: str, slides: List, request: GenerateScriptRequest, plan: Dict, cache_key: str
+) -> Dict:
+    """Generate (incrementally when possible), store and return the result."""
+    window_size = plan["window_size"]
+    # Runs on the bounded LLM pool; the event loop keeps serving other requests
+    result = await incremental_generation(generator, file_id, slides, request)
+    if result is None:
+        result = await generator.generate_full_script_async(
+            slides=slides,
+            **generation_options(request),
+            window_size=window_size,
+            window_concurrency=settings.GENERATION_WINDOW_CONCURRENCY,
+        )
+        result["metadata"]["token_estimate"] = plan
+    await store_generation(file_id, cache_key, result, request, slides)
+    return result
+
+
+def replay_events(result: Dict):
+    """SSE messages for an already complete result"""
+    if result["opening"]:
+        yield sse_event("opening", {"opening": result["opening"]})
+    for item in result["slide_scripts"]:
+        yield sse_event("slide", item)
+    yield sse_event("done", GenerateScriptResponse(**result))
+
+
+def sse_event(event: str, data) -> str:
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/generate/{file_id}", response_model=GenerateScriptResponse)
+async def generate_script(file_id: str, request: GenerateScriptRequest):
+    """Generate presentation script for a previously uploaded PPT."""
+    print(f"[API] >>> 收到文稿生成請求: {file_id}")
+    print(f"[API] >>> 參數: provider={request.provider}, model={request.model}, audience={request.audience}")
+    
+    file_data = state.get_uploaded_file(file_id)
+    if not file_data:
+        print(f"[API] ERROR: file_id {file_id} not found in uploaded_files")
+        raise HTTPException(status_code=404, detail="PPT file not found.")
+
+    current_generator = ensure_generator(request.api_key, request.provider)
+    # Token estimate decides between one call and windows (unless the request forces window_size)
+    plan = current_generator.plan_generation(
+        file_data["slides"], request.duration_sec, request.language, request.window_size
+    )
+    window_size = plan["window_size"]
+    cache_key = generation_cache_key(file_id, request, window_size)
+
     cached = state.get_generation_cache(cache_key)
     if cached:
         return GenerateScriptResponse(**cached)
 
     try:
-        result = current_generator.generate_full_script(
-            slides=file_data["slides"],
-            audience=request.audience,
-            purpose=request.purpose,
-            context=request.context,
-            tone=request.tone,
-            duration_sec=request.duration_sec,
-            include_transitions=request.include_transitions,
-            language=request.language,
-            provider=request.provider,
-            model=request.model,
-            api_key=request.api_key,
+        # An identical request already in flight shares its LLM call (and its error) with this one
+        result = await llm_flights.do(
+            cache_key,
+            lambda: run_generation(current_generator, file_id, file_data["slides"], request, plan, cache_key),
         )
-
-        output_file = settings.OUTPUT_DIR / f"{file_id}_script.txt"
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(result["full_script"])
-
-        # Save to cache
-        state.set_generation_cache(cache_key, result)
-
         return GenerateScriptResponse(**result)
     except ScriptGenerator.QuotaExceededError as exc:
         print(f"[API] ERROR: Quota exceeded - {exc}")
@@ -262,15 +770,237 @@ async def generate_script(file_id: str, request: GenerateScriptRequest):
         raise HTTPException(status_code=500, detail=f"Failed to generate script: {str(exc)}")
 
 
+@app.post("/api/generate/{file_id}/stream")
+async def generate_script_stream(file_id: str, request: GenerateScriptRequest):
+    """
+    Streaming variant of /api/generate/{file_id} (Server-Sent Events).
+
+    Emits `opening` and `slide` events as soon as each section of the model output
+    is complete, then `done` with the full GenerateScriptResponse, or `error`
+    with {"status_code", "detail"}.
+    """
+    file_data = state.get_uploaded_file(file_id)
+    if not file_data:
+        raise HTTPException(status_code=404, detail="PPT file not found.")
+
+    current_generator = ensure_generator(request.api_key, request.provider)
+    # Token estimate decides between one call and windows (unless the request forces window_size)
+    plan = current_generator.plan_generation(
+        file_data["slides"], request.duration_sec, request.language, request.window_size
+    )
+    window_size = plan["window_size"]
+    cache_key = generation_cache_key(file_id, request, window_size)
+
+    async def events():
+        cached = state.get_generation_cache(cache_key)
+        if cached:
+            for message in replay_events(cached):
+                yield message
+            return
+        try:
+            if llm_flights.running(cache_key):
+                # The same request is already being generated: replay its result instead of calling the model again
+                result = await llm_flights.do(
+                    cache_key,
+                    lambda: run_generation(current_generator, file_id, file_data["slides"], request, plan, cache_key),
+                )
+                for message in replay_events(result):
+                    yield message
+                return
+            with llm_flights.lead(cache_key) as flight:
+                result = await incremental_generation(current_generator, file_id, file_data["slides"], request)
+                if result is not None:
+                    await store_generation(file_id, cache_key, result, request, file_data["slides"])
+                    flight.set_result(result)
+                    for message in replay_events(result):
+                        yield message
+                    return
+                async for event in current_generator.stream_full_script(
+                    slides=file_data["slides"],
+                    **generation_options(request),
+                    window_size=window_size,
+                    window_concurrency=settings.GENERATION_WINDOW_CONCURRENCY,
+                ):
+                    if event["event"] == "done":
+                        event["data"]["metadata"]["token_estimate"] = plan
+                        await store_generation(file_id, cache_key, event["data"], request, file_data["slides"])
+                        flight.set_result(event["data"])
+                        yield sse_event("done", GenerateScriptResponse(**event["data"]))
+                    else:
+                        yield sse_event(event["event"], event["data"])
+        except ScriptGenerator.QuotaExceededError as exc:
+            print(f"[API] ERROR: Quota exceeded - {exc}")
+            yield sse_event("error", {"status_code": 429, "detail": f"Gemini quota exceeded or rate limited: {exc}"})
+        except Exception as exc:
+            import traceback
+            print(f"[API] CRITICAL ERROR during streaming generation: {exc}")
+            print(traceback.format_exc())
+            yield sse_event("error", {"status_code": 500, "detail": f"Failed to generate script: {exc}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/generate/{file_id}/batch")
+async def generate_script_batch(file_id: str, request: BatchGenerateRequest, background_tasks: BackgroundTasks):
+    """
+    Generate several variants (audience, language, duration...) of one deck as a single background job.
+
+    Variants already in the generation cache, and identical variants, cost no extra
+    LLM call. Poll /api/generate/batch/{job_id}/status for per-variant results.
+    """
+    file_data = state.get_uploaded_file(file_id)
+    if not file_data:
+        raise HTTPException(status_code=404, detail="PPT file not found.")
+    if file_data.get("status") != "completed":
+        raise HTTPException(status_code=409, detail="PPT parsing has not completed yet.")
+    if settings.BATCH_MAX_VARIANTS and len(request.variants) > settings.BATCH_MAX_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_VARIANTS} variants per batch.")
+    # Queued payloads are persisted in jobs.db, so user keys never go into them
+    queued = job_queue is not None
+    if queued and any(variant.api_key for variant in request.variants):
+        raise HTTPException(
+            status_code=400,
+            detail="Per-variant api_key is not supported when jobs run on the worker queue; configure GEMINI_API_KEY.",
+        )
+
+    job_id = str(uuid.uuid4())
+    state.add_ppt_job(job_id, {
+        "job_id": job_id,
+        "kind": "batch",
+        "file_id": file_id,
+        "status": "processing",
+        "progress": 0,
+        "message": f"Queued {len(request.variants)} variants",
+        "variants": [{"index": i, "status": "pending"} for i in range(len(request.variants))],
+        "result": None,
+        "created_at": time.time(),
+    })
+    submit_job(
+        background_tasks,
+        "batch",
+        run_batch_generation_task,
+        job_id=job_id,
+        file_id=file_id,
+        variants=[variant.model_dump(exclude={"api_key"} if queued else None) for variant in request.variants],
+        concurrency=request.concurrency or settings.BATCH_MAX_CONCURRENCY,
+    )
+    return {"job_id": job_id, "status": "processing", "variants": len(request.variants)}
+
+
+@app.get("/api/generate/batch/{job_id}/status", response_model=BatchGenerateStatusResponse)
+async def get_batch_status(job_id: str):
+    """Poll a batch generation job; finished variants carry their result."""
+    job_data = state.get_ppt_job(job_id)
+    if not job_data or job_data.get("kind") != "batch":
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return BatchGenerateStatusResponse(**job_data)
+
+
+async def run_batch_generation_task(job_id: str, file_id: str, variants: List[Dict], concurrency: int):
+    """Background worker for batch generation: each distinct variant is generated once, cached ones are reused."""
+    statuses = [{"index": i, "status": "pending", "result": None, "error": None} for i in range(len(variants))]
+    finished = 0
+
+    def publish(message: str, **updates):
+        # Ignored once the job has finished (or was removed)
+        state.transition_ppt_job(job_id, ("processing",), {
+            "variants": statuses,
+            "progress": int(finished * 100 / len(statuses)),
+            "message": message,
+            **updates,
+        })
+
+    def settle(indices: List[int], status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        nonlocal finished
+        for index in indices:
+            statuses[index].update(status=status, result=result, error=error)
+        finished += len(indices)
+        publish(f"{finished}/{len(statuses)} variants done")
+
+    file_data = state.get_uploaded_file(file_id)
+    if not file_data:
+        publish("Error: PPT file not found", status="failed")
+        return
+    slides = file_data["slides"]
+
+    # Group identical variants under their generation cache key
+    groups: Dict[str, Dict] = {}
+    for index, variant in enumerate(variants):
+        request = GenerateScriptRequest(**variant)
+        try:
+            generator = ensure_generator(request.api_key, request.provider)
+        except HTTPException as exc:
+            settle([index], "failed", error=exc.detail)
+            continue
+        plan = generator.plan_generation(slides, request.duration_sec, request.language, request.window_size)
+        cache_key = generation_cache_key(file_id, request, plan["window_size"])
+        group = groups.setdefault(cache_key, {"request": request, "generator": generator, "plan": plan, "indices": []})
+        group["indices"].append(index)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_group(cache_key: str, group: Dict):
+        indices = group["indices"]
+        cached = state.get_generation_cache(cache_key)
+        if cached:
+            settle(indices, "cached", result=cached)
+            return
+        async with semaphore:
+            for index in indices:
+                statuses[index]["status"] = "running"
+            publish(f"{finished}/{len(statuses)} variants done")
+            try:
+                # Shares the call with an identical single request that is already running
+                result = await llm_flights.do(
+                    cache_key,
+                    lambda: run_generation(group["generator"], file_id, slides, group["request"], group["plan"], cache_key),
+                )
+            except Exception as exc:
+                print(f"[Batch {job_id}] Variant(s) {indices} failed: {exc}")
+                settle(indices, "failed", error=str(exc))
+                return
+        settle(indices, "completed", result=result)
+
+    print(f"[Batch {job_id}] {len(variants)} variants, {len(groups)} distinct, concurrency {concurrency}")
+    # Every variant's prompts reuse one formatting of the slides
+    with prompt_planner.shared_slides(slides):
+        await asyncio.gather(*(run_group(key, group) for key, group in groups.items()))
+
+    failed = sum(1 for item in statuses if item["status"] == "failed")
+    publish(
+        f"{len(statuses) - failed}/{len(statuses)} variants generated" + (f", {failed} failed" if failed else ""),
+        status="failed" if failed == len(statuses) else "completed",
+        progress=100,
+    )
+
+
 @app.post("/api/translate", response_model=GenerateScriptResponse)
 async def translate_script(request: TranslateRequest):
-    """Translate an existing script and parse it back into sections."""
+    """Translate an existing script section by section and parse it back into sections."""
     current_generator = ensure_generator(request.api_key)
+    slides = None
+    if request.file_id:
+        file_data = state.get_uploaded_file(request.file_id)
+        if not file_data:
+            raise HTTPException(status_code=404, detail="PPT file not found")
+        slides = file_data["slides"]
+    flight_key = "translate|" + current_generator.translation_key(request.full_script, request.target_language)
+    if request.file_id:
+        flight_key += "|" + request.file_id
     try:
-        result = current_generator.translate_and_parse(
-            full_script=request.full_script,
-            target_language=request.target_language,
-            api_key=request.api_key,
+        result = await llm_flights.do(
+            flight_key,
+            lambda: current_generator.translate_and_parse_async(
+                full_script=request.full_script,
+                target_language=request.target_language,
+                api_key=request.api_key,
+                slides=slides,
+                concurrency=settings.TRANSLATION_CONCURRENCY,
+            ),
         )
         return GenerateScriptResponse(**result)
     except ScriptGenerator.QuotaExceededError as exc:
@@ -297,11 +1027,13 @@ async def delete_file(file_id: str):
     if not file_data:
         raise HTTPException(status_code=404, detail="File not found.")
 
+    state.delete_uploaded_file(file_id)
+
+    # The blob is shared by every upload of the same content; remove it with the last reference
     file_path = Path(file_data["path"])
-    if file_path.exists():
+    if file_path.exists() and not state.find_file_ids_by_path(file_data["path"]):
         file_path.unlink()
     
-    state.delete_uploaded_file(file_id)
     # purge cached generations for this file_id
     state.clear_generation_cache_for_file(file_id)
     return {"success": True, "message": "File deleted."}
@@ -342,20 +1074,23 @@ async def generate_narrated_ppt(request: NarratedPPTRequest, background_tasks: B
         "progress": 0,
         "message": "Starting narration generation...",
         "result": None,
+        "created_at": time.time(),
     })
 
     file_data = state.get_uploaded_file(request.file_id)
-    original_pptx_path = file_data["path"]
+    original_pptx_path = file_data.get("pptx_path", file_data["path"])
 
-    background_tasks.add_task(
+    submit_job(
+        background_tasks,
+        "narrate",
         run_narrated_pptx_task,
-        job_id,
-        request.file_id,
-        original_pptx_path,
-        request.slide_scripts,
-        request.voice,
-        request.rate,
-        request.pitch,
+        job_id=job_id,
+        file_id=request.file_id,
+        original_pptx_path=original_pptx_path,
+        slide_scripts=request.slide_scripts,
+        voice=request.voice,
+        rate=request.rate,
+        pitch=request.pitch,
     )
 
     return {"job_id": job_id, "status": "processing"}
@@ -378,36 +1113,46 @@ async def run_narrated_pptx_task(
     voice: str,
     rate: str,
     pitch: str,
+    raise_transient: bool = False,
 ):
-    """Background worker for narrated PPT generation with progress reporting."""
+    """
+    Background worker for narrated PPT generation with progress reporting.
+
+    With raise_transient (job queue) transient errors propagate so the queue
+    retries the job; everything else marks the job as failed.
+    """
 
     def progress_callback(progress: int, message: str):
         """Update job progress"""
-        if state.get_ppt_job(job_id): # Check if job still exists
-            state.update_ppt_job(job_id, {
-                "progress": progress,
-                "message": message
-            })
+        # Ignored once the job has finished (or was removed)
+        if state.transition_ppt_job(job_id, ("processing",), {
+            "progress": progress,
+            "message": message
+        }):
             print(f"[Job {job_id}] {progress}% - {message}")
 
     try:
-        result = await tts_service.generate_narrated_pptx(
-            original_pptx_path, slide_scripts, voice, rate, pitch, progress_callback=progress_callback
-        )
-        if state.get_ppt_job(job_id): # Check if job still exists before updating
-            state.update_ppt_job(job_id, {
-                "status": "completed",
-                "progress": 100,
-                "message": "Narrated PPT generated successfully",
-                "result": result
-            })
+        with retention_sweeper.hold(original_pptx_path):
+            result = await tts_service.generate_narrated_pptx(
+                original_pptx_path, slide_scripts, voice, rate, pitch, progress_callback=progress_callback
+            )
+        state.transition_ppt_job(job_id, ("processing",), {
+            "status": "completed",
+            "progress": 100,
+            "message": "Narrated PPT generated successfully",
+            "result": result
+        })
     except Exception as exc:
+        if raise_transient and is_transient_error(exc):
+            print(f"[Job {job_id}] Transient error, leaving it to the job queue: {exc}")
+            state.transition_ppt_job(job_id, ("processing",), {"message": f"Retrying after error: {exc}"})
+            raise
+
         import traceback
 
         print(f"[Job {job_id}] FAILED:")
         print(traceback.format_exc())
-        if job_id in ppt_jobs:
-            ppt_jobs[job_id].update({"status": "failed", "message": f"Error: {str(exc)}"})
+        state.transition_ppt_job(job_id, ("processing",), {"status": "failed", "message": f"Error: {str(exc)}"})
 
 
 if __name__ == "__main__":
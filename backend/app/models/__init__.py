@@ -1,4 +1,7 @@
 from .schemas import (
+    BatchGenerateRequest,
+    BatchGenerateStatusResponse,
+    BatchVariantStatus,
     ErrorResponse,
     GenerateScriptRequest,
     GenerateScriptResponse,
@@ -10,9 +13,12 @@ from .schemas import (
     TTSGenerateRequest,
     TTSGenerateResponse,
     TTSVoiceResponse,
+    UploadInitRequest,
+    UploadSessionResponse,
     ParseStatusResponse,
     NarratedPPTStatusResponse,
 )
+from .slide_record import SlideRecord, TableData, to_api_slides
 
 # Backward compatibility imports
 from pydantic import BaseModel, Field  # noqa: F401
@@ -26,11 +26,32 @@ class GenerateScriptRequest(BaseModel):
     language: str = Field(
         default="Traditional Chinese", description="Output language (display string)"
     )
-    provider: str = Field(default="gemini", description="LLM provider: gemini or openai")
+    provider: str = Field(
+        default="gemini",
+        description="LLM provider: gemini, or mock when MOCK_LLM_ENABLED (other providers use gemini)",
+    )
     model: Optional[str] = Field(default=None, description="Optional model name per provider")
     api_key: Optional[str] = Field(
         default=None, description="Optional Gemini API key supplied by the user"
     )
+    window_size: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Slides per concurrent generation window (0 = single call, unset = chosen from the token budget)",
+    )
+    incremental: bool = Field(
+        default=False,
+        description="Regenerate only slides changed since the last generation of this file or its earlier revisions",
+    )
+
+
+class BatchGenerateRequest(BaseModel):
+    """Several script variants (audiences, languages, durations...) for one uploaded file."""
+
+    variants: List[GenerateScriptRequest] = Field(..., min_length=1, description="One request per variant")
+    concurrency: Optional[int] = Field(
+        default=None, ge=1, description="Variants generated at the same time (default BATCH_MAX_CONCURRENCY)"
+    )
 
 
 class TranslateRequest(BaseModel):
@@ -41,6 +62,9 @@ class TranslateRequest(BaseModel):
     api_key: Optional[str] = Field(
         default=None, description="Optional Gemini API key supplied by the user"
     )
+    file_id: Optional[str] = Field(
+        default=None, description="Optional uploaded file whose slide titles label the translated sections"
+    )
 
 
 class SlideScriptItem(BaseModel):
@@ -71,6 +95,25 @@ class PPTUploadResponse(BaseModel):
     summary: Dict[str, Any]
 
 
+class UploadInitRequest(BaseModel):
+    """Start a resumable chunked upload."""
+
+    filename: str
+    size: int = Field(..., description="Total file size in bytes")
+    sha256: Optional[str] = Field(None, description="Expected SHA-256 hex digest, verified on complete")
+    previous_file_id: Optional[str] = None
+
+
+class UploadSessionResponse(BaseModel):
+    """State of a chunked upload; resume by sending the chunk at received_bytes."""
+
+    upload_id: str
+    filename: str
+    size: int
+    received_bytes: int
+    chunk_size: int
+
+
 class ErrorResponse(BaseModel):
     """Standard error payload."""
 
@@ -122,8 +165,12 @@ class ParseStatusResponse(BaseModel):
     status: str  # pending, processing, completed, failed
     progress: int
     message: str
-    slides: Optional[List[SlideData]] = None
+    parsed_slides: Optional[int] = None  # visible slides extracted so far
+    total_slides: Optional[int] = None  # slide parts in the deck (including hidden ones)
+    slides: Optional[List[SlideData]] = None  # partial while processing, complete once completed
     summary: Optional[Dict[str, Any]] = None
+    revision_of: Optional[str] = None  # file_id of the previous revision, if any
+    changed_slides: Optional[List[int]] = None  # slide_no values re-extracted vs. that revision
 
 
 class NarratedPPTStatusResponse(BaseModel):
@@ -135,3 +182,23 @@ class NarratedPPTStatusResponse(BaseModel):
     progress: int
     message: str
     result: Optional[TTSGenerateResponse] = None
+
+
+class BatchVariantStatus(BaseModel):
+    """Outcome of one variant of a batch generation job."""
+
+    index: int
+    status: str  # pending, running, completed, cached, failed
+    result: Optional[GenerateScriptResponse] = None
+    error: Optional[str] = None
+
+
+class BatchGenerateStatusResponse(BaseModel):
+    """Status of a batch generation job."""
+
+    job_id: str
+    file_id: str
+    status: str  # processing, completed, failed
+    progress: int
+    message: str
+    variants: List[BatchVariantStatus]
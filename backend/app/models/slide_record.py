@@ -0,0 +1,134 @@
+"""
+Compact in-memory representation of parsed slides.
+
+Parsed decks stay resident in the state manager for as long as the file is
+alive, so slides are kept as __slots__ objects with tuple storage instead of
+nested dicts and lists. They are converted to the SlideData API schema only
+when a response is built.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+
+class TableData(NamedTuple):
+    """A table on a slide; content is a tuple of rows of cell text"""
+    rows: int
+    cols: int
+    content: Tuple[Tuple[str, ...], ...]
+
+
+class SlideRecord:
+    """One parsed slide (slide_no/title/bullets/tables/notes/image_count)"""
+
+    __slots__ = ("slide_no", "title", "bullets", "tables", "notes", "image_count")
+
+    def __init__(
+        self,
+        slide_no: int,
+        title: str = "",
+        bullets: Tuple[str, ...] = (),
+        tables: Tuple[TableData, ...] = (),
+        notes: str = "",
+        image_count: int = 0,
+    ):
+        self.slide_no = slide_no
+        self.title = title
+        self.bullets = bullets
+        self.tables = tables
+        self.notes = notes
+        self.image_count = image_count
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], pool: Optional[Dict[str, str]] = None) -> "SlideRecord":
+        """
+        Build a record from the parser/API dict layout.
+
+        Args:
+            data: Dict with slide_no/title/bullets/tables/notes/image_count
+            pool: Optional per-deck string pool; repeated bullet and cell text
+                  (footers, labels) then share a single str object
+        """
+        share = pool.setdefault if pool is not None else (lambda s, _: s)
+        return cls(
+            slide_no=data.get("slide_no", 0),
+            title=data.get("title", ""),
+            bullets=tuple(share(b, b) for b in data.get("bullets", ())),
+            tables=tuple(
+                TableData(
+                    t.get("rows", 0),
+                    t.get("cols", 0),
+                    tuple(tuple(share(c, c) for c in row) for row in t.get("content", ())),
+                )
+                for t in data.get("tables", ())
+            ),
+            notes=data.get("notes", ""),
+            image_count=data.get("image_count", 0),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the SlideData API layout"""
+        return {
+            "slide_no": self.slide_no,
+            "title": self.title,
+            "bullets": list(self.bullets),
+            "tables": [
+                {"rows": t.rows, "cols": t.cols, "content": [list(row) for row in t.content]}
+                for t in self.tables
+            ],
+            "notes": self.notes,
+            "image_count": self.image_count,
+        }
+
+    def to_row(self) -> list:
+        """Positional, key-free layout for compact storage (see from_row)"""
+        return [
+            self.slide_no,
+            self.title,
+            list(self.bullets),
+            [[t.rows, t.cols, [list(row) for row in t.content]] for t in self.tables],
+            self.notes,
+            self.image_count,
+        ]
+
+    @classmethod
+    def from_row(cls, row: list, pool: Optional[Dict[str, str]] = None) -> "SlideRecord":
+        """Inverse of to_row"""
+        share = pool.setdefault if pool is not None else (lambda s, _: s)
+        slide_no, title, bullets, tables, notes, image_count = row
+        return cls(
+            slide_no,
+            title,
+            tuple(share(b, b) for b in bullets),
+            tuple(
+                TableData(rows, cols, tuple(tuple(share(c, c) for c in r) for r in content))
+                for rows, cols, content in tables
+            ),
+            notes,
+            image_count,
+        )
+
+    def content_fingerprint(self) -> str:
+        """Hash of the text a script is written from (title, bullets, tables, notes), independent of position"""
+        content = [self.title, list(self.bullets), [[list(row) for row in t.content] for t in self.tables], self.notes]
+        return hashlib.sha1(json.dumps(content, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def with_slide_no(self, slide_no: int) -> "SlideRecord":
+        """Copy with a different slide number (content tuples are shared)"""
+        return SlideRecord(slide_no, self.title, self.bullets, self.tables, self.notes, self.image_count)
+
+    def _key(self) -> tuple:
+        return (self.slide_no, self.title, self.bullets, self.tables, self.notes, self.image_count)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SlideRecord):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __repr__(self) -> str:
+        return f"SlideRecord(slide_no={self.slide_no}, title={self.title!r}, bullets={len(self.bullets)})"
+
+
+def to_api_slides(records: Iterable[SlideRecord]) -> list:
+    """Convert records to SlideData-shaped dicts at the API edge"""
+    return [record.to_dict() for record in records]
@@ -0,0 +1,377 @@
+"""
+Legacy .ppt -> .pptx conversion through a pool of headless LibreOffice workers.
+
+python-pptx (and the XML parser) only read OOXML, so binary .ppt uploads are
+converted first. Each worker owns a LibreOffice user profile and a
+long-lived soffice process listening on its own port, so conversions skip
+LibreOffice's cold start:
+- "uno" mode (the `uno` bindings are importable): this process drives
+  soffice over UNO directly;
+- "unoserver" mode (the `unoserver` and `unoconvert` commands are on PATH,
+  e.g. installed into LibreOffice's bundled Python): each worker runs a
+  unoserver, and jobs are sent to it with unoconvert.
+Only when neither is available ("cli" mode) does each job start a cold
+`soffice --convert-to`, reusing just the worker's profile. Results are
+cached by the content hash of the .ppt bytes.
+"""
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    HAS_UNO = True
+except ImportError:
+    HAS_UNO = False
+
+PPTX_FILTER = "Impress MS PowerPoint 2007 XML"
+
+# unoserver's XML-RPC port is the worker's UNO port plus this offset
+UNOSERVER_PORT_OFFSET = 1000
+
+# Common install locations checked when soffice is not on PATH
+SOFFICE_CANDIDATES = [
+    r"C:\Program Files\LibreOffice\program\soffice.exe",
+    r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+    "/usr/bin/soffice",
+    "/usr/lib/libreoffice/program/soffice",
+    "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+]
+
+
+class ConversionError(Exception):
+    """Raised when a legacy .ppt file cannot be converted."""
+
+    def __init__(self, message: str, transient: bool = False):
+        super().__init__(message)
+        # True for failures a later attempt may not hit (busy pool, timeout, worker start-up)
+        self.transient = transient
+
+
+def converter_mode() -> str:
+    """Conversion mode available here: uno, unoserver or cli (see the module docstring)"""
+    if HAS_UNO:
+        return "uno"
+    if shutil.which("unoserver") and shutil.which("unoconvert"):
+        return "unoserver"
+    return "cli"
+
+
+def find_soffice(configured: str = "") -> Optional[str]:
+    """Locate the soffice executable"""
+    if configured:
+        return configured if Path(configured).exists() else shutil.which(configured)
+    for name in ("soffice", "libreoffice"):
+        found = shutil.which(name)
+        if found:
+            return found
+    for candidate in SOFFICE_CANDIDATES:
+        if Path(candidate).exists():
+            return candidate
+    return None
+
+
+class _ConverterWorker:
+    """One LibreOffice instance with its own user profile"""
+
+    def __init__(self, soffice: str, profile_dir: Path, port: int, mode: str = "cli"):
+        self.soffice = soffice
+        self.profile_dir = profile_dir
+        self.port = port
+        self.mode = mode
+        self.process: Optional[subprocess.Popen] = None
+        self.desktop = None
+
+    @property
+    def _server_port(self) -> int:
+        return self.port + UNOSERVER_PORT_OFFSET
+
+    @property
+    def _pid_file(self) -> Path:
+        return self.profile_dir / "soffice.pid"
+
+    @property
+    def _profile_arg(self) -> str:
+        return f"-env:UserInstallation={self.profile_dir.resolve().as_uri()}"
+
+    def start(self, startup_timeout: float):
+        """Start the worker's listening soffice (uno and unoserver modes)"""
+        if self.mode == "unoserver":
+            self._start_unoserver(startup_timeout)
+            return
+        if self.mode != "uno" or self.desktop is not None:
+            return
+        self.process = subprocess.Popen(
+            [
+                self.soffice, self._profile_arg, "--headless", "--invisible", "--nologo",
+                "--norestore", "--nodefault", "--nolockcheck",
+                f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.time() + startup_timeout
+        while True:
+            try:
+                ctx = resolver.resolve(
+                    f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+                )
+                self.desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+                print(f"[PPTConverter] Worker on port {self.port} ready")
+                return
+            except Exception:
+                if time.time() > deadline or self.process.poll() is not None:
+                    self.stop()
+                    raise ConversionError(f"LibreOffice worker on port {self.port} failed to start", transient=True)
+                time.sleep(0.25)
+
+    def _start_unoserver(self, startup_timeout: float):
+        """Start unoserver (which starts soffice) and wait until it accepts connections"""
+        if self.process is not None and self.process.poll() is None:
+            return
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        self.process = subprocess.Popen(
+            [
+                "unoserver", "--interface", "127.0.0.1", "--port", str(self._server_port),
+                "--uno-port", str(self.port), "--executable", self.soffice,
+                "--user-installation", str(self.profile_dir.resolve()),
+                "--libreoffice-pid-file", str(self._pid_file),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.time() + startup_timeout
+        while True:
+            try:
+                with socket.create_connection(("127.0.0.1", self._server_port), timeout=1):
+                    print(f"[PPTConverter] unoserver on port {self._server_port} ready")
+                    return
+            except OSError:
+                if time.time() > deadline or self.process.poll() is not None:
+                    self.stop()
+                    raise ConversionError(
+                        f"unoserver on port {self._server_port} failed to start", transient=True
+                    )
+                time.sleep(0.25)
+
+    def stop(self):
+        self.desktop = None
+        if self.process is not None:
+            try:
+                if self.mode == "unoserver":
+                    self.process.terminate()  # unoserver passes SIGTERM on to its soffice
+                else:
+                    self.process.kill()
+                self.process.wait(timeout=10)
+            except Exception:
+                try:
+                    self.process.kill()
+                except Exception:
+                    pass
+            self.process = None
+        if self.mode == "unoserver":
+            self._stop_orphaned_soffice()
+
+    def _stop_orphaned_soffice(self):
+        """End a soffice left behind by unoserver (e.g. killed without forwarding the signal)"""
+        try:
+            pid = int(self._pid_file.read_text().strip())
+            self._pid_file.unlink()
+        except (OSError, ValueError):
+            return
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass  # already gone
+
+    def convert(self, src: Path, dst: Path, timeout: float, startup_timeout: float):
+        if self.mode == "uno":
+            self._convert_uno(src, dst, timeout, startup_timeout)
+        elif self.mode == "unoserver":
+            self._convert_unoserver(src, dst, timeout, startup_timeout)
+        else:
+            self._convert_cli(src, dst, timeout)
+
+    def _convert_uno(self, src: Path, dst: Path, timeout: float, startup_timeout: float):
+        self.start(startup_timeout)
+        error: List[Exception] = []
+
+        def run():
+            try:
+                hidden = PropertyValue(Name="Hidden", Value=True)
+                doc = self.desktop.loadComponentFromURL(src.resolve().as_uri(), "_blank", 0, (hidden,))
+                if doc is None:
+                    raise ConversionError("LibreOffice could not open the file")
+                try:
+                    pptx_filter = PropertyValue(Name="FilterName", Value=PPTX_FILTER)
+                    doc.storeToURL(dst.resolve().as_uri(), (pptx_filter,))
+                finally:
+                    doc.close(True)
+            except Exception as exc:
+                error.append(exc)
+
+        # UNO calls have no timeout of their own; a hung job is ended by killing the worker
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            self.stop()
+            raise ConversionError(f"Conversion timed out after {timeout:.0f}s", transient=True)
+        if error:
+            self.stop()  # restart on next job in case the instance is unhealthy
+            raise ConversionError(str(error[0]))
+
+    def _convert_unoserver(self, src: Path, dst: Path, timeout: float, startup_timeout: float):
+        self.start(startup_timeout)
+        try:
+            completed = subprocess.run(
+                [
+                    "unoconvert", "--host", "127.0.0.1", "--port", str(self._server_port),
+                    "--convert-to", "pptx", str(src.resolve()), str(dst.resolve()),
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=timeout,
+                check=False,
+            )
+        except subprocess.TimeoutExpired:
+            self.stop()
+            raise ConversionError(f"Conversion timed out after {timeout:.0f}s", transient=True)
+        if completed.returncode != 0 or not dst.exists():
+            # Restart on next job in case the instance is unhealthy
+            self.stop()
+            detail = completed.stderr.decode("utf-8", "replace").strip().splitlines()
+            raise ConversionError(detail[-1] if detail else "LibreOffice did not produce a .pptx file")
+
+    def _convert_cli(self, src: Path, dst: Path, timeout: float):
+        with tempfile.TemporaryDirectory(dir=dst.parent) as outdir:
+            try:
+                subprocess.run(
+                    [
+                        self.soffice, self._profile_arg, "--headless", "--norestore", "--nolockcheck",
+                        "--convert-to", "pptx", "--outdir", outdir, str(src),
+                    ],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    timeout=timeout,
+                    check=False,
+                )
+            except subprocess.TimeoutExpired:
+                raise ConversionError(f"Conversion timed out after {timeout:.0f}s", transient=True)
+            produced = Path(outdir) / f"{src.stem}.pptx"
+            if not produced.exists():
+                raise ConversionError("LibreOffice did not produce a .pptx file")
+            os.replace(produced, dst)
+
+
+class LegacyPPTConverter:
+    """
+    Convert .ppt to .pptx with a bounded pool of LibreOffice workers.
+    Thread-safe; callers block until a worker is free.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        workers: int = 2,
+        timeout: float = 120,
+        soffice_path: str = "",
+        base_port: int = 2002,
+        startup_timeout: float = 60,
+        first_slot: int = 0,
+    ):
+        """
+        Args:
+            workers: LibreOffice instances in this pool
+            first_slot: Slot of the first instance; slot n listens on base_port + n and
+                        uses profiles/worker<n>. Every converter on a host (the API and
+                        each job worker process) needs its own range of slots.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.soffice_path = soffice_path
+        self.base_port = base_port
+        self.first_slot = first_slot
+        self._pool: Optional[queue.Queue] = None
+        self._all_workers: List[_ConverterWorker] = []
+        self._pool_lock = threading.Lock()
+
+    def cached_path(self, content_hash: str) -> Path:
+        return self.cache_dir / f"{content_hash}.pptx"
+
+    def _get_pool(self) -> queue.Queue:
+        with self._pool_lock:
+            if self._pool is None:
+                soffice = find_soffice(self.soffice_path)
+                if not soffice:
+                    raise ConversionError(
+                        "LibreOffice (soffice) not found; install it or set LIBREOFFICE_PATH to convert .ppt files"
+                    )
+                mode = converter_mode()
+                pool: queue.Queue = queue.Queue()
+                for slot in range(self.first_slot, self.first_slot + self.workers):
+                    profile_dir = self.cache_dir / "profiles" / f"worker{slot}"
+                    worker = _ConverterWorker(soffice, profile_dir, self.base_port + slot, mode)
+                    self._all_workers.append(worker)
+                    pool.put(worker)
+                self._pool = pool
+                print(f"[PPTConverter] {self.workers} LibreOffice workers ({mode} mode) using {soffice}")
+                if mode == "cli":
+                    print("[PPTConverter] Neither uno nor unoserver found; each conversion starts a new soffice")
+            return self._pool
+
+    def convert(self, ppt_path: str, content_hash: str) -> str:
+        """
+        Return the path of a .pptx equivalent of ppt_path, converting if needed.
+
+        Raises:
+            ConversionError: If LibreOffice is unavailable, fails or times out
+        """
+        target = self.cached_path(content_hash)
+        if target.exists():
+            return str(target)
+
+        pool = self._get_pool()
+        try:
+            worker = pool.get(timeout=self.timeout)
+        except queue.Empty:
+            raise ConversionError("All converter workers are busy", transient=True)
+
+        try:
+            if target.exists():  # converted by another job while waiting
+                return str(target)
+            start_time = time.time()
+            tmp_target = self.cache_dir / f".{uuid.uuid4().hex}.pptx"
+            try:
+                worker.convert(Path(ppt_path), tmp_target, self.timeout, self.startup_timeout)
+                os.replace(tmp_target, target)
+            finally:
+                if tmp_target.exists():
+                    tmp_target.unlink()
+            print(f"[PPTConverter] Converted {Path(ppt_path).name} in {time.time() - start_time:.2f}s")
+            return str(target)
+        finally:
+            pool.put(worker)
+
+    def shutdown(self):
+        """Stop all long-lived LibreOffice processes"""
+        with self._pool_lock:
+            for worker in self._all_workers:
+                worker.stop()
+            self._all_workers = []
+            self._pool = None
@@ -1,20 +1,218 @@
 from pptx import Presentation
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Iterator, NamedTuple, Optional, Tuple
 from pathlib import Path
+import os
+import threading
 import time
 
+from app.models.slide_record import SlideRecord
+from .ppt_xml_reader import XmlSlidePackage, extract_slide_range
+
+
+class ParsedSlide(NamedTuple):
+    """逐頁解析的結果與進度"""
+    slide: SlideRecord   # 投影片內容 (slide_no/title/bullets/tables/notes/image_count)
+    part_hash: str       # 投影片指紋 (python-pptx 引擎為空字串)
+    position: int        # 已處理的投影片 part 數 (含隱藏投影片)
+    total: int           # 投影片 part 總數 (含隱藏投影片)
+
 class PPTParser:
     """解析 PowerPoint 文件並提取結構化內容 - 極限優化版"""
     
-    def parse(self, ppt_path: str) -> List[Dict]:
+    # 可用的解析引擎: "xml" 直接讀取 zip 內的 XML part, "pptx" 使用 python-pptx 物件模型
+    ENGINES = ("xml", "pptx")
+    
+    # 萃取規則或 part_hashes 計算方式變更時需遞增，讓舊的解析快取失效
+    # 2: part_hash 納入版面配置/母片 part 與投影片高度
+    VERSION = "2"
+    
+    def __init__(self, engine: str = "xml", parallel_min_slides: int = 200, max_workers: int = 0):
+        """
+        Args:
+            engine: 解析引擎 ("xml" 或 "pptx")
+            parallel_min_slides: 投影片數達此門檻時改用多進程平行解析 (僅 xml 引擎，0 = 停用)
+            max_workers: 平行解析的進程數上限 (0 = CPU 核心數)
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown parser engine: {engine}")
+        self.engine = engine
+        self.parallel_min_slides = parallel_min_slides
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+    
+    def shutdown(self):
+        """關閉平行解析用的進程池"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # 進程池延遲建立並重複使用，避免每份檔案都付出啟動成本
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+    
+    def _use_parallel(self, slide_count: int) -> bool:
+        return (
+            self.parallel_min_slides > 0
+            and self.max_workers > 1
+            and slide_count >= self.parallel_min_slides
+        )
+    
+    def parse(self, ppt_path: str) -> List[SlideRecord]:
         """
         解析 PPT 並提取所有投影片的內容
         """
-        start_time = time.time()
+        return self.parse_incremental(ppt_path)["slides"]
+    
+    def parse_incremental(self, ppt_path: str, previous: Optional[Dict] = None) -> Dict:
+        """
+        解析 PPT，並沿用前一版本中內容未變的投影片
+        
+        Args:
+            ppt_path: PPT 檔案路徑
+            previous: 前一版本的解析結果 {'slides': [SlideRecord, ...], 'part_hashes': [...]}
+            
+        Returns:
+            {'slides': [SlideRecord, ...], 'part_hashes': [...]}，part_hashes 與 slides 一一對應
+            (python-pptx 引擎不提供指紋，part_hashes 為空)
+        """
+        slides_data = []
+        part_hashes = []
+        for parsed in self.iter_slides(ppt_path, previous):
+            slides_data.append(parsed.slide)
+            if parsed.part_hash:
+                part_hashes.append(parsed.part_hash)
+        return {"slides": slides_data, "part_hashes": part_hashes}
+    
+    def iter_slides(self, ppt_path: str, previous: Optional[Dict] = None) -> Iterator[ParsedSlide]:
+        """
+        逐頁產生解析結果，讓呼叫端可在整份檔案完成前先取得前面的投影片
         
+        Args:
+            ppt_path: PPT 檔案路徑
+            previous: 前一版本的解析結果 (見 parse_incremental)
+        """
         if not Path(ppt_path).exists():
             raise FileNotFoundError(f"PPT file not found: {ppt_path}")
         
+        if self.engine == "xml":
+            yielded = False
+            try:
+                for parsed in self._iter_xml(ppt_path, previous):
+                    yielded = True
+                    yield parsed
+                return
+            except Exception as e:
+                # 已送出部分投影片後無法切換引擎，否則頁碼會重複
+                if yielded:
+                    raise
+                # 非標準檔案 (例如缺少必要 part) 退回 python-pptx 路徑
+                print(f"[PPTParser] XML 引擎失敗，改用 python-pptx - {e}")
+        yield from self._iter_pptx(ppt_path)
+    
+    @staticmethod
+    def changed_slides(result: Dict, previous: Optional[Dict]) -> List[int]:
+        """回傳相較前一版本內容有變動 (或新增) 的投影片頁碼"""
+        if not previous or not result.get("part_hashes"):
+            return [s.slide_no for s in result["slides"]]
+        known = set(previous.get("part_hashes") or [])
+        return [
+            s.slide_no for s, part_hash in zip(result["slides"], result["part_hashes"])
+            if part_hash not in known
+        ]
+    
+    def _iter_xml(self, ppt_path: str, previous: Optional[Dict] = None) -> Iterator[ParsedSlide]:
+        """
+        快速路徑：只解壓投影片與備註的 XML，不載入任何媒體檔案
+        """
+        start_time = time.time()
+        visible_slide_no = 0
+        
+        # 同一份簡報內重複的文字 (頁尾、標籤) 共用同一個字串物件
+        pool: Dict[str, str] = {}
+        
+        # 前一版本: 指紋 -> 投影片內容
+        reusable: Dict[str, SlideRecord] = {}
+        if previous:
+            reusable = dict(zip(previous.get("part_hashes") or [], previous.get("slides") or []))
+        
+        with XmlSlidePackage(ppt_path) as package:
+            threshold = package.slide_height * 0.25
+            partnames = package.slide_partnames()
+            hashes = [package.part_hash(partname) for partname in partnames]
+            pending = [p for p, h in zip(partnames, hashes) if h not in reusable]
+            
+            # 需重新萃取的投影片依序產出 (平行模式下逐區段回傳)
+            if self._use_parallel(len(pending)):
+                extracted = self._extract_parallel(package, pending, threshold)
+            else:
+                extracted = ((p, package.extract_slide(p, threshold)) for p in pending)
+            
+            # 依原始順序合併，隱藏投影片不佔頁碼
+            total = len(partnames)
+            for position, part_hash in enumerate(hashes, start=1):
+                if part_hash in reusable:
+                    record = reusable[part_hash]
+                else:
+                    _, raw = next(extracted)
+                    record = SlideRecord.from_dict(raw, pool) if raw is not None else None
+                if record is None:
+                    continue
+                
+                visible_slide_no += 1
+                yield ParsedSlide(record.with_slide_no(visible_slide_no), part_hash, position, total)
+                
+                if visible_slide_no % 50 == 0:
+                    print(f"[PPTParser] 已處理 {visible_slide_no} 頁...")
+        
+        elapsed = time.time() - start_time
+        if previous:
+            print(f"[PPTParser] 沿用前版 {len(partnames) - len(pending)} 頁, 重新讀取 {len(pending)} 頁")
+        print(f"[PPTParser] 完成 (xml)! 總計 {visible_slide_no} 頁, 耗時 {elapsed:.2f}s")
+    
+    def _extract_parallel(
+        self, package: XmlSlidePackage, partnames: List[str], threshold: float
+    ) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """
+        將投影片 part 切成連續區段交給進程池，每個 worker 自行開啟 zip 萃取
+        """
+        # 區段數為進程數的兩倍，讓較慢的區段不會拖住整體
+        chunk_count = min(len(partnames), self.max_workers * 2)
+        chunk_size = -(-len(partnames) // chunk_count)
+        chunks = [partnames[i:i + chunk_size] for i in range(0, len(partnames), chunk_size)]
+        print(f"[PPTParser] 平行解析 {len(partnames)} 頁 ({len(chunks)} 區段, {self.max_workers} 進程)")
+        
+        done = 0
+        try:
+            pool = self._get_pool()
+            results = pool.map(
+                extract_slide_range,
+                [package.ppt_path] * len(chunks),
+                chunks,
+                [threshold] * len(chunks),
+            )
+            # map 依序回傳，前面的區段完成即可先送出
+            for chunk, records in zip(chunks, results):
+                yield from zip(chunk, records)
+                done += len(chunk)
+        except Exception as e:
+            # 進程池損壞時重建，剩餘投影片改為單進程解析
+            print(f"[PPTParser] 平行解析失敗，改用單進程 - {e}")
+            self.shutdown()
+            for partname in partnames[done:]:
+                yield partname, package.extract_slide(partname, threshold)
+    
+    def _iter_pptx(self, ppt_path: str) -> Iterator[ParsedSlide]:
+        """
+        相容路徑：透過 python-pptx 物件模型解析
+        """
+        start_time = time.time()
+        
         try:
             # 讀取 Presentation 是最耗時的一步 (I/O 密集)
             prs = Presentation(ppt_path)
@@ -22,13 +220,14 @@ class PPTParser:
             print(f"[PPTParser] ERROR: 無法讀取 PPT 檔案 - {e}")
             raise
             
-        slides_data = []
         slide_height = prs.slide_height
         visible_slide_no = 0
         
         # 預計算 threshold
         threshold = slide_height * 0.25
         
+        pool: Dict[str, str] = {}
+        total = len(prs.slides)
         for i, slide in enumerate(prs.slides):
             # 檢查是否為隱藏投影片
             if slide.element.get('show') == '0' or slide.element.get('show') == 'false':
@@ -111,30 +310,29 @@ class PPTParser:
                     notes = slide.notes_slide.notes_text_frame.text.strip()
             except: pass
             
-            slides_data.append({
+            yield ParsedSlide(SlideRecord.from_dict({
                 'slide_no': visible_slide_no,
                 'title': title,
                 'bullets': bullets,
                 'tables': tables,
                 'notes': notes,
                 'image_count': image_count
-            })
+            }, pool), "", i + 1, total)
             
             # 每 50 頁列印一次進度，避免大檔案讓用戶覺得死機
             if visible_slide_no % 50 == 0:
                 print(f"[PPTParser] 已處理 {visible_slide_no} 頁...")
         
         elapsed = time.time() - start_time
-        print(f"[PPTParser] 完成! 總計 {len(slides_data)} 頁, 耗時 {elapsed:.2f}s")
-        return slides_data
+        print(f"[PPTParser] 完成! 總計 {visible_slide_no} 頁, 耗時 {elapsed:.2f}s")
     
-    def get_summary(self, slides_data: List[Dict]) -> Dict:
+    def get_summary(self, slides_data: List[SlideRecord]) -> Dict:
         """取得 PPT 摘要資訊 (O(N) 遍歷)"""
         return {
             'total_slides': len(slides_data),
-            'titled_slides': sum(1 for s in slides_data if s['title']),
-            'total_bullets': sum(len(s['bullets']) for s in slides_data),
-            'slides_with_notes': sum(1 for s in slides_data if s['notes']),
-            'slides_with_tables': sum(1 for s in slides_data if s['tables']),
-            'total_images': sum(s['image_count'] for s in slides_data)
+            'titled_slides': sum(1 for s in slides_data if s.title),
+            'total_bullets': sum(len(s.bullets) for s in slides_data),
+            'slides_with_notes': sum(1 for s in slides_data if s.notes),
+            'slides_with_tables': sum(1 for s in slides_data if s.tables),
+            'total_images': sum(s.image_count for s in slides_data)
         }
@@ -0,0 +1,412 @@
+"""
+直接以 zipfile + lxml 讀取 PPTX 投影片 XML 的快速解析引擎。
+
+只解壓 presentation / slide / layout / master / notes 等 XML part，
+影片、音訊、圖片等媒體 blob 完全不會被讀取。輸出格式與
+python-pptx 路徑 (PPTParser) 相同。
+"""
+import hashlib
+import posixpath
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+from lxml import etree
+
+# OOXML 命名空間
+NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+TABLE_URI = "http://schemas.openxmlformats.org/drawingml/2006/table"
+
+_P = "{%s}" % NS_P
+_A = "{%s}" % NS_A
+
+# spTree 內 python-pptx 視為「形狀」的元素
+SHAPE_TAGS = {_P + "sp", _P + "grpSp", _P + "graphicFrame", _P + "cxnSp", _P + "pic", _P + "contentPart"}
+
+# python-pptx 版面配置 → 母片 placeholder 類型對應 (LayoutPlaceholder._base_placeholder)
+LAYOUT_TO_MASTER_PH_TYPE = {
+    "body": "body", "chart": "body", "clipArt": "body", "ctrTitle": "title",
+    "dgm": "body", "dt": "dt", "ftr": "ftr", "media": "body", "obj": "body",
+    "pic": "body", "sldNum": "sldNum", "subTitle": "body", "tbl": "body",
+    "title": "title",
+}
+
+TITLE_PH_TYPES = ("title", "ctrTitle")
+
+
+def _truthy(value: Optional[str]) -> bool:
+    return value in ("1", "true")
+
+
+def _resolve(base_partname: str, target: str) -> str:
+    """將 relationship target 轉為 zip 內的絕對 part 名稱"""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base_partname), target))
+
+
+def _rels_name(partname: str) -> str:
+    directory, filename = posixpath.split(partname)
+    return posixpath.join(directory, "_rels", filename + ".rels")
+
+
+def _ph(elm) -> Optional[etree._Element]:
+    """回傳形狀的 p:ph (位於第一個子元素 nvXxPr/nvPr 之下)"""
+    if len(elm) == 0:
+        return None
+    nv = elm[0]
+    nvPr = nv.find(_P + "nvPr")
+    if nvPr is None:
+        return None
+    return nvPr.find(_P + "ph")
+
+
+def _ph_type(ph) -> str:
+    return ph.get("type", "obj")
+
+
+def _ph_idx(ph) -> int:
+    return int(ph.get("idx", "0"))
+
+
+def _offset_y(elm) -> Optional[int]:
+    """直接套用在形狀上的 top (a:xfrm/a:off/@y)，無則為 None"""
+    tag = elm.tag
+    if tag == _P + "graphicFrame":
+        xfrm = elm.find(_P + "xfrm")
+    elif tag == _P + "grpSp":
+        xfrm = elm.find(_P + "grpSpPr/" + _A + "xfrm")
+    else:
+        xfrm = elm.find(_P + "spPr/" + _A + "xfrm")
+    if xfrm is None:
+        return None
+    off = xfrm.find(_A + "off")
+    if off is None or off.get("y") is None:
+        return None
+    return int(off.get("y"))
+
+
+def _paragraph_text(p) -> str:
+    parts = []
+    for child in p:
+        tag = child.tag
+        if tag == _A + "r" or tag == _A + "fld":
+            t = child.find(_A + "t")
+            parts.append((t.text or "") if t is not None else "")
+        elif tag == _A + "br":
+            parts.append("\v")
+    return "".join(parts)
+
+
+def _text_body_text(txBody) -> str:
+    """等同 python-pptx TextFrame.text：段落以 \\n 連接、換行符號為 \\v"""
+    if txBody is None:
+        return ""
+    return "\n".join(_paragraph_text(p) for p in txBody.iterchildren(_A + "p"))
+
+
+def _first_run_size(txBody) -> int:
+    """第一段第一個 run 的字體大小 (EMU，與 python-pptx font.size 相同單位)"""
+    if txBody is None:
+        return 0
+    p = txBody.find(_A + "p")
+    if p is None:
+        return 0
+    r = p.find(_A + "r")
+    if r is None:
+        return 0
+    rPr = r.find(_A + "rPr")
+    if rPr is None or rPr.get("sz") is None:
+        return 0
+    return int(rPr.get("sz")) * 127
+
+
+def _shape_elms(root) -> List[etree._Element]:
+    spTree = root.find(_P + "cSld/" + _P + "spTree")
+    if spTree is None:
+        return []
+    return [e for e in spTree if e.tag in SHAPE_TAGS]
+
+
+class XmlSlidePackage:
+    """
+    PPTX 套件的唯讀視圖，只開啟投影片相關的 XML part。
+
+    layout / master 的 placeholder 位置會依 part 快取，供標題判斷時
+    模擬 python-pptx 的 placeholder 尺寸繼承。
+    """
+
+    def __init__(self, ppt_path: str):
+        self.ppt_path = ppt_path
+        self._zip = zipfile.ZipFile(ppt_path)
+        self._rels_cache: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        self._layout_cache: Dict[str, Tuple[List[Tuple[int, Optional[int], Optional[str]]], Optional[str]]] = {}
+        self._master_cache: Dict[str, List[Tuple[str, Optional[int]]]] = {}
+        self.presentation_part = self._find_presentation_part()
+        self._presentation = etree.fromstring(self.read_part(self.presentation_part))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    # ---- 套件層級 ----
+    def read_part(self, partname: str) -> bytes:
+        return self._zip.read(partname)
+
+    def has_part(self, partname: str) -> bool:
+        try:
+            self._zip.getinfo(partname)
+            return True
+        except KeyError:
+            return False
+
+    def rels(self, partname: str) -> Dict[str, Tuple[str, str]]:
+        """rId -> (relationship type, 目標 part 名稱)；外部連結會被略過"""
+        cached = self._rels_cache.get(partname)
+        if cached is not None:
+            return cached
+        result: Dict[str, Tuple[str, str]] = {}
+        rels_name = _rels_name(partname) if partname else "_rels/.rels"
+        if self.has_part(rels_name):
+            root = etree.fromstring(self.read_part(rels_name))
+            for rel in root.iterchildren("{%s}Relationship" % NS_PKG_RELS):
+                if rel.get("TargetMode") == "External":
+                    continue
+                result[rel.get("Id")] = (rel.get("Type", ""), _resolve(partname, rel.get("Target", "")))
+        self._rels_cache[partname] = result
+        return result
+
+    def related_part(self, partname: str, reltype_suffix: str) -> Optional[str]:
+        for reltype, target in self.rels(partname).values():
+            if reltype.endswith(reltype_suffix):
+                return target
+        return None
+
+    def _find_presentation_part(self) -> str:
+        target = self.related_part("", "/officeDocument")
+        return target or "ppt/presentation.xml"
+
+    @property
+    def slide_height(self) -> int:
+        sldSz = self._presentation.find(_P + "sldSz")
+        if sldSz is None or sldSz.get("cy") is None:
+            raise ValueError("presentation.xml 缺少 p:sldSz")
+        return int(sldSz.get("cy"))
+
+    def slide_partnames(self) -> List[str]:
+        """依簡報順序 (p:sldIdLst) 回傳所有投影片 part 名稱 (含隱藏投影片)"""
+        rels = self.rels(self.presentation_part)
+        sldIdLst = self._presentation.find(_P + "sldIdLst")
+        if sldIdLst is None:
+            return []
+        partnames = []
+        for sldId in sldIdLst.iterchildren(_P + "sldId"):
+            rel = rels.get(sldId.get("{%s}id" % NS_R))
+            if rel is not None:
+                partnames.append(rel[1])
+        return partnames
+
+    def _part_fingerprint(self, partname: Optional[str]) -> str:
+        # zip 目錄內已記錄 CRC32 與大小，不需解壓即可得知內容是否變動
+        if partname is None or not self.has_part(partname):
+            return "-"
+        info = self._zip.getinfo(partname)
+        return f"{info.CRC:08x}:{info.file_size:x}"
+
+    def part_hash(self, slide_partname: str) -> str:
+        """
+        投影片指紋：投影片 XML 與其備註、版面配置、母片 part 的 CRC32/大小，以及投影片高度。
+        版面配置與母片會影響標題判斷 (placeholder 位置繼承)，投影片高度決定標題位置門檻，因此一併納入。
+        (不納入整個 presentation.xml，否則新增或刪除任一投影片就會讓所有投影片失效)
+        """
+        layout_part = self.related_part(slide_partname, "/slideLayout")
+        master_part = self.related_part(layout_part, "/slideMaster") if layout_part else None
+        fingerprint = "|".join(
+            [self._part_fingerprint(partname)
+             for partname in (slide_partname, self.notes_partname(slide_partname), layout_part, master_part)]
+            + [f"h{self.slide_height:x}"]
+        )
+        return hashlib.sha1(fingerprint.encode("ascii")).hexdigest()
+
+    # ---- placeholder 繼承 ----
+    def _master_placeholders(self, partname: str) -> List[Tuple[str, Optional[int]]]:
+        cached = self._master_cache.get(partname)
+        if cached is None:
+            root = etree.fromstring(self.read_part(partname))
+            cached = []
+            for elm in _shape_elms(root):
+                ph = _ph(elm)
+                if ph is not None:
+                    cached.append((_ph_type(ph), _offset_y(elm)))
+            self._master_cache[partname] = cached
+        return cached
+
+    def _layout_placeholders(self, partname: str):
+        cached = self._layout_cache.get(partname)
+        if cached is None:
+            root = etree.fromstring(self.read_part(partname))
+            placeholders = []
+            for elm in _shape_elms(root):
+                ph = _ph(elm)
+                if ph is None:
+                    continue
+                # 只有 p:sp 的 layout placeholder 會再往母片繼承
+                inherit_type = _ph_type(ph) if elm.tag == _P + "sp" else None
+                placeholders.append((_ph_idx(ph), _offset_y(elm), inherit_type))
+            master = self.related_part(partname, "/slideMaster")
+            cached = (placeholders, master)
+            self._layout_cache[partname] = cached
+        return cached
+
+    def _inherited_top(self, layout_part: Optional[str], idx: int) -> Optional[int]:
+        """slide placeholder 沒有 xfrm 時，依 layout → master 取得 top"""
+        if layout_part is None:
+            return None
+        placeholders, master_part = self._layout_placeholders(layout_part)
+        for ph_idx, top, inherit_type in placeholders:
+            if ph_idx != idx:
+                continue
+            if top is not None or inherit_type is None:
+                return top
+            base_type = LAYOUT_TO_MASTER_PH_TYPE.get(inherit_type, inherit_type)
+            if master_part is None:
+                return None
+            for master_type, master_top in self._master_placeholders(master_part):
+                if master_type == base_type:
+                    return master_top
+            return None
+        return None
+
+    # ---- 投影片萃取 ----
+    @staticmethod
+    def is_hidden(slide_root) -> bool:
+        return slide_root.get("show") in ("0", "false")
+
+    def extract_slide(self, partname: str, threshold: float) -> Optional[Dict]:
+        """
+        萃取單一投影片的內容，隱藏投影片回傳 None。
+        回傳的 slide_no 為 0，由呼叫端填入可見頁碼。
+        """
+        root = etree.fromstring(self.read_part(partname))
+        if self.is_hidden(root):
+            return None
+        record = self.extract_slide_root(partname, root, threshold)
+        record["notes"] = self.extract_notes(partname)
+        return record
+
+    def extract_slide_root(self, partname: str, root, threshold: float) -> Dict:
+        title = ""
+        bullets: List[str] = []
+        tables: List[Dict] = []
+        image_count = 0
+        candidate_titles = []
+        layout_part = self.related_part(partname, "/slideLayout")
+
+        for elm in _shape_elms(root):
+            tag = elm.tag
+            ph = _ph(elm)
+
+            # 1. 圖片計數 (含音訊與圖片 placeholder；一般影片為 MEDIA 不計)
+            if tag == _P + "pic":
+                if ph is not None or elm.find(_P + "nvPicPr/" + _P + "nvPr/" + _A + "videoFile") is None:
+                    image_count += 1
+                continue
+
+            # 2. 表格提取
+            if tag == _P + "graphicFrame":
+                graphicData = elm.find(_A + "graphic/" + _A + "graphicData")
+                if graphicData is not None and graphicData.get("uri") == TABLE_URI:
+                    tbl = graphicData.find(_A + "tbl")
+                    if tbl is not None:
+                        rows = list(tbl.iterchildren(_A + "tr"))
+                        tables.append({
+                            'rows': len(rows),
+                            'cols': len(tbl.findall(_A + "tblGrid/" + _A + "gridCol")),
+                            'content': [
+                                [_text_body_text(tc.find(_A + "txBody")).strip() for tc in tr.iterchildren(_A + "tc")]
+                                for tr in rows
+                            ]
+                        })
+                continue
+
+            # 3. 文字內容 (只有 p:sp 具備文字框)
+            if tag != _P + "sp":
+                continue
+            if ph is None:
+                spPr = elm.find(_P + "spPr")
+                cNvSpPr = elm.find(_P + "nvSpPr/" + _P + "cNvSpPr")
+                has_geometry = spPr is not None and (
+                    spPr.find(_A + "custGeom") is not None or spPr.find(_A + "prstGeom") is not None
+                )
+                is_textbox = cNvSpPr is not None and _truthy(cNvSpPr.get("txBox"))
+                # python-pptx 無法判斷類型的形狀會被略過
+                if not has_geometry and not is_textbox:
+                    continue
+
+            txBody = elm.find(_P + "txBody")
+            text = _text_body_text(txBody).strip()
+            if not text:
+                continue
+
+            if ph is not None and _ph_type(ph) in TITLE_PH_TYPES:
+                if not title:
+                    title = text
+                continue
+
+            top = _offset_y(elm)
+            if top is None and ph is not None:
+                top = self._inherited_top(layout_part, _ph_idx(ph))
+            if top is None:
+                # 與 python-pptx 路徑一致：無法取得位置的形狀整個略過
+                continue
+
+            if top < threshold and len(text) > 1:
+                candidate_titles.append({"text": text, "top": top, "fsize": _first_run_size(txBody)})
+
+            if len(text) > 1:
+                bullets.extend(l.strip() for l in text.split('\n') if l.strip())
+
+        if not title and candidate_titles:
+            candidate_titles.sort(key=lambda x: (-x['fsize'], x['top']))
+            title = candidate_titles[0]['text']
+
+        return {
+            'slide_no': 0,
+            'title': title,
+            'bullets': bullets,
+            'tables': tables,
+            'notes': "",
+            'image_count': image_count
+        }
+
+    def notes_partname(self, slide_partname: str) -> Optional[str]:
+        return self.related_part(slide_partname, "/notesSlide")
+
+    def extract_notes(self, slide_partname: str) -> str:
+        notes_part = self.notes_partname(slide_partname)
+        if notes_part is None or not self.has_part(notes_part):
+            return ""
+        root = etree.fromstring(self.read_part(notes_part))
+        for elm in _shape_elms(root):
+            ph = _ph(elm)
+            if ph is not None and _ph_type(ph) == "body":
+                if elm.tag != _P + "sp":
+                    return ""
+                return _text_body_text(elm.find(_P + "txBody")).strip()
+        return ""
+
+
+def extract_slide_range(ppt_path: str, partnames: List[str], threshold: float) -> List[Optional[Dict]]:
+    """
+    ProcessPoolExecutor 的 worker 入口：各自開啟 zip 並萃取一段投影片。
+    回傳順序與 partnames 相同，隱藏投影片為 None。
+    """
+    with XmlSlidePackage(ppt_path) as package:
+        return [package.extract_slide(partname, threshold) for partname in partnames]
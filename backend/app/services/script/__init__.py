@@ -4,6 +4,13 @@ Modularized from the original 700-line script_generator.py
 """
 from .generator import ScriptGenerator
 from .gemini_provider import GeminiProvider, QuotaExceededError
+from .llm_provider import LLMProvider
+from .mock_provider import MockProvider
 from .parser import ScriptParser
+from .prompt_planner import PromptPlanner
+from .quota_scheduler import QuotaScheduler
 
-__all__ = ['ScriptGenerator', 'GeminiProvider', 'ScriptParser', 'QuotaExceededError']
+__all__ = [
+    'ScriptGenerator', 'LLMProvider', 'GeminiProvider', 'MockProvider', 'ScriptParser', 'PromptPlanner',
+    'QuotaScheduler', 'QuotaExceededError',
+]
@@ -1,39 +1,53 @@
 """
 Gemini API provider for script generation.
+
+Only the SDK calls live here; caching, quota scheduling and the async
+variants come from LLMProvider (see llm_provider.py).
 """
 import os
 import google.generativeai as genai
-from typing import Dict, List, Optional
+from typing import Iterator, Optional
+
+from app.utils.llm_cache import LLMCache
+from .llm_provider import DEFAULT_MAX_CONCURRENCY, LLMProvider
+from .quota_scheduler import QuotaExceededError, QuotaScheduler, retry_after_hint
+
+DEFAULT_MODEL = "gemini-flash-latest"
 
-class QuotaExceededError(Exception):
-    """Raised when Gemini responds with a quota/429 error."""
-    pass
 
-class GeminiProvider:
+def _quota_error(error: Exception) -> Optional[QuotaExceededError]:
+    """QuotaExceededError for an SDK quota/429 error, else None"""
+    error_msg = str(error).lower()
+    if "quota" in error_msg or "429" in error_msg:
+        return QuotaExceededError(f"Gemini API quota exceeded: {error}", retry_after=retry_after_hint(error))
+    return None
+
+class GeminiProvider(LLMProvider):
     """Handles Gemini API interactions for script generation"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    name = "gemini"
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        cache: Optional[LLMCache] = None,
+        scheduler: Optional[QuotaScheduler] = None,
+        model: Optional[str] = None,
+    ):
+        super().__init__(model or DEFAULT_MODEL, max_concurrency=max_concurrency, cache=cache, scheduler=scheduler)
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("Gemini API key is required")
         
         genai.configure(api_key=self.api_key)
-        self.model_name = "gemini-flash-latest"
         self.model = genai.GenerativeModel(self.model_name)
     
-    def generate(self, prompt: str) -> str:
-        """
-        Generate content using Gemini API.
-        
-        Args:
-            prompt: The prompt to send to Gemini
-            
-        Returns:
-            Generated text response
-            
-        Raises:
-            QuotaExceededError: If API quota is exceeded
-        """
+    def _use_model(self, model: str):
+        super()._use_model(model)
+        self.model = genai.GenerativeModel(model)
+    
+    def _call_model(self, prompt: str) -> str:
         try:
             response = self.model.generate_content(prompt)
             
@@ -43,30 +57,24 @@ class GeminiProvider:
             return response.text
             
         except Exception as e:
-            error_msg = str(e).lower()
-            if "quota" in error_msg or "429" in error_msg:
-                raise QuotaExceededError(f"Gemini API quota exceeded: {e}")
+            quota_error = _quota_error(e)
+            if quota_error:
+                raise quota_error from e
             raise
     
-    def translate(self, text: str, target_language: str) -> str:
-        """
-        Translate text to target language.
-        
-        Args:
-            text: Text to translate
-            target_language: Target language name
-            
-        Returns:
-            Translated text
-        """
-        prompt = f"""
-Translate the following presentation script to {target_language}.
-Preserve all formatting markers (e.g., "--- Slide X ---", "===").
-Keep the structure exactly the same.
-
-Original text:
-{text}
-
-Translated text:
-"""
-        return self.generate(prompt)
+    def _stream_model(self, prompt: str) -> Iterator[str]:
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue  # chunk without text parts (e.g. only safety metadata)
+                if text:
+                    yield text
+        except QuotaExceededError:
+            raise
+        except Exception as e:
+            quota_error = _quota_error(e)
+            if quota_error:
+                raise quota_error from e
+            raise
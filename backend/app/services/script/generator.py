@@ -1,29 +1,82 @@
 """
 Main script generator that coordinates all script generation functionality.
 """
+import asyncio
+import os
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from .gemini_provider import GeminiProvider, QuotaExceededError
+from app.models.slide_record import SlideRecord
+from app.utils.llm_cache import LLMCache
+from app.utils.translation_memory import TranslationMemory
+from .gemini_provider import DEFAULT_MAX_CONCURRENCY, GeminiProvider, QuotaExceededError
+from .llm_provider import LLMProvider
 from .parser import ScriptParser
+from .prompt_planner import PromptPlanner
+from .quota_scheduler import QuotaScheduler
 
 class ScriptGenerator:
     """
     Generate and translate presentation scripts using AI.
-    Coordinates Gemini provider and script parser.
+    Coordinates the LLM providers and script parser.
     """
     
     # Re-export exception for backward compatibility
     QuotaExceededError = QuotaExceededError
     
-    def __init__(self, api_key: Optional[str] = None, prompts_dir: str = "prompts"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        prompts_dir: str = "prompts",
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        cache: Optional[LLMCache] = None,
+        planner: Optional[PromptPlanner] = None,
+        scheduler: Optional[QuotaScheduler] = None,
+        providers: Optional[Dict[str, LLMProvider]] = None,
+        translation_memory: Optional[TranslationMemory] = None,
+    ):
+        """
+        Args:
+            providers: Additional providers by request `provider` name (e.g. {"mock": MockProvider()});
+                       Gemini is added whenever an API key is available
+            translation_memory: Translated sections reused by translate_and_parse
+        """
         self.prompts_dir = Path(prompts_dir)
-        self.gemini = GeminiProvider(api_key)
+        self.planner = planner or PromptPlanner()
+        self.providers: Dict[str, LLMProvider] = dict(providers or {})
+        # Without other providers a missing Gemini key is still an error
+        if "gemini" not in self.providers and (api_key or os.getenv("GEMINI_API_KEY") or not self.providers):
+            self.providers["gemini"] = GeminiProvider(
+                api_key, max_concurrency=max_concurrency, cache=cache, scheduler=scheduler
+            )
+        self.translation_memory = translation_memory
         self.parser = ScriptParser()
     
+    @property
+    def gemini(self) -> LLMProvider:
+        provider = self.providers.get("gemini")
+        if provider is None:
+            raise ValueError("Gemini API key is required")
+        return provider
+    
+    def provider_for(self, provider: str = "gemini", model: Optional[str] = None) -> LLMProvider:
+        """
+        Provider for a request's provider/model. Providers that are not
+        configured (e.g. openai) use Gemini's default model, as they always have.
+        """
+        selected = self.providers.get((provider or "gemini").lower())
+        if selected is None:
+            return self.gemini
+        return selected.with_model(model)
+    
+    @property
+    def translator(self) -> LLMProvider:
+        """Provider for translations: Gemini when configured, otherwise the first configured provider"""
+        return self.providers.get("gemini") or next(iter(self.providers.values()), None) or self.gemini
+    
     def generate_full_script(
         self,
-        slides: List[Dict],
+        slides: List[SlideRecord],
         audience: str = "General audience",
         purpose: str = "Introduce the topic",
         context: str = "Formal meeting",
@@ -47,8 +100,8 @@ class ScriptGenerator:
             duration_sec: Target duration in seconds
             include_transitions: Whether to include transitions
             language: Target language
-            provider: AI provider (currently only 'gemini' supported)
-            model: Model override (unused, for compatibility)
+            provider: AI provider ('gemini' or another configured provider, e.g. 'mock')
+            model: Model override for that provider
             api_key: API key override (unused, for compatibility)
             
         Returns:
@@ -61,35 +114,381 @@ class ScriptGenerator:
         )
         
         # Generate script
-        full_script = self.gemini.generate(prompt)
+        full_script = self.provider_for(provider, model).generate(prompt)
         
         # Parse into structured format
         result = self.parser.parse_script(full_script, slides, include_transitions)
         
         return result
     
+    async def generate_full_script_async(
+        self,
+        slides: List[SlideRecord],
+        audience: str = "General audience",
+        purpose: str = "Introduce the topic",
+        context: str = "Formal meeting",
+        tone: str = "Professional and natural",
+        duration_sec: int = 300,
+        include_transitions: bool = True,
+        language: str = "Traditional Chinese",
+        provider: str = "gemini",
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        window_size: int = 0,
+        window_concurrency: int = 4,
+    ) -> Dict:
+        """
+        Non-blocking generate_full_script() for async endpoints (same arguments and result).
+        
+        Args:
+            window_size: Decks with more slides than this are generated in
+                         windows of window_size slides (0 = always one call)
+            window_concurrency: Windows generated at the same time
+        """
+        plan = self._generation_plan(
+            slides, audience, purpose, context, tone, duration_sec,
+            include_transitions, language, window_size
+        )
+        llm = self.provider_for(provider, model)
+        semaphore = asyncio.Semaphore(max(1, window_concurrency))
+        
+        async def generate_window(prompt: str) -> str:
+            async with semaphore:
+                return await llm.generate_async(prompt)
+        
+        texts = await asyncio.gather(*(generate_window(prompt) for _, prompt in plan))
+        return self._assemble(texts, slides, include_transitions, window_size)
+    
+    async def stream_full_script(
+        self,
+        slides: List[SlideRecord],
+        audience: str = "General audience",
+        purpose: str = "Introduce the topic",
+        context: str = "Formal meeting",
+        tone: str = "Professional and natural",
+        duration_sec: int = 300,
+        include_transitions: bool = True,
+        language: str = "Traditional Chinese",
+        provider: str = "gemini",
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        window_size: int = 0,
+        window_concurrency: int = 4,
+    ) -> AsyncIterator[Dict]:
+        """
+        Streaming generate_full_script_async().
+        
+        Yields {"event": "opening" | "slide", "data": ...} as soon as each
+        section of the streamed output closes (windows of a long deck stream
+        concurrently, so slides may arrive out of order), then
+        {"event": "done", "data": <full result>}.
+        """
+        plan = self._generation_plan(
+            slides, audience, purpose, context, tone, duration_sec,
+            include_transitions, language, window_size
+        )
+        llm = self.provider_for(provider, model)
+        semaphore = asyncio.Semaphore(max(1, window_concurrency))
+        queue: asyncio.Queue = asyncio.Queue()
+        texts = [""] * len(plan)
+        
+        async def stream_window(index: int):
+            window_slides, prompt = plan[index]
+            parser = self.parser.incremental(window_slides, include_transitions)
+            chunks = []
+            
+            def publish(events: List[Dict]):
+                for event in events:
+                    # Only the first window writes the opening
+                    if event["event"] != "opening" or index == 0:
+                        queue.put_nowait(event)
+            
+            async with semaphore:
+                async for chunk in llm.stream_async(prompt):
+                    chunks.append(chunk)
+                    publish(parser.feed(chunk))
+            publish(parser.close())
+            texts[index] = "".join(chunks)
+        
+        tasks = [asyncio.create_task(stream_window(i)) for i in range(len(plan))]
+        all_done = asyncio.gather(*tasks)
+        
+        def on_done(future: asyncio.Future):
+            queue.put_nowait(None)
+            if not future.cancelled():
+                future.exception()  # mark as retrieved (also after an early close)
+        
+        all_done.add_done_callback(on_done)
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+            await all_done  # re-raises the first window error
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        yield {"event": "done", "data": self._assemble(texts, slides, include_transitions, window_size)}
+    
+    def _generation_plan(
+        self,
+        slides: List[SlideRecord],
+        audience: str,
+        purpose: str,
+        context: str,
+        tone: str,
+        duration_sec: int,
+        include_transitions: bool,
+        language: str,
+        window_size: int,
+    ) -> List[Tuple[List[SlideRecord], str]]:
+        """
+        (slides, prompt) for each LLM call: one call for the whole deck, or
+        windows of window_size slides when the deck is longer than that.
+        
+        Every window sees the deck outline and its neighbouring slide titles
+        so transitions and terminology stay consistent; the first window also
+        writes the opening.
+        """
+        if not window_size or len(slides) <= window_size:
+            prompt = self._build_generation_prompt(
+                slides, audience, purpose, context, tone,
+                duration_sec, include_transitions, language
+            )
+            return [(slides, prompt)]
+        windows = [slides[i:i + window_size] for i in range(0, len(slides), window_size)]
+        outline = self._deck_outline(slides)
+        return [
+            (window, self._build_window_prompt(
+                windows, index, len(slides), outline, audience, purpose, context,
+                tone, duration_sec, include_transitions, language
+            ))
+            for index, window in enumerate(windows)
+        ]
+    
+    def _assemble(self, texts: List[str], slides: List[SlideRecord], include_transitions: bool, window_size: int) -> Dict:
+        """Stitch window outputs in slide order and parse them like a single-call script"""
+        if len(texts) == 1:
+            return self.parser.parse_script(texts[0], slides, include_transitions)
+        # Keep the opening only from the first window
+        parts = [texts[0].strip()]
+        for text in texts[1:]:
+            marker = text.find("--- Slide")
+            parts.append((text[marker:] if marker >= 0 else text).strip())
+        full_script = "\n\n".join(parts)
+        
+        result = self.parser.parse_script(full_script, slides, include_transitions)
+        result["metadata"].update(generation_mode="windowed", windows=len(texts), window_size=window_size)
+        return result
+    
+    async def regenerate_changed_async(
+        self,
+        slides: List[SlideRecord],
+        previous_result: Dict,
+        previous_fingerprints: List[str],
+        audience: str = "General audience",
+        purpose: str = "Introduce the topic",
+        context: str = "Formal meeting",
+        tone: str = "Professional and natural",
+        duration_sec: int = 300,
+        include_transitions: bool = True,
+        language: str = "Traditional Chinese",
+        provider: str = "gemini",
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        window_size: Optional[int] = None,
+        window_concurrency: int = 4,
+        max_changed_ratio: float = 0.5,
+    ) -> Optional[Dict]:
+        """
+        Regenerate only the slides whose content changed since a previous generation.
+        
+        Slides are matched to the previous result by content fingerprint, so
+        moved, inserted and deleted slides are handled as well as edits. Changed
+        slides are written with their neighbours' scripts as context and merged
+        into the previous slide_scripts; the previous opening is kept.
+        
+        Args:
+            previous_result: Earlier generate_full_script result for this deck lineage
+            previous_fingerprints: content_fingerprint() of the slides it was generated from
+            window_size: Changed slides per call (None = chosen from the token budget,
+                         0 = one call, see PromptPlanner.plan)
+            max_changed_ratio: Above this share of changed slides, return None
+                               (a full regeneration is the better choice)
+        
+        Returns:
+            Result in the generate_full_script layout, or None
+        """
+        remaining: Dict[str, List[str]] = {}
+        for fingerprint, item in zip(previous_fingerprints, previous_result["slide_scripts"]):
+            if not item["script"].endswith("- No script generated)"):
+                remaining.setdefault(fingerprint, []).append(item["script"])
+        
+        kept: Dict[int, str] = {}
+        changed: List[SlideRecord] = []
+        for slide in slides:
+            candidates = remaining.get(slide.content_fingerprint())
+            if candidates:
+                kept[slide.slide_no] = candidates.pop(0)
+            else:
+                changed.append(slide)
+        if len(changed) > len(slides) * max_changed_ratio:
+            return None
+        
+        written: Dict[int, str] = {}
+        if changed:
+            # Budget the changed slides on their own, at the deck's time per slide
+            changed_duration = duration_sec * len(changed) // len(slides)
+            plan = self.planner.plan(changed, changed_duration, language, window_size)
+            size = plan["window_size"] or len(changed)
+            groups = [changed[i:i + size] for i in range(0, len(changed), size)]
+            llm = self.provider_for(provider, model)
+            semaphore = asyncio.Semaphore(max(1, window_concurrency))
+            
+            async def generate_group(group: List[SlideRecord]) -> Dict[int, str]:
+                prompt = self._build_partial_prompt(
+                    slides, group, kept, audience, purpose, context, tone,
+                    duration_sec, include_transitions, language
+                )
+                async with semaphore:
+                    text = await llm.generate_async(prompt)
+                parser = self.parser.incremental(group, include_transitions)
+                parser.feed(text)
+                parser.close()
+                return parser.scripts
+            
+            for scripts in await asyncio.gather(*(generate_group(group) for group in groups)):
+                written.update(scripts)
+        
+        slide_scripts = []
+        for slide in slides:
+            number = slide.slide_no
+            script_text = written.get(number) or kept.get(number) or f"(Slide {number} - No script generated)"
+            slide_scripts.append(ScriptParser.slide_item(number, slide, script_text))
+        opening = previous_result.get("opening", "")
+        return {
+            "opening": opening,
+            "slide_scripts": slide_scripts,
+            "full_script": ScriptParser.compose(opening, slide_scripts),
+            "metadata": {
+                "total_slides": len(slides),
+                "has_opening": bool(opening),
+                "parser_version": ScriptParser.VERSION,
+                "generation_mode": "incremental",
+                "regenerated_slides": [slide.slide_no for slide in changed],
+                "reused_slides": len(kept),
+            }
+        }
+    
     def translate_and_parse(
         self, 
         full_script: str, 
         target_language: str, 
-        api_key: Optional[str] = None
-    ) -> str:
+        api_key: Optional[str] = None,
+        slides: Optional[List[SlideRecord]] = None,
+    ) -> Dict:
         """
-        Translate a script to target language.
+        Translate a script section by section and parse it into sections.
+        
+        The script is split on its "=== Opening ===" / "--- Slide X ---"
+        markers; sections found in the translation memory are reused and
+        only the rest is sent to the model.
         
         Args:
             full_script: The script to translate
             target_language: Target language name
             api_key: API key override (unused, for compatibility)
+            slides: Slides of the deck, for slide titles (default: taken from the markers)
             
         Returns:
-            Translated script text
+            Dict with 'opening', 'slide_scripts', 'full_script' and 'metadata' keys
+        """
+        sections = self.parser.split_sections(full_script)
+        sources = self._translation_sources(sections)
+        known = self.translation_memory.get_many(sources, target_language) if self.translation_memory else {}
+        fresh = {
+            text: self.translator.translate(text, target_language)
+            for text in sources if text not in known
+        }
+        if self.translation_memory:
+            self.translation_memory.set_many(fresh, target_language)
+        return self._translated_result(sections, known, fresh, target_language, slides)
+    
+    async def translate_and_parse_async(
+        self,
+        full_script: str,
+        target_language: str,
+        api_key: Optional[str] = None,
+        slides: Optional[List[SlideRecord]] = None,
+        concurrency: int = 4,
+    ) -> Dict:
+        """
+        Non-blocking translate_and_parse(); sections missing from the
+        translation memory are translated concurrently.
+        
+        Args:
+            concurrency: Sections translated at the same time (all calls
+                         still go through the provider's quota scheduler)
         """
-        return self.gemini.translate(full_script, target_language)
+        sections = self.parser.split_sections(full_script)
+        sources = self._translation_sources(sections)
+        memory = self.translation_memory
+        known = await asyncio.to_thread(memory.get_many, sources, target_language) if memory else {}
+        missing = [text for text in sources if text not in known]
+        translator = self.translator
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def translate(text: str) -> str:
+            async with semaphore:
+                return await translator.translate_async(text, target_language)
+        
+        fresh = dict(zip(missing, await asyncio.gather(*(translate(text) for text in missing))))
+        if memory and fresh:
+            await asyncio.to_thread(memory.set_many, fresh, target_language)
+        return self._translated_result(sections, known, fresh, target_language, slides)
+    
+    @staticmethod
+    def _translation_sources(sections: List[Tuple[str, str]]) -> List[str]:
+        """Distinct non-empty section bodies (markers are kept as they are)"""
+        return list(dict.fromkeys(body for _, body in sections if body))
+    
+    def _translated_result(
+        self,
+        sections: List[Tuple[str, str]],
+        known: Dict[str, str],
+        fresh: Dict[str, str],
+        target_language: str,
+        slides: Optional[List[SlideRecord]],
+    ) -> Dict:
+        """Reassemble translated sections under their original markers and parse the script"""
+        translations = {**known, **fresh}
+        parts = []
+        for marker, body in sections:
+            text = translations.get(body, body).strip() if body else ""
+            parts.append("\n".join(part for part in (marker, text) if part))
+        translated = "\n\n".join(parts)
+        if not slides:
+            # Without the deck, slides are known only by their markers
+            slides = [SlideRecord(slide_no=number) for number in self.parser.slide_numbers(translated)]
+        result = self.parser.parse_script(translated, slides)
+        result["metadata"]["translation"] = {
+            "target_language": target_language,
+            "sections": len(known) + len(fresh),
+            "from_memory": len(known),
+            "translated": len(fresh),
+        }
+        return result
+    
+    def translation_key(self, full_script: str, target_language: str) -> str:
+        """Hash of the model and translation prompt (identical translations share one in-flight call)"""
+        translator = self.translator
+        return LLMCache.key(translator.model_name, translator._translation_prompt(full_script, target_language))
     
     def _build_generation_prompt(
         self,
-        slides: List[Dict],
+        slides: List[SlideRecord],
         audience: str,
         purpose: str,
         context: str,
@@ -113,13 +512,7 @@ You are a professional presentation script writer.
 
 Generate a complete presentation script in {language} based on the following slides.
 
-**Presentation Details:**
-- Audience: {audience}
-- Purpose: {purpose}
-- Context: {context}
-- Tone: {tone}
-- Total Duration: {duration_sec} seconds (~{int(duration_sec/60)} minutes)
-- Average time per slide: ~{int(avg_time_per_slide)} seconds
+{self._presentation_details(audience, purpose, context, tone, duration_sec, avg_time_per_slide)}
 
 **Slides Content:**
 {slides_text}
@@ -151,23 +544,177 @@ Generate the complete script now:
 """
         return prompt
     
-    def _format_slides(self, slides: List[Dict]) -> str:
-        """Format slides for inclusion in prompt"""
-        formatted = []
+    def _build_window_prompt(
+        self,
+        windows: List[List[SlideRecord]],
+        index: int,
+        total_slides: int,
+        outline: str,
+        audience: str,
+        purpose: str,
+        context: str,
+        tone: str,
+        duration_sec: int,
+        include_transitions: bool,
+        language: str
+    ) -> str:
+        """Prompt for one window of a long deck"""
+        window = windows[index]
+        first, last = window[0].slide_no, window[-1].slide_no
+        avg_time_per_slide = duration_sec / total_slides if total_slides > 0 else 30
         
-        for slide in slides:
-            slide_no = slide.get("slide_no", 0)
-            title = slide.get("title", "")
-            bullets = slide.get("bullets", [])
-            
-            slide_text = f"Slide {slide_no}: {title}\n"
-            if bullets:
-                for bullet in bullets:
-                    slide_text += f"  - {bullet}\n"
-            
-            formatted.append(slide_text)
+        neighbours = []
+        if index > 0:
+            previous = windows[index - 1][-1]
+            neighbours.append(f"- The previous part ends with slide {previous.slide_no}: {previous.title}")
+        if index + 1 < len(windows):
+            following = windows[index + 1][0]
+            neighbours.append(f"- The next part starts with slide {following.slide_no}: {following.title}")
+        
+        if index == 0:
+            opening_instruction = "1. Write a brief opening (30-60 seconds) to introduce the presentation"
+            output_format = "=== Opening ===\n[Your opening script here]\n\n"
+        else:
+            opening_instruction = "1. Do NOT write an opening; continue the presentation that is already under way"
+            output_format = ""
+        
+        return f"""
+You are a professional presentation script writer.
+
+You are writing part {index + 1} of {len(windows)} of a presentation script in {language}:
+slides {first} to {last} of a {total_slides}-slide deck. Other parts are written separately.
+
+{self._presentation_details(audience, purpose, context, tone, duration_sec, avg_time_per_slide)}
+
+**Deck Outline (for context only):**
+{outline}
+
+{chr(10).join(neighbours)}
+
+**Slides Content (write scripts for these slides only):**
+{self._format_slides(window)}
+
+**Instructions:**
+{opening_instruction}
+2. For each slide, write a natural script that:
+   - Explains the key points clearly
+   - Uses the specified tone
+   - Takes approximately {int(avg_time_per_slide)} seconds to read
+   {"- Includes smooth transitions between slides, also into the next part" if include_transitions else ""}
+3. Use "--- Slide X ---" before each slide's script (where X is the slide number)
+
+**Output Format:**
+{output_format}--- Slide {first} ---
+[Script for slide {first}]
+
+... and so on up to slide {last}.
+
+Generate the script now:
+"""
+    
+    def _build_partial_prompt(
+        self,
+        slides: List[SlideRecord],
+        changed: List[SlideRecord],
+        kept: Dict[int, str],
+        audience: str,
+        purpose: str,
+        context: str,
+        tone: str,
+        duration_sec: int,
+        include_transitions: bool,
+        language: str
+    ) -> str:
+        """Prompt for rewriting a few changed slides of an already scripted deck"""
+        avg_time_per_slide = duration_sec / len(slides) if slides else 30
+        position = {slide.slide_no: i for i, slide in enumerate(slides)}
+        
+        def neighbour(index: int, label: str, tail: bool) -> str:
+            if not 0 <= index < len(slides):
+                return ""
+            slide = slides[index]
+            script = kept.get(slide.slide_no)
+            line = f"  {label} slide {slide.slide_no}: {slide.title}"
+            if script:
+                excerpt = script[-200:] if tail else script[:200]
+                line += f'\n    its script {"ends" if tail else "starts"} with: "{excerpt}"'
+            return line + "\n"
+        
+        blocks = []
+        for slide in changed:
+            index = position[slide.slide_no]
+            blocks.append(
+                self._format_slides([slide])
+                + neighbour(index - 1, "Previous", tail=True)
+                + neighbour(index + 1, "Next", tail=False)
+            )
+        first = changed[0].slide_no
         
-        return "\n".join(formatted)
+        return f"""
+You are revising part of an existing presentation script in {language}.
+Only the slides below changed; the scripts of all other slides are kept as they are.
+
+{self._presentation_details(audience, purpose, context, tone, duration_sec, avg_time_per_slide)}
+
+**Deck Outline (for context only):**
+{self._deck_outline(slides)}
+
+**Slides to Write (with their neighbours for context):**
+{chr(10).join(blocks)}
+**Instructions:**
+1. Write a script only for the slides listed above; do not write an opening
+2. For each slide, write a natural script that:
+   - Explains the key points clearly
+   - Uses the specified tone
+   - Takes approximately {int(avg_time_per_slide)} seconds to read
+   {"- Connects naturally from the previous slide's script and into the next one" if include_transitions else ""}
+3. Use "--- Slide X ---" before each slide's script (where X is the slide number)
+
+**Output Format:**
+--- Slide {first} ---
+[Script for slide {first}]
+
+... and so on for each listed slide.
+
+Generate the scripts now:
+"""
+    
+    @staticmethod
+    def _presentation_details(
+        audience: str, purpose: str, context: str, tone: str, duration_sec: int, avg_time_per_slide: float
+    ) -> str:
+        return f"""**Presentation Details:**
+- Audience: {audience}
+- Purpose: {purpose}
+- Context: {context}
+- Tone: {tone}
+- Total Duration: {duration_sec} seconds (~{int(duration_sec/60)} minutes)
+- Average time per slide: ~{int(avg_time_per_slide)} seconds"""
+    
+    @staticmethod
+    def _deck_outline(slides: List[SlideRecord], max_chars: int = 4000) -> str:
+        """Slide titles of the whole deck, shortened to fit max_chars"""
+        lines = [f"{slide.slide_no}. {slide.title}" for slide in slides]
+        outline = "\n".join(lines)
+        if len(outline) <= max_chars:
+            return outline
+        # Too long: keep every n-th title so the outline still spans the deck
+        step = len(outline) // max_chars + 1
+        return "\n".join(lines[::step])
+    
+    def plan_generation(
+        self,
+        slides: List[SlideRecord],
+        duration_sec: int,
+        language: str,
+        window_size: Optional[int] = None,
+    ) -> Dict:
+        """Token estimate and single-call vs windowed choice (see PromptPlanner.plan)"""
+        return self.planner.plan(slides, duration_sec, language, window_size)
+    
+    def _format_slides(self, slides: List[SlideRecord]) -> str:
+        """Format slides for inclusion in prompt (title, bullets, compacted tables, notes)"""
+        return "\n".join(self.planner.format_slide(slide) for slide in slides)
     
     def _load_prompt(self, filename: str) -> str:
         """Load prompt template from file (for future use)"""
@@ -0,0 +1,243 @@
+"""
+Common base for LLM providers used by script generation.
+
+A provider only implements the raw model calls (_call_model, _stream_model).
+The base class adds what every provider shares: the persistent response
+cache, the process-wide QuotaScheduler, and async variants that run the
+blocking calls on a dedicated, bounded thread pool shared by every provider
+instance in the process. At most `max_concurrency` calls run at once, the
+rest wait in the pool's queue, and the event loop (and FastAPI's own
+threadpool) stays free for other requests.
+"""
+import asyncio
+import copy
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from app.utils.llm_cache import LLMCache
+from .prompt_planner import estimate_tokens
+from .quota_scheduler import QuotaScheduler
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor(max_workers: int) -> ThreadPoolExecutor:
+    """Process-wide pool for blocking LLM calls (sized by the first caller)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="llm")
+        return _executor
+
+
+def shutdown_executor():
+    """Stop the shared pool (pending calls are cancelled)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+class LLMProvider(ABC):
+    """Caching, scheduling and async plumbing around a provider's raw model calls"""
+    
+    name = "base"
+    
+    def __init__(
+        self,
+        model_name: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        cache: Optional[LLMCache] = None,
+        scheduler: Optional[QuotaScheduler] = None,
+    ):
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.scheduler = scheduler or QuotaScheduler(max_concurrency=max_concurrency)
+        self._variants: Dict[str, "LLMProvider"] = {}
+        self._variants_lock = threading.Lock()
+    
+    # Raw model calls (implemented by each provider)
+    @abstractmethod
+    def _call_model(self, prompt: str) -> str:
+        """One blocking model call; raises QuotaExceededError on a 429"""
+    
+    @abstractmethod
+    def _stream_model(self, prompt: str) -> Iterator[str]:
+        """One blocking streaming model call yielding text chunks"""
+    
+    def _use_model(self, model: str):
+        """Point a copied provider at another model of the same provider"""
+        self.model_name = model
+    
+    def with_model(self, model: Optional[str] = None) -> "LLMProvider":
+        """This provider, or a copy sharing its cache and scheduler that calls `model` instead"""
+        if not model or model == self.model_name:
+            return self
+        with self._variants_lock:
+            variant = self._variants.get(model)
+            if variant is None:
+                variant = copy.copy(self)
+                variant._variants = {}
+                variant._variants_lock = threading.Lock()
+                variant._use_model(model)
+                self._variants[model] = variant
+            return variant
+    
+    def generate(self, prompt: str) -> str:
+        """
+        Generate content with the provider's model.
+        
+        Args:
+            prompt: The prompt to send to the model
+            
+        Returns:
+            Generated text response
+            
+        Raises:
+            QuotaExceededError: If API quota is exceeded
+        """
+        cached = self._cached(prompt)
+        if cached is not None:
+            return cached
+        text = self._generate_uncached(prompt)
+        self._store(prompt, text)
+        return text
+    
+    def _cached(self, prompt: str) -> Optional[str]:
+        return self.cache.get(self.model_name, prompt) if self.cache else None
+    
+    def _store(self, prompt: str, text: str):
+        if self.cache and text:
+            self.cache.set(self.model_name, prompt, text)
+    
+    def _generate_uncached(self, prompt: str) -> str:
+        """One scheduled model call (waits for quota, retries 429s)"""
+        text = self.scheduler.call(self._call_model, prompt, tokens=estimate_tokens(prompt))
+        self.scheduler.charge(estimate_tokens(text))
+        return text
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Generate content as a stream of text chunks (blocking iterator).
+        
+        Raises:
+            QuotaExceededError: If API quota is exceeded
+        """
+        cached = self._cached(prompt)
+        if cached is not None:
+            yield cached
+            return
+        chunks = []
+        for chunk in self._stream_uncached(prompt):
+            chunks.append(chunk)
+            yield chunk
+        self._store(prompt, "".join(chunks))
+    
+    def _stream_uncached(self, prompt: str) -> Iterator[str]:
+        """One scheduled streaming call (a 429 before the first chunk is retried)"""
+        produced = 0
+        for chunk in self.scheduler.stream(lambda: self._stream_model(prompt), tokens=estimate_tokens(prompt)):
+            produced += estimate_tokens(chunk)
+            yield chunk
+        self.scheduler.charge(produced)
+    
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Non-blocking stream(): the model iterator runs on the shared bounded pool
+        and hands chunks to the event loop as they arrive. A cached response
+        arrives as a single chunk.
+        """
+        cached = await asyncio.to_thread(self._cached, prompt)
+        if cached is not None:
+            yield cached
+            return
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        cancelled = threading.Event()
+        
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                cancelled.set()  # event loop already closed
+        
+        def produce():
+            try:
+                chunks = []
+                for chunk in self._stream_uncached(prompt):
+                    if cancelled.is_set():
+                        return
+                    chunks.append(chunk)
+                    put(chunk)
+                self._store(prompt, "".join(chunks))
+            except Exception as e:
+                put(e)
+            finally:
+                put(finished)
+        
+        loop.run_in_executor(_shared_executor(self.max_concurrency), produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Consumer stopped early (client disconnected): stop reading the stream
+            cancelled.set()
+    
+    async def generate_async(self, prompt: str) -> str:
+        """
+        Non-blocking generate(): runs the model call on the shared bounded pool.
+        
+        Raises:
+            QuotaExceededError: If API quota is exceeded
+        """
+        # Cache lookups use the default pool so hits never wait behind running LLM calls
+        cached = await asyncio.to_thread(self._cached, prompt)
+        if cached is not None:
+            return cached
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(_shared_executor(self.max_concurrency), self._generate_uncached, prompt)
+        await asyncio.to_thread(self._store, prompt, text)
+        return text
+    
+    def translate(self, text: str, target_language: str) -> str:
+        """
+        Translate text to target language.
+        
+        Args:
+            text: Text to translate
+            target_language: Target language name
+            
+        Returns:
+            Translated text
+        """
+        return self.generate(self._translation_prompt(text, target_language))
+    
+    async def translate_async(self, text: str, target_language: str) -> str:
+        """Non-blocking translate()"""
+        return await self.generate_async(self._translation_prompt(text, target_language))
+    
+    @staticmethod
+    def _translation_prompt(text: str, target_language: str) -> str:
+        return f"""
+Translate the following presentation script to {target_language}.
+Preserve all formatting markers (e.g., "--- Slide X ---", "===").
+Keep the structure exactly the same.
+
+Original text:
+{text}
+
+Translated text:
+"""
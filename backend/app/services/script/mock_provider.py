@@ -0,0 +1,148 @@
+"""
+Deterministic local stand-in for an LLM, for load tests and offline benchmarks.
+
+Reads the slide numbers, titles and target length from the generation
+prompts ScriptGenerator builds and answers in the same marker format a real
+model uses ("=== Opening ===", "--- Slide X ---"), so parsing, windowing,
+streaming, caching and the API layer run exactly as in production. Latency
+(time to first token), throughput, stream chunk size and a share of
+injected 429 responses are configurable; the same prompt always produces
+the same text, and with a fixed seed the same calls are throttled.
+"""
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import Iterator, List, Optional
+
+from app.utils.llm_cache import LLMCache
+from .llm_provider import DEFAULT_MAX_CONCURRENCY, LLMProvider
+from .prompt_planner import estimate_tokens
+from .quota_scheduler import QuotaExceededError, QuotaScheduler
+
+_SLIDE = re.compile(r"^Slide (\d+): (.*)$", re.MULTILINE)
+_SECONDS = re.compile(r"Takes approximately (\d+) seconds to read")
+_TRANSLATE = re.compile(r"Translate the following presentation script to (.+?)\.\n.*?Original text:\n(.*)\n\nTranslated text:", re.DOTALL)
+_WORDS = re.compile(r"\s*\S+")
+
+_FILLER = (
+    "this point matters because it shapes the decisions we make next",
+    "the numbers here tell a clear story",
+    "let us look at what this means in practice",
+    "our team has been working on this for several months",
+    "the key takeaway is simple",
+    "this connects directly to the goals we set at the start",
+    "we expect the impact to grow over the coming quarters",
+    "feedback from users confirmed this direction",
+)
+
+
+class MockProvider(LLMProvider):
+    """Local provider that fakes model output, timing and rate limiting"""
+
+    name = "mock"
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        latency: float = 0.5,
+        tokens_per_second: float = 50.0,
+        chunk_tokens: int = 8,
+        error_rate: float = 0.0,
+        retry_after: Optional[float] = None,
+        seed: int = 0,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        cache: Optional[LLMCache] = None,
+        scheduler: Optional[QuotaScheduler] = None,
+    ):
+        """
+        Args:
+            latency: Seconds before the first token
+            tokens_per_second: Output throughput after the first token (0 = instant)
+            chunk_tokens: Roughly how many tokens each stream chunk carries
+            error_rate: Share of calls answered with an injected 429 (0-1)
+            retry_after: Retry delay attached to injected 429s (None = no hint)
+            seed: Seed for choosing which calls are throttled
+        """
+        super().__init__(model or "mock", max_concurrency=max_concurrency, cache=cache, scheduler=scheduler)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _call_model(self, prompt: str) -> str:
+        self._maybe_throttle()
+        text = self.respond(prompt)
+        time.sleep(self.latency + self._duration(estimate_tokens(text)))
+        return text
+
+    def _stream_model(self, prompt: str) -> Iterator[str]:
+        self._maybe_throttle()
+        time.sleep(self.latency)
+        for chunk in self._chunks(self.respond(prompt)):
+            time.sleep(self._duration(estimate_tokens(chunk)))
+            yield chunk
+
+    def _maybe_throttle(self):
+        with self._random_lock:
+            throttled = self.error_rate > 0 and self._random.random() < self.error_rate
+        if throttled:
+            raise QuotaExceededError("Mock provider 429: quota exceeded (injected)", retry_after=self.retry_after)
+
+    def _duration(self, tokens: int) -> float:
+        return tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _chunks(self, text: str) -> List[str]:
+        """Groups of chunk_tokens words; joined they give back the exact text"""
+        words = _WORDS.findall(text)
+        chunks = ["".join(words[i:i + self.chunk_tokens]) for i in range(0, len(words), self.chunk_tokens)]
+        tail = text[len("".join(words)):]
+        if tail:
+            chunks.append(tail)
+        return chunks
+
+    # Output
+    def respond(self, prompt: str) -> str:
+        """Deterministic reply to a generation or translation prompt"""
+        translation = _TRANSLATE.search(prompt)
+        if translation:
+            return self._translate(translation.group(2), translation.group(1))
+
+        seconds = _SECONDS.search(prompt)
+        # ~2.5 spoken words per second
+        words = max(10, int(int(seconds.group(1)) * 2.5)) if seconds else 60
+        parts = []
+        if "Write a brief opening" in prompt:
+            parts.append("=== Opening ===\n" + self._paragraph("opening", "Welcome, everyone.", 60))
+        for number, title in _SLIDE.findall(prompt):
+            title = title.strip()
+            parts.append(f"--- Slide {number} ---\n" + self._paragraph(
+                f"{number}:{title}", f"Slide {number} is about {title or 'this topic'}.", words
+            ))
+        return "\n\n".join(parts) + "\n"
+
+    def _paragraph(self, key: str, first: str, words: int) -> str:
+        """Sentences chosen by a hash of key, about `words` words long"""
+        rng = random.Random(hashlib.sha256(f"{self.model_name}\0{key}".encode("utf-8")).digest())
+        sentences = [first]
+        count = len(first.split())
+        while count < words:
+            sentence = rng.choice(_FILLER)
+            sentences.append(sentence[0].upper() + sentence[1:] + ".")
+            count += len(sentence.split())
+        return " ".join(sentences)
+
+    @staticmethod
+    def _translate(text: str, target_language: str) -> str:
+        """Tag every script line with the target language; markers stay unchanged"""
+        lines = []
+        for line in text.splitlines():
+            stripped = line.strip()
+            if stripped and not stripped.startswith(("---", "===")):
+                line = f"[{target_language}] {line}"
+            lines.append(line)
+        return "\n".join(lines)
@@ -2,13 +2,23 @@
 Script parser for converting generated text into structured format.
 """
 import re
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+from app.models.slide_record import SlideRecord
+
+# "--- Slide 3 ---", "=== 投影片 3 ===" ...
+SLIDE_MARKER = re.compile(r'^\s*(?:---|===).*?(?:Slide|投影片)\s*(\d+).*?(?:---|===)\s*$', re.IGNORECASE)
+# "=== Opening ===", "=== 開場白 ==="
+OPENING_MARKER = re.compile(r'^\s*(?:---|===).*?(?:Opening|開場).*?(?:---|===)\s*$', re.IGNORECASE)
 
 class ScriptParser:
     """Parses generated scripts into structured slide-by-slide format"""
     
+    # metadata.parser_version of results parsed from marked sections
+    VERSION = "2.1"
+    
     @staticmethod
-    def parse_script(full_script: str, slides: List[Dict], include_transitions: bool = True) -> Dict:
+    def parse_script(full_script: str, slides: List[SlideRecord], include_transitions: bool = True) -> Dict:
         """
         Parse generated script text into structured format.
         
@@ -20,6 +30,64 @@ class ScriptParser:
         Returns:
             Dict with 'opening', 'slides', and 'full_script' keys
         """
+        parser = IncrementalScriptParser(slides, include_transitions)
+        parser.feed(full_script)
+        parser.close()
+        if parser.scripts:
+            return parser.result()
+        # No section markers at all: fall back to splitting the free text
+        return ScriptParser._parse_unmarked(full_script, slides)
+    
+    @staticmethod
+    def incremental(slides: List[SlideRecord], include_transitions: bool = True) -> "IncrementalScriptParser":
+        """Parser that consumes streamed chunks and reports sections as they close"""
+        return IncrementalScriptParser(slides, include_transitions)
+    
+    @staticmethod
+    def slide_item(slide_no: int, slide: SlideRecord, script_text: str) -> Dict:
+        """One entry of 'slide_scripts'"""
+        return {
+            "slide_no": str(slide_no),  # Convert to string for API model
+            "title": slide.title,
+            "script": script_text,
+            "segments": ScriptParser._split_into_segments(script_text)
+        }
+    
+    @staticmethod
+    def compose(opening: str, slide_scripts: List[Dict]) -> str:
+        """Rebuild a marked-up full script from its sections (inverse of parse_script)"""
+        parts = [f"=== Opening ===\n{opening}"] if opening else []
+        parts += [f"--- Slide {item['slide_no']} ---\n{item['script']}" for item in slide_scripts]
+        return "\n\n".join(parts)
+    
+    @staticmethod
+    def split_sections(full_script: str) -> List[Tuple[str, str]]:
+        """
+        (marker line, body) for each section of a marked-up script, in order.
+        Text before the first marker is returned with an empty marker line.
+        """
+        sections: List[Tuple[str, List[str]]] = [("", [])]
+        for line in full_script.split("\n"):
+            if SLIDE_MARKER.match(line) or OPENING_MARKER.match(line):
+                sections.append((line.strip(), []))
+            else:
+                sections[-1][1].append(line)
+        result = [(marker, "\n".join(lines).strip()) for marker, lines in sections]
+        return [(marker, body) for marker, body in result if marker or body]
+    
+    @staticmethod
+    def slide_numbers(full_script: str) -> List[int]:
+        """Slide numbers of the "--- Slide X ---" markers, in order of appearance"""
+        numbers = []
+        for line in full_script.split("\n"):
+            match = SLIDE_MARKER.match(line)
+            if match and int(match.group(1)) not in numbers:
+                numbers.append(int(match.group(1)))
+        return numbers
+    
+    @staticmethod
+    def _parse_unmarked(full_script: str, slides: List[SlideRecord]) -> Dict:
+        """Legacy best-effort split for output without "--- Slide X ---" markers"""
         # Extract sections using markers
         sections = ScriptParser._extract_sections(full_script)
         
@@ -31,7 +99,7 @@ class ScriptParser:
         # Parse slide sections
         slide_scripts = []
         for i, slide in enumerate(slides):
-            slide_no = slide.get("slide_no", i + 1)
+            slide_no = slide.slide_no or i + 1
             
             # Find matching section
             script_text = ScriptParser._find_slide_script(sections, slide_no)
@@ -44,7 +112,7 @@ class ScriptParser:
             
             slide_scripts.append({
                 "slide_no": str(slide_no),  # Convert to string for API model
-                "title": slide.get("title", ""),
+                "title": slide.title,
                 "script": script_text,
                 "segments": segments
             })
@@ -131,3 +199,89 @@ class ScriptParser:
             })
         
         return segments if segments else [{"text": text, "type": "content"}]
+
+
+class IncrementalScriptParser:
+    """
+    Line-based section parser that accepts the script in arbitrary chunks.
+    
+    A section ends when the next section marker arrives (or at close()), so
+    each slide's script can be emitted while the model is still writing the
+    rest of the deck. Feeding the whole text at once gives the same result.
+    """
+    
+    def __init__(self, slides: List[SlideRecord], include_transitions: bool = True):
+        self.slides = slides
+        self.include_transitions = include_transitions
+        self.by_number = {slide.slide_no or i + 1: slide for i, slide in enumerate(slides)}
+        self.opening = ""
+        self.scripts: Dict[int, str] = {}
+        self._chunks: List[str] = []
+        self._pending = ""  # incomplete last line
+        self._section: Optional[int] = None  # slide number, 0 = opening, None = preamble
+        self._lines: List[str] = []
+    
+    def feed(self, chunk: str) -> List[Dict]:
+        """
+        Consume a chunk of generated text.
+        
+        Returns:
+            Events for sections completed by this chunk:
+            {"event": "opening", "data": {"opening": text}} or
+            {"event": "slide", "data": <slide_scripts item>}
+        """
+        self._chunks.append(chunk)
+        lines = (self._pending + chunk).split("\n")
+        self._pending = lines.pop()
+        events = []
+        for line in lines:
+            events.extend(self._line(line))
+        return events
+    
+    def close(self) -> List[Dict]:
+        """Flush the last line and section at the end of the stream"""
+        events = []
+        if self._pending:
+            events.extend(self._line(self._pending))
+            self._pending = ""
+        events.extend(self._close_section())
+        return events
+    
+    def result(self) -> Dict:
+        """Same structure as ScriptParser.parse_script (call after close())"""
+        slide_scripts = []
+        for number, slide in self.by_number.items():
+            script_text = self.scripts.get(number) or f"(Slide {number} - No script generated)"
+            slide_scripts.append(ScriptParser.slide_item(number, slide, script_text))
+        return {
+            "opening": self.opening,
+            "slide_scripts": slide_scripts,
+            "full_script": "".join(self._chunks),
+            "metadata": {
+                "total_slides": len(self.slides),
+                "has_opening": bool(self.opening),
+                "parser_version": ScriptParser.VERSION
+            }
+        }
+    
+    def _line(self, line: str) -> List[Dict]:
+        slide_match = SLIDE_MARKER.match(line)
+        if slide_match or OPENING_MARKER.match(line):
+            events = self._close_section()
+            self._section = int(slide_match.group(1)) if slide_match else 0
+            return events
+        self._lines.append(line)
+        return []
+    
+    def _close_section(self) -> List[Dict]:
+        text = "\n".join(self._lines).strip()
+        section, self._lines = self._section, []
+        if section == 0:
+            if text and not self.opening:
+                self.opening = text
+                return [{"event": "opening", "data": {"opening": text}}]
+        elif section is not None and text and section in self.by_number and section not in self.scripts:
+            # Unknown slide numbers and repeated sections are ignored
+            self.scripts[section] = text
+            return [{"event": "slide", "data": ScriptParser.slide_item(section, self.by_number[section], text)}]
+        return []
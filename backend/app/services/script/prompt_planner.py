@@ -0,0 +1,214 @@
+"""
+Token-budget planning for script generation prompts.
+
+Estimates how many tokens the slide content and the expected script take,
+formats slides compactly (capped tables, truncated bullets and notes) and
+picks one call or windows of slides so that every call stays within the
+configured input and output budgets.
+"""
+import contextvars
+import re
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.models.slide_record import SlideRecord, TableData
+
+# CJK ideographs, kana, hangul and full-width forms: roughly one token per character
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+# Fixed instructions around the slides in a generation prompt
+PROMPT_OVERHEAD_TOKENS = 450
+# "--- Slide X ---" marker and spacing per slide in the output
+SLIDE_MARKER_TOKENS = 12
+OPENING_SECONDS = 45
+
+# id(slide) -> (prompt text, tokens) for a deck formatted once and shared by several generations
+_shared_slides: contextvars.ContextVar[Optional[Dict[int, Tuple[str, int]]]] = contextvars.ContextVar(
+    "shared_slides", default=None
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, one per ~4 other characters"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class PromptPlanner:
+    """Compact slide formatting plus single-call vs windowed planning within a token budget"""
+
+    def __init__(
+        self,
+        max_input_tokens: int = 100000,
+        max_output_tokens: int = 8192,
+        max_window: int = 0,
+        bullet_max_chars: int = 300,
+        notes_max_chars: int = 400,
+        table_max_rows: int = 8,
+        table_max_cols: int = 6,
+        cell_max_chars: int = 40,
+    ):
+        """
+        Args:
+            max_input_tokens: Prompt budget per call
+            max_output_tokens: Model output limit per call (a 20% margin is kept)
+            max_window: Upper bound on slides per call (0 = only the budget decides)
+        """
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.max_window = max_window
+        self.bullet_max_chars = bullet_max_chars
+        self.notes_max_chars = notes_max_chars
+        self.table_max_rows = table_max_rows
+        self.table_max_cols = table_max_cols
+        self.cell_max_chars = cell_max_chars
+
+    # Formatting
+    @contextmanager
+    def shared_slides(self, slides: List[SlideRecord]) -> Iterator[None]:
+        """
+        Format these slides once for every prompt built inside the block,
+        including by tasks it starts (e.g. the variants of a batch job).
+        """
+        formatted = {}
+        for slide in slides:
+            text = self._format_slide(slide)
+            formatted[id(slide)] = (text, estimate_tokens(text))
+        token = _shared_slides.set(formatted)
+        try:
+            yield
+        finally:
+            _shared_slides.reset(token)
+
+    def _shared(self, slide: SlideRecord) -> Optional[Tuple[str, int]]:
+        shared = _shared_slides.get()
+        return shared.get(id(slide)) if shared else None
+
+    def format_slide(self, slide: SlideRecord) -> str:
+        """Slide text for a prompt: title, bullets, table summaries and notes, each capped"""
+        shared = self._shared(slide)
+        return shared[0] if shared else self._format_slide(slide)
+
+    def slide_tokens(self, slide: SlideRecord) -> int:
+        shared = self._shared(slide)
+        return shared[1] if shared else estimate_tokens(self._format_slide(slide))
+
+    def _format_slide(self, slide: SlideRecord) -> str:
+        lines = [f"Slide {slide.slide_no}: {slide.title}"]
+        for bullet in slide.bullets:
+            lines.append(f"  - {_clip(bullet, self.bullet_max_chars)}")
+        for index, table in enumerate(slide.tables, 1):
+            lines.append(f"  Table {index} ({table.rows}x{table.cols}): {self._format_table(table)}")
+        if slide.notes and slide.notes.strip():
+            lines.append(f"  Speaker notes: {_clip(slide.notes, self.notes_max_chars)}")
+        return "\n".join(lines) + "\n"
+
+    def _format_table(self, table: TableData) -> str:
+        """Rows joined with " / ", cells with " | ", truncated to the configured caps"""
+        rows = []
+        for row in table.content[:self.table_max_rows]:
+            cells = [_clip(cell, self.cell_max_chars) for cell in row[:self.table_max_cols]]
+            if len(row) > self.table_max_cols:
+                cells.append("…")
+            rows.append(" | ".join(cells))
+        text = " / ".join(rows)
+        if len(table.content) > self.table_max_rows:
+            text += f" (+{len(table.content) - self.table_max_rows} more rows)"
+        return text
+
+    # Estimation
+    @staticmethod
+    def speech_tokens_per_second(language: str) -> float:
+        """Script tokens spoken per second (CJK speech ~4 characters/s, English ~2.5 words/s)"""
+        lowered = language.lower()
+        if any(name in lowered for name in ("chinese", "japanese", "korean", "中文", "日", "韓")):
+            return 4.0
+        return 3.3
+
+    def plan(
+        self,
+        slides: List[SlideRecord],
+        duration_sec: int,
+        language: str,
+        window_size: Optional[int] = None,
+    ) -> Dict:
+        """
+        Estimate tokens and choose how to split the deck.
+
+        Args:
+            window_size: None = choose within the budget; 0 = force one call;
+                         N = force windows of N slides
+
+        Returns:
+            Dict with window_size (0 = single call), calls, input_tokens,
+            output_tokens (totals over all calls), per-slide averages,
+            the budget, and whether every call fits in it
+        """
+        count = len(slides)
+        slide_inputs = [self.slide_tokens(slide) for slide in slides]
+        outline_tokens = sum(estimate_tokens(f"{s.slide_no}. {s.title}") for s in slides) + count
+        seconds_per_slide = duration_sec / count if count else 30
+        rate = self.speech_tokens_per_second(language)
+        # Models tend to write a bit more than the requested length
+        per_slide_output = int(seconds_per_slide * rate * 1.3) + SLIDE_MARKER_TOKENS
+        opening_output = int(OPENING_SECONDS * rate * 1.3)
+        output_limit = int(self.max_output_tokens * 0.8)
+
+        if window_size is None:
+            window_size = self._choose_window(
+                count, slide_inputs, outline_tokens, per_slide_output, opening_output, output_limit
+            )
+        if window_size and count <= window_size:
+            window_size = 0
+
+        size = window_size or count
+        windows = [slide_inputs[i:i + size] for i in range(0, count, size)] or [[]]
+        call_inputs = [
+            PROMPT_OVERHEAD_TOKENS + sum(window) + (outline_tokens if window_size else 0)
+            for window in windows
+        ]
+        call_outputs = [
+            len(window) * per_slide_output + (opening_output if i == 0 else 0)
+            for i, window in enumerate(windows)
+        ]
+        return {
+            "window_size": window_size,
+            "calls": len(windows),
+            "input_tokens": sum(call_inputs),
+            "output_tokens": sum(call_outputs),
+            "avg_slide_input_tokens": round(sum(slide_inputs) / count, 1) if count else 0,
+            "slide_output_tokens": per_slide_output,
+            "budget": {"input_per_call": self.max_input_tokens, "output_per_call": self.max_output_tokens},
+            "within_budget": max(call_inputs) <= self.max_input_tokens and max(call_outputs) <= output_limit,
+        }
+
+    def _choose_window(
+        self,
+        count: int,
+        slide_inputs: List[int],
+        outline_tokens: int,
+        per_slide_output: int,
+        opening_output: int,
+        output_limit: int,
+    ) -> int:
+        """Largest window that keeps each call within both budgets (0 = the whole deck fits one call)"""
+        single_input = PROMPT_OVERHEAD_TOKENS + sum(slide_inputs)
+        single_output = opening_output + count * per_slide_output
+        fits = single_input <= self.max_input_tokens and single_output <= output_limit
+        if fits and (not self.max_window or count <= self.max_window):
+            return 0
+
+        by_output = max(1, (output_limit - opening_output) // per_slide_output)
+        largest_slide = max(slide_inputs, default=0)
+        by_input = max(1, (self.max_input_tokens - PROMPT_OVERHEAD_TOKENS - outline_tokens) // max(1, largest_slide))
+        window = min(by_output, by_input)
+        if self.max_window:
+            window = min(window, self.max_window)
+        return window
@@ -0,0 +1,408 @@
+"""
+Quota-aware scheduling for Gemini calls.
+
+Every uncached call goes through one QuotaScheduler per process, which
+- paces calls with token buckets on requests and tokens per minute,
+- limits concurrent calls with an AIMD window (halved on a 429, grown by
+  one slot per window of successful calls up to max_concurrency),
+- retries 429s with jittered exponential backoff, honouring the retry delay
+  Gemini sends back (which also pauses every other caller until it passes),
+- and records how long calls waited for a slot.
+
+With a shared_path the buckets and the server-requested pause live in a
+small SQLite database, so the API process, its uvicorn workers and the job
+worker processes on one host draw from a single quota. The concurrency
+window stays per process.
+
+A burst of requests therefore turns into queueing latency instead of quota
+errors; QuotaExceededError only reaches the caller once the retries are used
+up or the server asks for a longer pause than max_delay.
+"""
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+# "Please retry in 12.345s" / "retry_delay { seconds: 12 }"
+_RETRY_HINTS = (
+    re.compile(r"retry in ([\d.]+)\s*(ms|s)\b", re.IGNORECASE),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),
+)
+
+
+class QuotaExceededError(Exception):
+    """Raised when Gemini responds with a quota/429 error."""
+
+    def __init__(self, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def retry_after_hint(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, if the error says so"""
+    hint = getattr(error, "retry_after", None)
+    if hint is not None:
+        return float(hint)
+    message = str(error)
+    for pattern in _RETRY_HINTS:
+        match = pattern.search(message)
+        if match:
+            seconds = float(match.group(1))
+            if match.lastindex > 1 and match.group(2).lower() == "ms":
+                seconds /= 1000
+            return seconds
+    return None
+
+
+class _TokenBucket:
+    """Refills `per_minute` units per minute up to a burst of one minute's worth"""
+
+    def __init__(self, per_minute: float, level: Optional[float] = None, updated: Optional[float] = None):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity if level is None else level
+        self.updated = time.time() if updated is None else updated
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # Oversized requests only wait for a full bucket, never forever
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        """May go negative (e.g. output tokens charged after the call)"""
+        self.level -= amount
+
+
+class _LocalBudget:
+    """Request and token buckets plus the server-requested pause, kept in this process"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_take(self, tokens: int) -> float:
+        """Take one request and `tokens` if the budget allows, else return the seconds to wait"""
+        with self._lock:
+            now = time.time()
+            wait = max(self._paused_until - now, 0.0)
+            if self._requests:
+                wait = max(wait, self._requests.wait_time(1, now))
+            if self._tokens:
+                wait = max(wait, self._tokens.wait_time(tokens, now))
+            if wait <= 0:
+                if self._requests:
+                    self._requests.take(1)
+                if self._tokens:
+                    self._tokens.take(tokens)
+            return wait
+
+    def charge(self, tokens: int):
+        with self._lock:
+            if self._tokens:
+                self._tokens.take(tokens)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+    def paused_for(self) -> float:
+        return max(self._paused_until - time.time(), 0.0)
+
+
+class _SharedBudget(_LocalBudget):
+    """The same budget in SQLite, shared by every process that uses the database file"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS quota (
+        name TEXT PRIMARY KEY,
+        level REAL NOT NULL,
+        updated REAL NOT NULL
+    );
+    """
+
+    def __init__(self, db_path: str, requests_per_minute: float, tokens_per_minute: float):
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One autocommit connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _update(self, change: Callable[[Dict[str, _TokenBucket], float], float]) -> float:
+        """Load the buckets, apply change(buckets, paused_until) and store them, in one write transaction"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows: Dict[str, Tuple[float, float]] = {
+                name: (level, updated) for name, level, updated in conn.execute("SELECT name, level, updated FROM quota")
+            }
+            buckets = {}
+            for name, per_minute in (("requests", self.requests_per_minute), ("tokens", self.tokens_per_minute)):
+                if per_minute > 0:
+                    buckets[name] = _TokenBucket(per_minute, *rows.get(name, (None, None)))
+            result = change(buckets, rows.get("paused_until", (0.0, 0.0))[0])
+            conn.executemany(
+                "INSERT OR REPLACE INTO quota (name, level, updated) VALUES (?, ?, ?)",
+                [(name, bucket.level, bucket.updated) for name, bucket in buckets.items()],
+            )
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def try_take(self, tokens: int) -> float:
+        def take(buckets: Dict[str, _TokenBucket], paused_until: float) -> float:
+            now = time.time()
+            wait = max(paused_until - now, 0.0)
+            for name, amount in (("requests", 1), ("tokens", tokens)):
+                if name in buckets:
+                    wait = max(wait, buckets[name].wait_time(amount, now))
+            if wait <= 0:
+                for name, amount in (("requests", 1), ("tokens", tokens)):
+                    if name in buckets:
+                        buckets[name].take(amount)
+            return wait
+        return self._update(take)
+
+    def charge(self, tokens: int):
+        def take(buckets: Dict[str, _TokenBucket], _) -> float:
+            if "tokens" in buckets:
+                buckets["tokens"].take(tokens)
+            return 0.0
+        self._update(take)
+
+    def pause(self, seconds: float):
+        until = time.time() + seconds
+        self._conn().execute(
+            "INSERT INTO quota (name, level, updated) VALUES ('paused_until', ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET level = MAX(level, excluded.level), updated = excluded.updated",
+            (until, time.time()),
+        )
+
+    def paused_for(self) -> float:
+        row = self._conn().execute("SELECT level FROM quota WHERE name = 'paused_until'").fetchone()
+        return max(row[0] - time.time(), 0.0) if row else 0.0
+
+
+class _Ticket:
+    __slots__ = ("started",)
+
+    def __init__(self, started: float):
+        self.started = started
+
+
+class QuotaScheduler:
+    """Process-wide pacing, adaptive concurrency and 429 retries for LLM calls"""
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        shared_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            requests_per_minute: Request budget (0 = unlimited)
+            tokens_per_minute: Input + output token budget (0 = unlimited)
+            shared_path: SQLite file holding the budget for every process on the host
+                         (None = this process has the whole budget to itself)
+            max_concurrency: Upper bound of the adaptive concurrency window
+            max_retries: Retries of a throttled call before QuotaExceededError is raised
+            base_delay: Backoff before the first retry (doubles per retry, full jitter)
+            max_delay: Longest single wait; a longer server retry delay is not waited out
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._budget = (
+            _SharedBudget(shared_path, requests_per_minute, tokens_per_minute) if shared_path
+            else _LocalBudget(requests_per_minute, tokens_per_minute)
+        )
+        self._cond = threading.Condition()
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_decrease = 0.0
+        self._queue_times = deque(maxlen=1000)
+        self.counters = {"calls": 0, "throttled": 0, "retries": 0, "failed": 0}
+
+    # Slots
+    def acquire(self, tokens: int = 0) -> _Ticket:
+        """Block until a concurrency slot and the rate budgets allow one more call"""
+        enqueued = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+        try:
+            while True:
+                with self._cond:
+                    while self._in_flight >= int(self._limit):
+                        self._cond.wait()
+                    # Hold the slot while the budget is checked
+                    self._in_flight += 1
+                # Outside the lock: with a shared budget this is a SQLite write that
+                # may wait on other processes, and release()/stats() must not wait with it
+                try:
+                    wait = self._budget.try_take(tokens)
+                except BaseException:
+                    self._return_slot()
+                    raise
+                if wait <= 0:
+                    break
+                self._return_slot()
+                with self._cond:
+                    self._cond.wait(wait)
+            with self._cond:
+                self.counters["calls"] += 1
+                started = time.monotonic()
+                self._queue_times.append(started - enqueued)
+        finally:
+            with self._cond:
+                self._waiting -= 1
+        return _Ticket(started)
+
+    def _return_slot(self):
+        """Give back a slot held while the budget was checked"""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def release(self, ticket: _Ticket, throttled: bool = False, succeeded: bool = True):
+        """Free a slot; a 429 halves the concurrency window, a success grows it"""
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self.counters["throttled"] += 1
+                # Calls started before the last decrease were sent under the old window
+                if ticket.started >= self._last_decrease and self._limit > self.min_concurrency:
+                    self._limit = max(float(self.min_concurrency), self._limit / 2)
+                    self._last_decrease = time.monotonic()
+                    print(f"[LLM] Throttled; concurrency window now {int(self._limit)}")
+            elif succeeded:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+    def charge(self, tokens: int):
+        """Count tokens known only after the call (the response) against the token budget"""
+        if self._budget.tokens_per_minute > 0 and tokens:
+            self._budget.charge(tokens)
+
+    # Retries
+    def _backoff(self, error: QuotaExceededError, attempt: int):
+        """Sleep before retrying a throttled call, or re-raise if retries are used up"""
+        hint = retry_after_hint(error)
+        if attempt >= self.max_retries or (hint is not None and hint > self.max_delay):
+            with self._cond:
+                self.counters["failed"] += 1
+            raise error
+        if hint is not None:
+            delay = hint + random.uniform(0, min(1.0, hint * 0.1) + 0.05)
+            # The quota is shared: hold every caller back, not just this one
+            self._budget.pause(hint)
+        else:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        with self._cond:
+            self.counters["retries"] += 1
+        time.sleep(delay)
+
+    def call(self, fn: Callable, *args, tokens: int = 0):
+        """Run fn(*args) in a slot, retrying 429s"""
+        attempt = 0
+        while True:
+            ticket = self.acquire(tokens)
+            try:
+                result = fn(*args)
+            except QuotaExceededError as exc:
+                self.release(ticket, throttled=True)
+                self._backoff(exc, attempt)
+                attempt += 1
+                continue
+            except BaseException:
+                self.release(ticket, succeeded=False)
+                raise
+            self.release(ticket)
+            return result
+
+    def stream(self, open_stream: Callable[[], Iterator[str]], tokens: int = 0) -> Iterator[str]:
+        """
+        Iterate open_stream() in a slot. A 429 is retried only before the
+        first chunk; after that the partial output has already been consumed.
+        """
+        attempt = 0
+        while True:
+            ticket = self.acquire(tokens)
+            started = False
+            try:
+                for chunk in open_stream():
+                    started = True
+                    yield chunk
+            except QuotaExceededError as exc:
+                self.release(ticket, throttled=True)
+                if started:
+                    raise
+                self._backoff(exc, attempt)
+                attempt += 1
+                continue
+            except BaseException:
+                self.release(ticket, succeeded=False)
+                raise
+            self.release(ticket)
+            return
+
+    # Metrics
+    def stats(self) -> Dict:
+        paused = self._budget.paused_for()
+        with self._cond:
+            waits = sorted(self._queue_times)
+            stats = dict(
+                self.counters,
+                concurrency_limit=int(self._limit),
+                max_concurrency=self.max_concurrency,
+                in_flight=self._in_flight,
+                waiting=self._waiting,
+                paused_for_sec=round(paused, 1),
+                requests_per_minute=self._budget.requests_per_minute,
+                tokens_per_minute=self._budget.tokens_per_minute,
+                shared_budget=isinstance(self._budget, _SharedBudget),
+            )
+        if waits:
+            stats["queue_time_ms"] = {
+                "avg": round(sum(waits) / len(waits) * 1000, 1),
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1),
+                "max": round(waits[-1] * 1000, 1),
+                "samples": len(waits),
+            }
+        else:
+            stats["queue_time_ms"] = {"avg": 0.0, "p95": 0.0, "max": 0.0, "samples": 0}
+        return stats
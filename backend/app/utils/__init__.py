@@ -1,4 +1,9 @@
 """Utility modules"""
-from .state_manager import state, StateManager
+from .state_manager import state, StateBackend, StateManager, create_state
+from .content_store import ContentStore, ParseCache, UploadTooLarge
+from .upload_sessions import UploadSessionManager, UploadError
 
-__all__ = ['state', 'StateManager']
+__all__ = [
+    'state', 'StateBackend', 'StateManager', 'create_state', 'ContentStore', 'ParseCache', 'UploadTooLarge',
+    'UploadSessionManager', 'UploadError',
+]
@@ -0,0 +1,140 @@
+"""
+Size-, weight- and age-bounded dict with LRU eviction.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+class BoundedDict:
+    """
+    Dict that evicts least-recently-used entries past its limits.
+
+    Entries are kept in access order, so the oldest entry is always at the
+    front: TTL expiry and LRU eviction both scan from there and stop at the
+    first entry that may stay. All limits are optional (0 disables).
+
+    Operations are serialized by `lock` (re-entrant, so pinned/on_evict
+    callbacks may call back in); critical sections are O(1) apart from the
+    eviction scan.
+
+    Args:
+        max_items: Maximum number of entries
+        ttl: Seconds an entry may go unaccessed before it expires
+        max_weight: Budget for the summed weigher(value) of all entries
+        weigher: Cost of one value (e.g. approximate bytes); defaults to 1
+        pinned: Entries for which pinned(key, value) is True are never
+                evicted (e.g. jobs that are still running)
+        on_evict: Called with (key, value) for every evicted entry
+    """
+
+    def __init__(
+        self,
+        max_items: int = 0,
+        ttl: float = 0,
+        max_weight: int = 0,
+        weigher: Optional[Callable[[Any], int]] = None,
+        pinned: Optional[Callable[[Hashable, Any], bool]] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self.pinned = pinned
+        self.on_evict = on_evict
+        # key -> (value, weight, last_access)
+        self._data: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self.weight = 0
+        self.evictions = {"lru": 0, "ttl": 0, "weight": 0}
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def __iter__(self) -> Iterator[Hashable]:
+        with self.lock:
+            return iter(list(self._data))
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value and mark it as recently used"""
+        with self.lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, weight, last_access = entry
+            now = time.monotonic()
+            if self.ttl and now - last_access > self.ttl and not self._is_pinned(key, value):
+                self._evict(key, "ttl")
+                return default
+            self._data[key] = (value, weight, now)
+            self._data.move_to_end(key)
+            return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value without touching its recency"""
+        entry = self._data.get(key)
+        return entry[0] if entry is not None else default
+
+    def set(self, key: Hashable, value: Any):
+        weight = self.weigher(value) if self.weigher else 1
+        with self.lock:
+            if key in self._data:
+                self.weight -= self._data.pop(key)[1]
+            self._data[key] = (value, weight, time.monotonic())
+            self.weight += weight
+            self._enforce_limits(protect=key)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry (not counted as an eviction)"""
+        with self.lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self.weight -= entry[1]
+            return entry[0]
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of (key, value) pairs in LRU order (oldest first)"""
+        with self.lock:
+            return [(key, entry[0]) for key, entry in self._data.items()]
+
+    def values(self) -> List[Any]:
+        with self.lock:
+            return [entry[0] for entry in self._data.values()]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"items": len(self._data), "weight": self.weight, "evictions": dict(self.evictions)}
+
+    def _is_pinned(self, key: Hashable, value: Any) -> bool:
+        return bool(self.pinned and self.pinned(key, value))
+
+    def _enforce_limits(self, protect: Hashable):
+        """Expire stale entries, then evict from the LRU end until within limits"""
+        now = time.monotonic()
+        count, weight = len(self._data), self.weight
+        victims = []
+        for key, (value, entry_weight, last_access) in self._data.items():
+            expired = bool(self.ttl) and now - last_access > self.ttl
+            over_items = bool(self.max_items) and count > self.max_items
+            over_weight = bool(self.max_weight) and weight > self.max_weight
+            if not (expired or over_items or over_weight):
+                break  # everything after this is newer and fits
+            if key == protect or self._is_pinned(key, value):
+                continue
+            victims.append((key, "ttl" if expired else "lru" if over_items else "weight"))
+            count -= 1
+            weight -= entry_weight
+        for key, reason in victims:
+            self._evict(key, reason)
+
+    def _evict(self, key: Hashable, reason: str):
+        value = self.pop(key)
+        self.evictions[reason] += 1
+        if self.on_evict:
+            self.on_evict(key, value)
@@ -0,0 +1,119 @@
+"""
+Content-addressed upload storage and on-disk parse cache.
+"""
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.models.slide_record import SlideRecord, to_api_slides
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload grows past the configured size limit."""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"Upload exceeds the {max_size // (1024 * 1024)} MB limit")
+        self.max_size = max_size
+
+
+class BlobWriter:
+    """
+    Writes an upload to a temp file and hashes it in the same pass.
+
+    With append=True an existing partial file is re-hashed and extended, which
+    is how chunked uploads resume after a restart.
+    """
+
+    def __init__(self, path: Path, max_size: int = 0, append: bool = False):
+        self.path = Path(path)
+        self.max_size = max_size
+        self.digest = hashlib.sha256()
+        self.size = 0
+        if append and self.path.exists():
+            with open(self.path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    self.digest.update(chunk)
+                    self.size += len(chunk)
+        self._file = open(self.path, "ab" if append else "wb")
+
+    def write(self, chunk: bytes):
+        if self.max_size and self.size + len(chunk) > self.max_size:
+            raise UploadTooLarge(self.max_size)
+        self._file.write(chunk)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def hexdigest(self) -> str:
+        return self.digest.hexdigest()
+
+
+class ContentStore:
+    """Stores uploaded decks once per SHA-256 of their bytes"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, content_hash: str, extension: str) -> Path:
+        """Blob path for a content hash (extension keeps .ppt/.pptx apart)"""
+        return self.root / f"{content_hash}{extension.lower()}"
+
+    def temp_path(self) -> Path:
+        """Unique temp file inside the store (same filesystem, so commit is a rename)"""
+        return self.root / f".{uuid.uuid4().hex}.part"
+
+    def commit(self, tmp_path: Path, content_hash: str, extension: str) -> Tuple[Path, bool]:
+        """Move a fully written temp file into place, or drop it if the blob exists"""
+        blob_path = self.path_for(content_hash, extension)
+        if blob_path.exists():
+            return blob_path, True
+        os.replace(tmp_path, blob_path)
+        return blob_path, False
+
+
+class ParseCache:
+    """Persists parse results keyed by content hash and parser version"""
+
+    def __init__(self, root: Path, parser_version: str):
+        self.parser_version = parser_version
+        self.root = Path(root) / f"v{parser_version}"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, content_hash: str) -> Path:
+        return self.root / f"{content_hash}.json"
+
+    def get(self, content_hash: str) -> Optional[Dict]:
+        """Return the stored parse result (slides, summary, part_hashes) for a deck, if any"""
+        path = self._path(content_hash)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[ParseCache] Ignoring unreadable entry {path.name}: {e}")
+            return None
+        pool: Dict[str, str] = {}
+        result["slides"] = [SlideRecord.from_dict(s, pool) for s in result["slides"]]
+        return result
+
+    def set(self, content_hash: str, result: Dict):
+        """Write a parse result atomically"""
+        path = self._path(content_hash)
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(result, slides=to_api_slides(result["slides"])), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
@@ -0,0 +1,187 @@
+"""
+Durable background job queue on SQLite.
+
+Jobs (parsing, narrated PPT generation) are rows in a small WAL database, so
+they survive API restarts and can be consumed by any number of worker
+processes on the same host. A worker leases one job at a time; the lease
+must be renewed while the job runs. A job whose worker dies is picked up
+again once its lease expires, and failed attempts are retried with
+exponential backoff until max_attempts is used up.
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, available_at);
+"""
+
+# queued -> leased -> done | queued (retry) | failed
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+
+
+class JobQueue:
+    """Lease-based job queue shared by every process using the same database file"""
+
+    def __init__(self, db_path: str, lease_seconds: float = 120, max_attempts: int = 3, retry_delay: float = 5):
+        """
+        Args:
+            db_path: SQLite database file
+            lease_seconds: How long a leased job stays claimed without a renew()
+            max_attempts: Default number of attempts before a job is marked failed
+            retry_delay: Backoff before the first retry (doubles on each attempt)
+        """
+        self.db_path = str(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One autocommit connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def enqueue(self, kind: str, payload: Dict, max_attempts: Optional[int] = None) -> int:
+        """Add a job and return its id"""
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO jobs (kind, payload, status, max_attempts, available_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload, ensure_ascii=False), QUEUED, max_attempts or self.max_attempts, now, now, now),
+        )
+        return cursor.lastrowid
+
+    def lease(self, owner: str) -> Optional[Dict]:
+        """
+        Claim the oldest runnable job: a queued job whose backoff has passed,
+        or a leased job whose worker stopped renewing it.
+
+        Returns:
+            Job dict (job_id, kind, payload, attempts, max_attempts) or None.
+            attempts counts this lease, so attempts > max_attempts means the
+            job already used up its retries and should be given up.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id, kind, payload, attempts, max_attempts FROM jobs "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?) "
+                "ORDER BY available_at, job_id LIMIT 1",
+                (QUEUED, now, LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, kind, payload, attempts, max_attempts = row
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (LEASED, owner, now + self.lease_seconds, attempts + 1, now, job_id),
+            )
+        return {
+            "job_id": job_id,
+            "kind": kind,
+            "payload": json.loads(payload),
+            "attempts": attempts + 1,
+            "max_attempts": max_attempts,
+        }
+
+    def renew(self, job_id: int, owner: str) -> bool:
+        """Extend a lease; False if it expired and another worker took the job"""
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE job_id = ? AND status = ? AND lease_owner = ?",
+            (now + self.lease_seconds, now, job_id, LEASED, owner),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, owner: str) -> bool:
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE job_id = ? AND status = ? AND lease_owner = ?",
+            (DONE, now, job_id, LEASED, owner),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, owner: str, error: str, retry: bool = True) -> str:
+        """
+        Record a failed attempt and schedule a retry if attempts remain.
+
+        Returns:
+            New status: "queued" (will be retried), "failed", or "" if the
+            lease was lost to another worker
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                (job_id, LEASED, owner),
+            ).fetchone()
+            if row is None:
+                return ""
+            attempts, max_attempts = row
+            status = QUEUED if retry and attempts < max_attempts else FAILED
+            delay = self.retry_delay * 2 ** (attempts - 1)
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "last_error = ?, updated_at = ? WHERE job_id = ?",
+                (status, now + delay, error[:2000], now, job_id),
+            )
+        return status
+
+    def purge(self, max_age: float) -> int:
+        """Delete finished (done or failed) jobs older than max_age seconds"""
+        cursor = self._conn().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (DONE, FAILED, time.time() - max_age),
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        oldest = self._conn().execute(
+            "SELECT MIN(created_at) FROM jobs WHERE status = ?", (QUEUED,)
+        ).fetchone()
+        counts["oldest_queued_age"] = round(time.time() - oldest[0], 1) if oldest[0] else 0
+        return counts
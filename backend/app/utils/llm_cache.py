@@ -0,0 +1,67 @@
+"""
+Persistent LLM response cache.
+
+Responses are keyed by a hash of the model name and the exact prompt, so an
+identical deck uploaded under another file_id (or re-uploaded after deletion)
+and repeated translations are answered without calling the model. Entries
+live in a small SQLite database shared by all processes on the host and are
+evicted least-recently-used first once the stored size exceeds max_bytes.
+"""
+import hashlib
+import time
+import zlib
+from typing import Optional
+
+from .sqlite_lru import SQLiteLRUStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_access ON responses (last_access);
+"""
+
+
+class LLMCache(SQLiteLRUStore):
+    """Content-addressed (model, prompt) -> response text cache with size-based LRU eviction"""
+
+    TABLE = "responses"
+    SCHEMA = SCHEMA
+    KEY_COLUMNS = ("key",)
+
+    def __init__(self, db_path: str, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(db_path, max_bytes)
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        """Cached response for this exact prompt and model, if any"""
+        key = self.key(model, prompt)
+        conn = self._conn()
+        row = conn.execute("SELECT data FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        conn.execute(
+            "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+        )
+        self._count("hits")
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def set(self, model: str, prompt: str, response: str):
+        data = zlib.compress(response.encode("utf-8"))
+        if self.max_bytes and len(data) > self.max_bytes:
+            return
+        now = time.time()
+        self._store([{
+            "key": self.key(model, prompt), "model": model, "size": len(data),
+            "created_at": now, "last_access": now, "data": data,
+        }])
@@ -0,0 +1,287 @@
+"""
+Disk retention for uploads, generated outputs and caches.
+
+A background thread periodically:
+  1. purges expired state (uploads and narration jobs past their retention
+     age that are no longer active), which releases their files,
+  2. deletes unreferenced files older than their directory's max age,
+  3. if total usage is still above the disk quota, deletes the least
+     recently modified unreferenced files, then purges the oldest inactive
+     uploads, until usage fits.
+
+Files referenced by live state (upload blobs, converted decks, parse cache
+entries, generated scripts, narrated decks of live jobs) or held by a running
+task via `hold()` are never removed, and nothing younger than the grace
+period is touched by the quota pass. Holds are recorded in the state backend,
+so a sweeper in the API process also sees holds taken by job workers. Files
+written after the oldest running narration job started (its per-slide audio,
+which is named at random) are kept until the job finishes.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+from app.utils.state_manager import StateBackend
+
+
+class RetentionRule(NamedTuple):
+    """Files matching `pattern` under `root` expire after `max_age` seconds (0 = never)"""
+    root: Path
+    pattern: str
+    max_age: float
+
+
+class RetentionSweeper:
+    """Age- and quota-based cleanup that never touches referenced files"""
+
+    def __init__(
+        self,
+        state: StateBackend,
+        rules: List[RetentionRule],
+        upload_retention: float,
+        job_retention: float,
+        quota_bytes: int = 0,
+        grace: float = 600,
+        interval: float = 900,
+        extra_sweeps: Optional[List[Callable[[], tuple]]] = None,
+    ):
+        """
+        Args:
+            state: State backend whose entries define what is referenced
+            rules: Directories to manage and their max file age
+            upload_retention: Seconds after upload before an inactive file entry is purged
+            job_retention: Seconds after creation before a finished job is purged
+            quota_bytes: Cap on total bytes under all rule roots (0 = unlimited)
+            grace: Files younger than this are never removed by the quota pass
+            interval: Seconds between sweeps
+            extra_sweeps: Callables returning (items removed, bytes reclaimed),
+                          e.g. expiry of stale chunked upload sessions
+        """
+        self.state = state
+        self.rules = rules
+        self.upload_retention = upload_retention
+        self.job_retention = job_retention
+        self.quota_bytes = quota_bytes
+        self.grace = grace
+        self.interval = interval
+        self.extra_sweeps = extra_sweeps or []
+        self._live_names: Set[str] = set()
+        self._active_since: Optional[float] = None
+        self._sweep_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_report: Dict = {}
+        self.totals = {"sweeps": 0, "files_removed": 0, "bytes_reclaimed": 0, "entries_purged": 0}
+
+    # Reference tracking
+    @contextmanager
+    def hold(self, *paths):
+        """Protect paths from deletion while a task (in this or any worker process) is using them"""
+        hold_ids = [self.state.add_file_hold(str(Path(p).resolve())) for p in paths if p]
+        try:
+            yield
+        finally:
+            for hold_id in hold_ids:
+                self.state.release_file_hold(hold_id)
+
+    def _referenced(self) -> Set[Path]:
+        """Every path that live state or a running task still needs"""
+        refs: Set[Path] = set()
+        hashes: Set[str] = set()
+        file_ids: Set[str] = set()
+        for data in self.state.list_uploaded_files():
+            file_ids.add(data["file_id"])
+            if data.get("content_hash"):
+                hashes.add(data["content_hash"])
+            for key in ("path", "pptx_path"):
+                if data.get(key):
+                    refs.add(Path(data[key]).resolve())
+        running_since = []
+        for job in self.state.list_ppt_jobs():
+            result = job.get("result") or {}
+            if result.get("path"):
+                refs.add(Path(result["path"]).resolve())
+            if job.get("status") == "processing" and job.get("created_at"):
+                running_since.append(job["created_at"])
+        # Jobs older than the job retention are treated as abandoned, like their holds
+        now = time.time()
+        running_since = [t for t in running_since if not self.job_retention or now - t <= self.job_retention]
+        self._active_since = min(running_since) if running_since else None
+        refs |= {Path(p) for p in self.state.list_file_holds(self.job_retention)}
+        # Files named after live entries: parse cache (<hash>.json) and scripts (<file_id>_script.txt)
+        self._live_names = {f"{h}.json" for h in hashes} | {f"{fid}_script.txt" for fid in file_ids}
+        return refs
+
+    def _is_referenced(self, path: Path, refs: Set[Path], mtime: float) -> bool:
+        if self._active_since is not None and mtime >= self._active_since:
+            return True  # possibly written by a narration job that is still running
+        return path.resolve() in refs or path.name in self._live_names
+
+    # State expiry
+    def _active_file_ids(self) -> Set[str]:
+        """Files a running narration job still depends on"""
+        return {job.get("file_id") for job in self.state.list_ppt_jobs() if job.get("status") == "processing"}
+
+    def _purge_file(self, file_id: str):
+        self.state.delete_uploaded_file(file_id)
+        self.state.clear_generation_cache_for_file(file_id)
+
+    def _purge_expired_state(self, now: float) -> int:
+        purged = 0
+        if self.job_retention:
+            for job in self.state.list_ppt_jobs():
+                if job.get("status") != "processing" and now - job.get("created_at", now) > self.job_retention:
+                    self.state.delete_ppt_job(job["job_id"])
+                    purged += 1
+        if self.upload_retention:
+            active = self._active_file_ids()
+            for data in self.state.list_uploaded_files():
+                file_id = data["file_id"]
+                if file_id in active or self._parse_running(file_id):
+                    continue
+                if now - data.get("uploaded_at", now) > self.upload_retention:
+                    self._purge_file(file_id)
+                    purged += 1
+        return purged
+
+    def _parse_running(self, file_id: str) -> bool:
+        status = self.state.get_parse_status(file_id)
+        return bool(status) and status.get("status") in ("pending", "processing")
+
+    # File sweeping
+    def _scan(self) -> List[tuple]:
+        """(path, size, mtime, max_age) for every managed file"""
+        files = []
+        seen = set()
+        for rule in self.rules:
+            if not rule.root.exists():
+                continue
+            for path in rule.root.glob(rule.pattern):
+                try:
+                    if not path.is_file() or path in seen:
+                        continue
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                seen.add(path)
+                files.append((path, stat.st_size, stat.st_mtime, rule.max_age))
+        return files
+
+    @staticmethod
+    def _remove(path: Path) -> bool:
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False  # another worker got there first
+        except OSError as exc:
+            print(f"[Retention] Could not remove {path}: {exc}")
+            return False
+
+    def sweep(self) -> Dict:
+        """Run one full sweep and return what it reclaimed"""
+        with self._sweep_lock:
+            start = time.time()
+            report = {"files_removed": 0, "bytes_reclaimed": 0, "entries_purged": 0}
+
+            report["entries_purged"] += self._purge_expired_state(start)
+            for extra in self.extra_sweeps:
+                removed, reclaimed = extra()
+                report["files_removed"] += removed
+                report["bytes_reclaimed"] += reclaimed
+
+            refs = self._referenced()
+            files = []
+            for path, size, mtime, max_age in self._scan():
+                if max_age and start - mtime > max_age and not self._is_referenced(path, refs, mtime):
+                    if self._remove(path):
+                        report["files_removed"] += 1
+                        report["bytes_reclaimed"] += size
+                    continue
+                files.append((path, size, mtime))
+
+            usage = sum(size for _, size, _ in files)
+            if self.quota_bytes and usage > self.quota_bytes:
+                usage = self._enforce_quota(files, usage, start, report)
+
+            report.update(
+                usage_bytes=usage,
+                quota_bytes=self.quota_bytes,
+                duration=round(time.time() - start, 3),
+                finished_at=time.time(),
+            )
+            self.last_report = report
+            self.totals["sweeps"] += 1
+            for key in ("files_removed", "bytes_reclaimed", "entries_purged"):
+                self.totals[key] += report[key]
+            if report["files_removed"] or report["entries_purged"]:
+                print(
+                    f"[Retention] Removed {report['files_removed']} files "
+                    f"({report['bytes_reclaimed'] / 1024 / 1024:.1f} MB), purged {report['entries_purged']} entries; "
+                    f"usage {usage / 1024 / 1024:.1f} MB"
+                )
+            return report
+
+    def _enforce_quota(self, files: List[tuple], usage: int, now: float, report: Dict) -> int:
+        """Delete oldest unreferenced files, then release the oldest inactive uploads"""
+        def evict_unreferenced(usage: int) -> int:
+            refs = self._referenced()
+            remaining = []
+            for path, size, mtime in sorted(files, key=lambda f: f[2]):
+                if usage > self.quota_bytes and now - mtime > self.grace and not self._is_referenced(path, refs, mtime):
+                    if self._remove(path):
+                        report["files_removed"] += 1
+                        report["bytes_reclaimed"] += size
+                        usage -= size
+                    continue
+                remaining.append((path, size, mtime))
+            files[:] = remaining
+            return usage
+
+        usage = evict_unreferenced(usage)
+        if usage <= self.quota_bytes:
+            return usage
+
+        # Still over quota: give up the oldest finished uploads so their blobs become unreferenced
+        active = self._active_file_ids()
+        candidates = sorted(
+            (d for d in self.state.list_uploaded_files()
+             if d["file_id"] not in active and not self._parse_running(d["file_id"])),
+            key=lambda d: d.get("uploaded_at", 0),
+        )
+        for data in candidates:
+            if usage <= self.quota_bytes:
+                break
+            self._purge_file(data["file_id"])
+            report["entries_purged"] += 1
+            usage = evict_unreferenced(usage)
+        if usage > self.quota_bytes:
+            print(f"[Retention] Disk usage {usage / 1024 / 1024:.1f} MB still above quota (files in use)")
+        return usage
+
+    # Background thread
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as exc:
+                print(f"[Retention] Sweep failed: {exc}")
+            self._stop.wait(self.interval)
+
+    def stats(self) -> Dict:
+        return {"totals": dict(self.totals), "last_sweep": dict(self.last_report)}
@@ -0,0 +1,78 @@
+"""
+Single-flight coalescing of identical in-flight async calls.
+
+The first caller for a key (the leader) does the work; callers arriving
+while it runs (followers) await the leader's outcome instead of starting
+their own, and receive its result or its exception. Used so a double-click
+or several reviewers opening the same deck cost one LLM call, not N.
+Coalescing is per process (one event loop).
+"""
+import asyncio
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Key -> in-flight future registry"""
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.counters = {"leaders": 0, "followers": 0}
+
+    def running(self, key: str) -> Optional[asyncio.Future]:
+        """Future of the call currently in flight for key, if any"""
+        return self._flights.get(key)
+
+    @contextmanager
+    def lead(self, key: str) -> Iterator[asyncio.Future]:
+        """
+        Register the caller as leader for key. The caller must set_result() on
+        the yielded future; an exception escaping the block is handed to the
+        followers, and leaving without a result (e.g. a closed stream) cancels
+        the flight so the followers run the call themselves.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        self.counters["leaders"] += 1
+        try:
+            yield future
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+                future.exception()  # followers may be gone; do not warn about an unretrieved error
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    async def wait(self, future: asyncio.Future):
+        """
+        Follow a flight. Raises the leader's exception, or CancelledError if
+        the leader stopped without a result.
+        """
+        self.counters["followers"] += 1
+        # shield: a follower going away must not cancel the leader's future
+        return await asyncio.shield(future)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn() unless an identical call is in flight; either way return its result"""
+        while True:
+            future = self.running(key)
+            if future is None:
+                with self.lead(key) as future:
+                    result = await fn()
+                    future.set_result(result)
+                    return result
+            try:
+                return await self.wait(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # this caller was cancelled, not the leader
+                # The leader gave up; try again (possibly as the new leader)
+
+    def stats(self) -> Dict:
+        return dict(self.counters, in_flight=len(self._flights))
@@ -0,0 +1,134 @@
+"""
+Size-bounded SQLite stores with least-recently-used eviction.
+
+Base for the LLM response cache and the translation memory. Each store is
+one table with a `size`, `last_access` and `data` column; the database is
+shared by all processes on the host. The stored size is kept as a running
+total in the `lru_totals` table, updated in the same transaction as every
+insert and eviction, so writes never have to sum the whole table.
+"""
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+TOTALS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lru_totals (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+"""
+
+
+class SQLiteLRUStore:
+    """Per-thread connections, hit/miss counters and LRU eviction for one table (set TABLE, SCHEMA, KEY_COLUMNS)"""
+
+    TABLE = ""
+    SCHEMA = ""
+    KEY_COLUMNS: Tuple[str, ...] = ()
+
+    def __init__(self, db_path: str, max_bytes: int):
+        self.db_path = str(db_path)
+        self.max_bytes = max_bytes
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._key_where = " AND ".join(f"{column} = ?" for column in self.KEY_COLUMNS)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA + TOTALS_SCHEMA)
+        # Stores created before the running total existed are summed once
+        conn.execute(
+            f"INSERT OR IGNORE INTO lru_totals (name, size) SELECT ?, COALESCE(SUM(size), 0) FROM {self.TABLE}",
+            (self.TABLE,),
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        """One autocommit connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._counter_lock:
+            self.counters[counter] += amount
+
+    def _total(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT size FROM lru_totals WHERE name = ?", (self.TABLE,)).fetchone()[0]
+
+    def _add_total(self, conn: sqlite3.Connection, delta: int):
+        conn.execute("UPDATE lru_totals SET size = size + ? WHERE name = ?", (delta, self.TABLE))
+
+    def _store(self, rows: List[Dict]):
+        """Insert or replace rows (column -> value, including `size`), then evict if over max_bytes"""
+        # Last row wins when two rows share a key, as with sequential INSERT OR REPLACE
+        unique = {tuple(row[column] for column in self.KEY_COLUMNS): row for row in rows}
+        if not unique:
+            return
+        columns = list(next(iter(unique.values())))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            replaced = 0
+            for key in unique:
+                old = conn.execute(f"SELECT size FROM {self.TABLE} WHERE {self._key_where}", key).fetchone()
+                if old:
+                    replaced += old[0]
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.TABLE} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                [tuple(row[column] for column in columns) for row in unique.values()],
+            )
+            self._add_total(conn, sum(row["size"] for row in unique.values()) - replaced)
+            total = self._total(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("stores", len(unique))
+        if self.max_bytes and total > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the store is back under 90% of max_bytes"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may already have evicted
+            total = self._total(conn)
+            if total <= self.max_bytes:
+                conn.execute("COMMIT")
+                return
+            target = self.max_bytes * 0.9
+            victims = []
+            freed = 0
+            for *key, size in conn.execute(
+                f"SELECT {', '.join(self.KEY_COLUMNS)}, size FROM {self.TABLE} ORDER BY last_access"
+            ):
+                if total - freed <= target:
+                    break
+                victims.append(tuple(key))
+                freed += size
+            conn.executemany(f"DELETE FROM {self.TABLE} WHERE {self._key_where}", victims)
+            self._add_total(conn, -freed)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("evictions", len(victims))
+
+    def stats(self) -> Dict:
+        """Per-process hit/miss counters plus the shared store size"""
+        conn = self._conn()
+        entries = conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+        size = self._total(conn)
+        with self._counter_lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 3) if lookups else 0.0
+        return dict(counters, entries=entries, size_bytes=size, max_bytes=self.max_bytes)
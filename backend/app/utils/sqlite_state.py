@@ -0,0 +1,320 @@
+"""
+SQLite state backend.
+
+The database runs in WAL mode so any number of uvicorn worker processes on
+the same host can read concurrently while one writes. Slides are stored one
+row per slide as zlib-compressed positional JSON (SlideRecord.to_row), which
+keeps appends during streaming parses cheap and the file small.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.models.slide_record import SlideRecord
+from app.utils.state_manager import StateBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploaded_files (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_id TEXT NOT NULL UNIQUE,
+    filename TEXT,
+    path TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_name ON uploaded_files (filename, status);
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_path ON uploaded_files (path);
+
+CREATE TABLE IF NOT EXISTS slides (
+    file_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (file_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS parse_status (
+    file_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS generation_cache (
+    cache_key TEXT PRIMARY KEY,
+    file_id TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_generation_cache_file ON generation_cache (file_id);
+
+CREATE TABLE IF NOT EXISTS ppt_jobs (
+    job_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS file_holds (
+    hold_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(_dumps(value).encode("utf-8"))
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class SQLiteStateManager(StateBackend):
+    """Persistent state shared by every process using the same database file"""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        print(f"[State] SQLite state at {self.db_path}")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: autocommit, explicit BEGIN IMMEDIATE for read-modify-write
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._conn())
+
+    # Uploaded Files
+    def _write_file_row(self, conn: sqlite3.Connection, file_id: str, data: Dict):
+        meta = {k: v for k, v in data.items() if k != "slides"}
+        conn.execute(
+            "INSERT INTO uploaded_files (file_id, filename, path, status, data) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(file_id) DO UPDATE SET filename=excluded.filename, path=excluded.path, "
+            "status=excluded.status, data=excluded.data",
+            (file_id, meta.get("filename"), meta.get("path"), meta.get("status"), _dumps(meta)),
+        )
+
+    def add_uploaded_file(self, file_id: str, data: Dict):
+        """Add or replace uploaded file metadata (including its "slides")"""
+        with self._transaction() as conn:
+            self._write_file_row(conn, file_id, data)
+            conn.execute("DELETE FROM slides WHERE file_id = ?", (file_id,))
+            conn.executemany(
+                "INSERT INTO slides (file_id, position, data) VALUES (?, ?, ?)",
+                [(file_id, i, _pack(slide.to_row())) for i, slide in enumerate(data.get("slides", []))],
+            )
+
+    def update_uploaded_file(self, file_id: str, updates: Dict):
+        """Merge fields into existing uploaded file metadata"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM uploaded_files WHERE file_id = ?", (file_id,)).fetchone()
+            if row is None:
+                return
+            meta = json.loads(row[0])
+            meta.update({k: v for k, v in updates.items() if k != "slides"})
+            self._write_file_row(conn, file_id, meta)
+            if "slides" in updates:
+                conn.execute("DELETE FROM slides WHERE file_id = ?", (file_id,))
+                conn.executemany(
+                    "INSERT INTO slides (file_id, position, data) VALUES (?, ?, ?)",
+                    [(file_id, i, _pack(slide.to_row())) for i, slide in enumerate(updates["slides"])],
+                )
+
+    def get_uploaded_file(self, file_id: str) -> Optional[Dict]:
+        """Get uploaded file metadata"""
+        row = self._conn().execute("SELECT data FROM uploaded_files WHERE file_id = ?", (file_id,)).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        data["slides"] = self.get_parsed_slides(file_id)
+        return data
+
+    def append_parsed_slide(self, file_id: str, slide: SlideRecord):
+        """Publish one more parsed slide while parsing is still running"""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO slides (file_id, position, data) "
+                "SELECT ?, COALESCE(MAX(position) + 1, 0), ? FROM slides WHERE file_id = ?",
+                (file_id, _pack(slide.to_row()), file_id),
+            )
+
+    def get_parsed_slides(self, file_id: str) -> List[SlideRecord]:
+        """Get a snapshot of the slides parsed so far"""
+        rows = self._conn().execute(
+            "SELECT data FROM slides WHERE file_id = ? ORDER BY position", (file_id,)
+        ).fetchall()
+        pool: Dict[str, str] = {}
+        return [SlideRecord.from_row(_unpack(blob), pool) for (blob,) in rows]
+
+    def delete_uploaded_file(self, file_id: str):
+        """Delete uploaded file metadata (and its parse status)"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM uploaded_files WHERE file_id = ?", (file_id,))
+            conn.execute("DELETE FROM slides WHERE file_id = ?", (file_id,))
+            conn.execute("DELETE FROM parse_status WHERE file_id = ?", (file_id,))
+
+    def list_uploaded_files(self) -> List[Dict]:
+        """Metadata of every uploaded file (with its file_id, without slides)"""
+        rows = self._conn().execute("SELECT file_id, data FROM uploaded_files ORDER BY seq").fetchall()
+        return [dict(json.loads(data), file_id=file_id) for file_id, data in rows]
+
+    def find_latest_file_by_name(self, filename: str, exclude_id: Optional[str] = None) -> Optional[str]:
+        """Get the most recent fully parsed upload with the same original filename"""
+        row = self._conn().execute(
+            "SELECT file_id FROM uploaded_files WHERE filename = ? AND status = 'completed' AND file_id != ? "
+            "ORDER BY seq DESC LIMIT 1",
+            (filename, exclude_id or ""),
+        ).fetchone()
+        return row[0] if row else None
+
+    def find_file_ids_by_path(self, path: str) -> List[str]:
+        """Get all file_ids sharing the same stored blob"""
+        rows = self._conn().execute("SELECT file_id FROM uploaded_files WHERE path = ?", (path,)).fetchall()
+        return [file_id for (file_id,) in rows]
+
+    # Parse Status
+    def set_parse_status(self, file_id: str, status: Dict):
+        """Set parsing status"""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO parse_status (file_id, data) VALUES (?, ?)", (file_id, _dumps(status))
+        )
+
+    def get_parse_status(self, file_id: str) -> Optional[Dict]:
+        """Get parsing status"""
+        row = self._conn().execute("SELECT data FROM parse_status WHERE file_id = ?", (file_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def transition_parse_status(self, file_id: str, from_statuses: Iterable[Optional[str]], status: Dict) -> bool:
+        """Atomically replace the parse status if its current status is in from_statuses"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM parse_status WHERE file_id = ?", (file_id,)).fetchone()
+            if (json.loads(row[0]).get("status") if row else None) not in tuple(from_statuses):
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO parse_status (file_id, data) VALUES (?, ?)", (file_id, _dumps(status))
+            )
+            return True
+
+    # Generation Cache
+    def set_generation_cache(self, file_id: str, data: Dict):
+        """Cache generated script (keys are "<file_id>|<options>")"""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO generation_cache (cache_key, file_id, data) VALUES (?, ?, ?)",
+            (file_id, file_id.split("|", 1)[0], _pack(data)),
+        )
+
+    def get_generation_cache(self, file_id: str) -> Optional[Dict]:
+        """Get cached script"""
+        row = self._conn().execute(
+            "SELECT data FROM generation_cache WHERE cache_key = ?", (file_id,)
+        ).fetchone()
+        return _unpack(row[0]) if row else None
+
+    def clear_generation_cache_for_file(self, file_id: str):
+        """Clear all cached generations for a specific file"""
+        self._conn().execute("DELETE FROM generation_cache WHERE file_id = ?", (file_id,))
+
+    # PPT Jobs
+    def add_ppt_job(self, job_id: str, data: Dict):
+        """Add narrated PPT job"""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO ppt_jobs (job_id, data) VALUES (?, ?)", (job_id, _dumps(data))
+        )
+
+    def get_ppt_job(self, job_id: str) -> Optional[Dict]:
+        """Get PPT job status"""
+        row = self._conn().execute("SELECT data FROM ppt_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_ppt_job(self, job_id: str, updates: Dict):
+        """Update PPT job status"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM ppt_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            data = json.loads(row[0])
+            data.update(updates)
+            conn.execute("UPDATE ppt_jobs SET data = ? WHERE job_id = ?", (_dumps(data), job_id))
+
+    def transition_ppt_job(self, job_id: str, from_statuses: Iterable[str], updates: Dict) -> bool:
+        """Atomically merge updates into a job whose status is in from_statuses"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM ppt_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return False
+            data = json.loads(row[0])
+            if data.get("status") not in tuple(from_statuses):
+                return False
+            data.update(updates)
+            conn.execute("UPDATE ppt_jobs SET data = ? WHERE job_id = ?", (_dumps(data), job_id))
+            return True
+
+    def list_ppt_jobs(self) -> List[Dict]:
+        """Snapshot of every job"""
+        return [json.loads(data) for (data,) in self._conn().execute("SELECT data FROM ppt_jobs").fetchall()]
+
+    def delete_ppt_job(self, job_id: str):
+        """Remove a job record"""
+        self._conn().execute("DELETE FROM ppt_jobs WHERE job_id = ?", (job_id,))
+
+    # File Holds
+    def add_file_hold(self, path: str) -> str:
+        """Protect a file from retention while a task in any process uses it; returns the hold id"""
+        hold_id = uuid.uuid4().hex
+        self._conn().execute(
+            "INSERT INTO file_holds (hold_id, path, created_at) VALUES (?, ?, ?)", (hold_id, path, time.time())
+        )
+        return hold_id
+
+    def release_file_hold(self, hold_id: str):
+        """Release a hold taken with add_file_hold"""
+        self._conn().execute("DELETE FROM file_holds WHERE hold_id = ?", (hold_id,))
+
+    def list_file_holds(self, max_age: float = 0) -> Set[str]:
+        """Paths currently held; holds older than max_age seconds are dropped as abandoned (0 = keep all)"""
+        conn = self._conn()
+        if max_age:
+            # A worker that died mid-task never releases its holds
+            conn.execute("DELETE FROM file_holds WHERE created_at < ?", (time.time() - max_age,))
+        return {path for (path,) in conn.execute("SELECT path FROM file_holds").fetchall()}
+
+    # Monitoring
+    def stats(self) -> Dict:
+        """Row counts per table (rows live on disk, so nothing is evicted here)"""
+        conn = self._conn()
+        result = {"backend": "sqlite"}
+        for table in ("uploaded_files", "slides", "parse_status", "generation_cache", "ppt_jobs", "file_holds"):
+            (count,) = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+            result[table] = {"items": count}
+        return result
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK (takes the write lock up front)"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -1,75 +1,441 @@
 """
 Centralized state management for the application.
+
+The backend is selected with STATE_BACKEND: "memory" (default) keeps
+everything in process-local dicts; "sqlite" persists state across restarts
+and is shared by all uvicorn workers on the host.
 """
-from typing import Dict, Optional
-
-class StateManager:
-    """Manages application state including uploaded files, parse status, and jobs"""
-    
-    def __init__(self):
-        # File uploads and metadata
-        self.uploaded_files: Dict[str, Dict] = {}
-        
-        # Background parsing status
-        self.parse_status: Dict[str, Dict] = {}
-        
-        # Script generation cache
-        self.generation_cache: Dict[str, Dict] = {}
-        
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.models.slide_record import SlideRecord
+from app.utils.bounded_cache import BoundedDict
+
+
+class StateBackend(ABC):
+    """
+    Interface shared by all state backends.
+
+    Values returned by getters are snapshots: changes must be written back
+    through add_*/update_*/set_* to be visible to other requests or workers.
+    All methods are thread-safe. Status changes that race with other writers
+    (a late progress update after completion, two workers picking up the
+    same parse) go through the transition_* compare-and-set methods.
+    """
+
+    # Uploaded Files
+    @abstractmethod
+    def add_uploaded_file(self, file_id: str, data: Dict):
+        """Add or replace uploaded file metadata (including its "slides")"""
+
+    @abstractmethod
+    def update_uploaded_file(self, file_id: str, updates: Dict):
+        """Merge fields into existing uploaded file metadata"""
+
+    @abstractmethod
+    def get_uploaded_file(self, file_id: str) -> Optional[Dict]:
+        """Get uploaded file metadata"""
+
+    @abstractmethod
+    def append_parsed_slide(self, file_id: str, slide: SlideRecord):
+        """Publish one more parsed slide while parsing is still running"""
+
+    @abstractmethod
+    def get_parsed_slides(self, file_id: str) -> List[SlideRecord]:
+        """Get a snapshot of the slides parsed so far"""
+
+    @abstractmethod
+    def delete_uploaded_file(self, file_id: str):
+        """Delete uploaded file metadata (and its parse status)"""
+
+    @abstractmethod
+    def list_uploaded_files(self) -> List[Dict]:
+        """Metadata of every uploaded file (with its file_id, without slides)"""
+
+    @abstractmethod
+    def find_latest_file_by_name(self, filename: str, exclude_id: Optional[str] = None) -> Optional[str]:
+        """Get the most recent fully parsed upload with the same original filename"""
+
+    @abstractmethod
+    def find_file_ids_by_path(self, path: str) -> List[str]:
+        """Get all file_ids sharing the same stored blob"""
+
+    # Parse Status
+    @abstractmethod
+    def set_parse_status(self, file_id: str, status: Dict):
+        """Set parsing status"""
+
+    @abstractmethod
+    def get_parse_status(self, file_id: str) -> Optional[Dict]:
+        """Get parsing status"""
+
+    @abstractmethod
+    def transition_parse_status(self, file_id: str, from_statuses: Iterable[Optional[str]], status: Dict) -> bool:
+        """
+        Atomically replace the parse status if its current "status" is one of
+        from_statuses (None matches a missing entry).
+
+        Returns:
+            True if the status was written, False if another writer got there first
+        """
+
+    # Generation Cache
+    @abstractmethod
+    def set_generation_cache(self, file_id: str, data: Dict):
+        """Cache generated script"""
+
+    @abstractmethod
+    def get_generation_cache(self, file_id: str) -> Optional[Dict]:
+        """Get cached script"""
+
+    @abstractmethod
+    def clear_generation_cache_for_file(self, file_id: str):
+        """Clear all cached generations for a specific file"""
+
+    # PPT Jobs
+    @abstractmethod
+    def add_ppt_job(self, job_id: str, data: Dict):
+        """Add narrated PPT job"""
+
+    @abstractmethod
+    def get_ppt_job(self, job_id: str) -> Optional[Dict]:
+        """Get PPT job status"""
+
+    @abstractmethod
+    def update_ppt_job(self, job_id: str, updates: Dict):
+        """Update PPT job status"""
+
+    @abstractmethod
+    def transition_ppt_job(self, job_id: str, from_statuses: Iterable[str], updates: Dict) -> bool:
+        """Atomically merge updates into a job whose "status" is one of from_statuses"""
+
+    @abstractmethod
+    def list_ppt_jobs(self) -> List[Dict]:
+        """Snapshot of every job"""
+
+    @abstractmethod
+    def delete_ppt_job(self, job_id: str):
+        """Remove a job record"""
+
+    # File Holds
+    @abstractmethod
+    def add_file_hold(self, path: str) -> str:
+        """Protect a file from retention while a task in any process uses it; returns the hold id"""
+
+    @abstractmethod
+    def release_file_hold(self, hold_id: str):
+        """Release a hold taken with add_file_hold"""
+
+    @abstractmethod
+    def list_file_holds(self, max_age: float = 0) -> Set[str]:
+        """Paths currently held; holds older than max_age seconds are dropped as abandoned (0 = keep all)"""
+
+    # Monitoring
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Entry counts and eviction counters for monitoring"""
+
+
+class StateManager(StateBackend):
+    """
+    In-process state (lost on restart, not shared between workers).
+
+    Every store is a BoundedDict: files, statuses and jobs are capped by count
+    and idle age, and the generation cache by approximate bytes. Files whose
+    parse is still running and jobs still processing are never evicted.
+    Evicting a file also drops its parse status and cached generations.
+
+    Stored entries are copy-on-write: writers build a new dict and swap it
+    in, so readers get consistent snapshots without locking the entry. The
+    one exception is a file's slide list, which append_parsed_slide grows in
+    place under the file's stripe lock; readers copy it under the same lock.
+    Read-modify-write sequences on one key are serialized by lock striping;
+    each store's own lock only guards its O(1) bookkeeping.
+    """
+
+    LOCK_STRIPES = 32
+
+    def __init__(
+        self,
+        max_files: int = 0,
+        max_jobs: int = 0,
+        ttl: float = 0,
+        generation_cache_bytes: int = 0,
+    ):
+        # File uploads and metadata ("slides" holds compact SlideRecord objects)
+        self.uploaded_files = BoundedDict(
+            max_items=max_files, ttl=ttl, pinned=self._parse_running, on_evict=self._on_file_evicted
+        )
+
+        # Background parsing status (no TTL of its own; removed together with its file)
+        self.parse_status = BoundedDict(pinned=self._parse_running)
+
+        # Script generation cache, weighted by serialized size
+        self.generation_cache = BoundedDict(
+            ttl=ttl, max_weight=generation_cache_bytes, weigher=_approx_bytes, on_evict=self._on_generation_evicted
+        )
+
         # Narrated PPT job tracking
-        self.ppt_jobs: Dict[str, Dict] = {}
-    
+        self.ppt_jobs = BoundedDict(
+            max_items=max_jobs, ttl=ttl, pinned=lambda _, job: job.get("status") == "processing"
+        )
+
+        # Secondary indexes: filename/path -> file_ids (upload order), file_id -> generation cache keys
+        self._files_by_name: Dict[str, List[str]] = {}
+        self._files_by_path: Dict[str, List[str]] = {}
+        self._cache_keys_by_file: Dict[str, Set[str]] = {}
+
+        # Retention holds: hold_id -> (path, taken at)
+        self._file_holds: Dict[str, Tuple[str, float]] = {}
+        self._holds_lock = threading.Lock()
+
+        self._stripes = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def _stripe(self, key: str) -> threading.Lock:
+        """Lock guarding read-modify-write of one file_id/job_id"""
+        return self._stripes[hash(key) % self.LOCK_STRIPES]
+
+    def _parse_running(self, file_id: str, _=None) -> bool:
+        status = self.parse_status.peek(file_id)
+        return bool(status) and status.get("status") in ("pending", "processing")
+
+    def _on_file_evicted(self, file_id: str, data: Dict):
+        self._unindex_file(file_id, data)
+        self.parse_status.pop(file_id)
+        self.clear_generation_cache_for_file(file_id)
+        print(f"[State] Evicted file {file_id} ({data.get('filename')})")
+
+    def _on_generation_evicted(self, cache_key: str, _):
+        self._unindex_cache_key(cache_key)
+
+    @staticmethod
+    def _index_add(index: Dict[str, List[str]], key: Optional[str], file_id: str):
+        if key is not None:
+            index.setdefault(key, []).append(file_id)
+
+    @staticmethod
+    def _index_remove(index: Dict[str, List[str]], key: Optional[str], file_id: str):
+        file_ids = index.get(key)
+        if file_ids and file_id in file_ids:
+            file_ids.remove(file_id)
+            if not file_ids:
+                del index[key]
+
+    def _unindex_file(self, file_id: str, data: Dict):
+        self._index_remove(self._files_by_name, data.get("filename"), file_id)
+        self._index_remove(self._files_by_path, data.get("path"), file_id)
+
+    def _unindex_cache_key(self, cache_key: str):
+        file_id = cache_key.split("|", 1)[0]
+        keys = self._cache_keys_by_file.get(file_id)
+        if keys is not None:
+            keys.discard(cache_key)
+            if not keys:
+                del self._cache_keys_by_file[file_id]
+
     # Uploaded Files
     def add_uploaded_file(self, file_id: str, data: Dict):
         """Add or update uploaded file metadata"""
-        self.uploaded_files[file_id] = data
-    
+        data = dict(data, slides=list(data.get("slides", [])))
+        with self.uploaded_files.lock:
+            previous = self.uploaded_files.peek(file_id) or {}
+            for index, field in ((self._files_by_name, "filename"), (self._files_by_path, "path")):
+                # Updates keep the file's original position (upload order) in the index
+                if file_id not in index.get(data.get(field), ()):
+                    self._index_remove(index, previous.get(field), file_id)
+                    self._index_add(index, data.get(field), file_id)
+            self.uploaded_files.set(file_id, data)
+
+    def update_uploaded_file(self, file_id: str, updates: Dict):
+        """Merge fields into existing uploaded file metadata"""
+        with self._stripe(file_id):
+            file_data = self.uploaded_files.get(file_id)
+            if file_data is not None:
+                self.add_uploaded_file(file_id, dict(file_data, **updates))
+
     def get_uploaded_file(self, file_id: str) -> Optional[Dict]:
         """Get uploaded file metadata"""
-        return self.uploaded_files.get(file_id)
-    
+        with self._stripe(file_id):
+            file_data = self.uploaded_files.get(file_id)
+            # The stored slide list grows in place while parsing, so hand out a copy
+            return dict(file_data, slides=list(file_data["slides"])) if file_data is not None else None
+
+    def append_parsed_slide(self, file_id: str, slide: SlideRecord):
+        """Publish one more parsed slide while parsing is still running"""
+        with self._stripe(file_id):
+            file_data = self.uploaded_files.get(file_id)
+            if file_data is not None:
+                # add_uploaded_file() stored a private list, so appending in place is safe and O(1)
+                file_data["slides"].append(slide)
+
+    def get_parsed_slides(self, file_id: str) -> List[SlideRecord]:
+        """Get a snapshot of the slides parsed so far"""
+        with self._stripe(file_id):
+            file_data = self.uploaded_files.get(file_id)
+            return list(file_data["slides"]) if file_data else []
+
     def delete_uploaded_file(self, file_id: str):
-        """Delete uploaded file metadata"""
-        if file_id in self.uploaded_files:
-            del self.uploaded_files[file_id]
-    
+        """Delete uploaded file metadata (and its parse status)"""
+        with self.uploaded_files.lock:
+            data = self.uploaded_files.pop(file_id)
+            if data is not None:
+                self._unindex_file(file_id, data)
+        self.parse_status.pop(file_id)
+
+    def list_uploaded_files(self) -> List[Dict]:
+        """Metadata of every uploaded file (with its file_id, without slides)"""
+        return [
+            dict({k: v for k, v in data.items() if k != "slides"}, file_id=file_id)
+            for file_id, data in self.uploaded_files.items()
+        ]
+
+    def find_latest_file_by_name(self, filename: str, exclude_id: Optional[str] = None) -> Optional[str]:
+        """Get the most recent fully parsed upload with the same original filename"""
+        with self.uploaded_files.lock:
+            candidates = list(self._files_by_name.get(filename, []))
+        for file_id in reversed(candidates):
+            data = self.uploaded_files.peek(file_id)
+            if file_id != exclude_id and data and data.get("status") == "completed":
+                return file_id
+        return None
+
+    def find_file_ids_by_path(self, path: str) -> List[str]:
+        """Get all file_ids sharing the same stored blob"""
+        with self.uploaded_files.lock:
+            return list(self._files_by_path.get(path, []))
+
     # Parse Status
     def set_parse_status(self, file_id: str, status: Dict):
         """Set parsing status"""
-        self.parse_status[file_id] = status
-    
+        with self._stripe(file_id):
+            self.parse_status.set(file_id, dict(status))
+
     def get_parse_status(self, file_id: str) -> Optional[Dict]:
         """Get parsing status"""
-        return self.parse_status.get(file_id)
-    
+        status = self.parse_status.get(file_id)
+        return dict(status) if status is not None else None
+
+    def transition_parse_status(self, file_id: str, from_statuses: Iterable[Optional[str]], status: Dict) -> bool:
+        """Atomically replace the parse status if its current status is in from_statuses"""
+        with self._stripe(file_id):
+            current = self.parse_status.get(file_id)
+            if (current.get("status") if current else None) not in tuple(from_statuses):
+                return False
+            self.parse_status.set(file_id, dict(status))
+            return True
+
     # Generation Cache
     def set_generation_cache(self, file_id: str, data: Dict):
-        """Cache generated script"""
-        self.generation_cache[file_id] = data
-    
+        """Cache generated script (keys are "<file_id>|<options>")"""
+        with self.generation_cache.lock:
+            self._cache_keys_by_file.setdefault(file_id.split("|", 1)[0], set()).add(file_id)
+            self.generation_cache.set(file_id, data)
+            if self.generation_cache.peek(file_id) is None:
+                self._unindex_cache_key(file_id)  # larger than the whole budget
+
     def get_generation_cache(self, file_id: str) -> Optional[Dict]:
         """Get cached script"""
         return self.generation_cache.get(file_id)
-    
+
     def clear_generation_cache_for_file(self, file_id: str):
-        """Clear all cached generations for a specific file"""
-        keys_to_delete = [key for key in self.generation_cache.keys() if key.startswith(f"{file_id}|")]
-        for key in keys_to_delete:
-            del self.generation_cache[key]
-    
+        """Clear all cached generations for a specific file (O(k) via the per-file index)"""
+        with self.generation_cache.lock:
+            for key in self._cache_keys_by_file.pop(file_id, ()):
+                self.generation_cache.pop(key)
+
     # PPT Jobs
     def add_ppt_job(self, job_id: str, data: Dict):
         """Add narrated PPT job"""
-        self.ppt_jobs[job_id] = data
-    
+        with self._stripe(job_id):
+            self.ppt_jobs.set(job_id, dict(data))
+
     def get_ppt_job(self, job_id: str) -> Optional[Dict]:
         """Get PPT job status"""
-        return self.ppt_jobs.get(job_id)
-    
+        job = self.ppt_jobs.get(job_id)
+        return dict(job) if job is not None else None
+
     def update_ppt_job(self, job_id: str, updates: Dict):
         """Update PPT job status"""
-        if job_id in self.ppt_jobs:
-            self.ppt_jobs[job_id].update(updates)
+        with self._stripe(job_id):
+            job = self.ppt_jobs.get(job_id)
+            if job is not None:
+                self.ppt_jobs.set(job_id, dict(job, **updates))
+
+    def transition_ppt_job(self, job_id: str, from_statuses: Iterable[str], updates: Dict) -> bool:
+        """Atomically merge updates into a job whose status is in from_statuses"""
+        with self._stripe(job_id):
+            job = self.ppt_jobs.get(job_id)
+            if job is None or job.get("status") not in tuple(from_statuses):
+                return False
+            self.ppt_jobs.set(job_id, dict(job, **updates))
+            return True
+
+    def list_ppt_jobs(self) -> List[Dict]:
+        """Snapshot of every job"""
+        return [dict(job) for job in self.ppt_jobs.values()]
+
+    def delete_ppt_job(self, job_id: str):
+        """Remove a job record"""
+        self.ppt_jobs.pop(job_id)
+
+    # File Holds
+    def add_file_hold(self, path: str) -> str:
+        """Protect a file from retention while a task uses it; returns the hold id"""
+        hold_id = uuid.uuid4().hex
+        with self._holds_lock:
+            self._file_holds[hold_id] = (path, time.time())
+        return hold_id
+
+    def release_file_hold(self, hold_id: str):
+        """Release a hold taken with add_file_hold"""
+        with self._holds_lock:
+            self._file_holds.pop(hold_id, None)
+
+    def list_file_holds(self, max_age: float = 0) -> Set[str]:
+        """Paths currently held; holds older than max_age seconds are dropped as abandoned (0 = keep all)"""
+        now = time.time()
+        with self._holds_lock:
+            if max_age:
+                for hold_id, (_, taken_at) in list(self._file_holds.items()):
+                    if now - taken_at > max_age:
+                        del self._file_holds[hold_id]
+            return {path for path, _ in self._file_holds.values()}
+
+    def stats(self) -> Dict:
+        """Entry counts, weights and eviction counters per store"""
+        return {
+            "backend": "memory",
+            "uploaded_files": self.uploaded_files.stats(),
+            "parse_status": self.parse_status.stats(),
+            "generation_cache": self.generation_cache.stats(),
+            "ppt_jobs": self.ppt_jobs.stats(),
+        }
+
+
+def _approx_bytes(value) -> int:
+    """Serialized size of a cached generation (what the budget is measured in)"""
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def create_state(backend: str = "memory", db_path: Optional[str] = None) -> StateBackend:
+    """Build the configured state backend"""
+    if backend == "memory":
+        return StateManager(
+            max_files=settings.STATE_MAX_FILES,
+            max_jobs=settings.STATE_MAX_JOBS,
+            ttl=settings.STATE_TTL_HOURS * 3600,
+            generation_cache_bytes=settings.GENERATION_CACHE_MAX_MB * 1024 * 1024,
+        )
+    if backend == "sqlite":
+        from app.utils.sqlite_state import SQLiteStateManager
+        return SQLiteStateManager(db_path or str(settings.CACHE_DIR / "state.db"))
+    raise ValueError(f"Unknown STATE_BACKEND: {backend}")
+
 
 # Global state manager instance
-state = StateManager()
+state = create_state(settings.STATE_BACKEND, settings.STATE_DB_PATH)
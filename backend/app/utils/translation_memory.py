@@ -0,0 +1,90 @@
+"""
+Persistent translation memory.
+
+Translated script sections are stored under (hash of the source section,
+target language), so re-translating a script after editing a few slides, or
+translating the same opening again, only sends the changed sections to the
+model. Entries live in a small SQLite database shared by all processes on
+the host and are evicted least-recently-used first once the stored size
+exceeds max_bytes.
+"""
+import hashlib
+import time
+import zlib
+from typing import Dict, Iterable, Optional
+
+from .sqlite_lru import SQLiteLRUStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    source_hash TEXT NOT NULL,
+    language TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (source_hash, language)
+);
+CREATE INDEX IF NOT EXISTS idx_translations_access ON translations (last_access);
+"""
+
+
+class TranslationMemory(SQLiteLRUStore):
+    """(source section hash, target language) -> translated section, with size-based LRU eviction"""
+
+    TABLE = "translations"
+    SCHEMA = SCHEMA
+    KEY_COLUMNS = ("source_hash", "language")
+
+    def __init__(self, db_path: str, max_bytes: int = 128 * 1024 * 1024):
+        super().__init__(db_path, max_bytes)
+
+    @staticmethod
+    def source_hash(text: str) -> str:
+        return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+    def get_many(self, sources: Iterable[str], language: str) -> Dict[str, str]:
+        """Stored translations for the given source texts (source text -> translation)"""
+        by_hash = {self.source_hash(text): text for text in sources}
+        if not by_hash:
+            return {}
+        conn = self._conn()
+        found = {}
+        hashes = list(by_hash)
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            rows = conn.execute(
+                f"SELECT source_hash, data FROM translations WHERE language = ? "
+                f"AND source_hash IN ({','.join('?' * len(batch))})",
+                (language, *batch),
+            ).fetchall()
+            for source_hash, data in rows:
+                found[by_hash[source_hash]] = zlib.decompress(data).decode("utf-8")
+        if found:
+            conn.executemany(
+                "UPDATE translations SET last_access = ? WHERE source_hash = ? AND language = ?",
+                [(time.time(), self.source_hash(text), language) for text in found],
+            )
+        self._count("hits", len(found))
+        self._count("misses", len(by_hash) - len(found))
+        return found
+
+    def get(self, source: str, language: str) -> Optional[str]:
+        return self.get_many([source], language).get(source)
+
+    def set_many(self, translations: Dict[str, str], language: str):
+        """Store source text -> translation pairs (empty translations are skipped)"""
+        now = time.time()
+        rows = []
+        for source, translated in translations.items():
+            if not translated:
+                continue
+            data = zlib.compress(translated.encode("utf-8"))
+            if self.max_bytes and len(data) > self.max_bytes:
+                continue
+            rows.append({
+                "source_hash": self.source_hash(source), "language": language, "size": len(data),
+                "created_at": now, "last_access": now, "data": data,
+            })
+        self._store(rows)
@@ -0,0 +1,243 @@
+"""
+Resumable chunked uploads (init -> put chunks -> complete).
+
+Each session is a partial file plus a small JSON descriptor under
+`<upload dir>/incoming`, so an interrupted upload can continue from the last
+received byte, also after a server restart. Chunks must arrive in order; the
+client asks for `received_bytes` and resumes from there.
+
+Chunks of one upload may reach different API worker processes, so the
+descriptor and the partial file on disk are the source of truth: every
+operation takes a per-session file lock and re-reads the received size from
+the partial file. A process only reuses its open writer (and running hash)
+while the file still has the size that writer last wrote.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+from app.utils.content_store import BlobWriter, ContentStore, UploadTooLarge
+
+
+class UploadError(Exception):
+    """A chunked upload request that cannot be honoured (carries an HTTP status)."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UploadSessionManager:
+    """Tracks in-progress chunked uploads and commits them to the ContentStore"""
+
+    def __init__(self, store: ContentStore, max_size: int, chunk_size: int):
+        self.store = store
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.root = store.root / "incoming"
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Open writers of this process; only trusted while the partial file still matches their size
+        self._writers: Dict[str, BlobWriter] = {}
+        self._writers_lock = threading.Lock()
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.json"
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.part"
+
+    def _lock_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.lock"
+
+    def _save_meta(self, session: Dict):
+        with open(self._meta_path(session["upload_id"]), "w", encoding="utf-8") as f:
+            json.dump(session, f)
+
+    @contextmanager
+    def _session_lock(self, upload_id: str) -> Iterator[None]:
+        """Exclusive per-session lock shared by all processes on the host"""
+        # upload_id is used in file names, so only accept what create() generates
+        if not upload_id.isalnum() or not self._meta_path(upload_id).exists():
+            self._drop_writer(upload_id)
+            raise UploadError("Upload session not found.", 404)
+        with open(self._lock_path(upload_id), "a+b") as f:
+            if os.name == "nt":
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if os.name == "nt":
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _load(self, upload_id: str) -> Dict:
+        """Session descriptor from disk (another process may have completed or aborted it)"""
+        try:
+            with open(self._meta_path(upload_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            self._drop_writer(upload_id)
+            raise UploadError("Upload session not found.", 404)
+
+    def _writer(self, upload_id: str) -> BlobWriter:
+        """Writer positioned at the current end of the partial file (call under the session lock)"""
+        part_path = self._part_path(upload_id)
+        on_disk = part_path.stat().st_size if part_path.exists() else 0
+        with self._writers_lock:
+            writer = self._writers.get(upload_id)
+        if writer is not None and writer.size != on_disk:
+            # Another process appended since this writer last wrote: re-hash from disk
+            writer.close()
+            writer = None
+        if writer is None:
+            writer = BlobWriter(part_path, self.max_size, append=True)
+            with self._writers_lock:
+                self._writers[upload_id] = writer
+        return writer
+
+    def _drop_writer(self, upload_id: str):
+        with self._writers_lock:
+            writer = self._writers.pop(upload_id, None)
+        if writer:
+            writer.close()
+
+    def create(
+        self,
+        filename: str,
+        size: int,
+        sha256: Optional[str] = None,
+        previous_file_id: Optional[str] = None,
+    ) -> Dict:
+        """Start a new upload of `size` bytes"""
+        if size <= 0:
+            raise UploadError("Upload size must be positive.")
+        if self.max_size and size > self.max_size:
+            raise UploadError(str(UploadTooLarge(self.max_size)), 413)
+        upload_id = uuid.uuid4().hex
+        session = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "size": size,
+            "sha256": sha256.lower() if sha256 else None,
+            "previous_file_id": previous_file_id,
+            "created_at": time.time(),
+        }
+        self._part_path(upload_id).touch()
+        self._save_meta(session)
+        print(f"[Upload] Session {upload_id} started: {filename} ({size} bytes)")
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> Dict:
+        """Session descriptor plus the number of bytes received so far"""
+        with self._session_lock(upload_id):
+            session = self._load(upload_id)
+            return dict(session, received_bytes=self._writer(upload_id).size, chunk_size=self.chunk_size)
+
+    def append(self, upload_id: str, offset: int, data: bytes) -> int:
+        """
+        Append a chunk at `offset` and return the new received byte count.
+
+        Raises:
+            UploadError: 409 if offset is not the current end of the upload,
+                         413 if the chunk is larger than chunk_size or overflows the declared size
+        """
+        if len(data) > self.chunk_size:
+            raise UploadError(f"Chunk exceeds {self.chunk_size} bytes.", 413)
+        with self._session_lock(upload_id):
+            session = self._load(upload_id)
+            writer = self._writer(upload_id)
+            if offset != writer.size:
+                raise UploadError(f"Expected offset {writer.size}, got {offset}.", 409)
+            if writer.size + len(data) > session["size"]:
+                raise UploadError("Chunk goes past the declared upload size.", 413)
+            writer.write(data)
+            writer.flush()
+            return writer.size
+
+    def complete(self, upload_id: str) -> Tuple[Dict, str, Path, bool]:
+        """
+        Verify and move a fully received upload into the content store.
+
+        Returns:
+            Tuple of (session, content_hash, blob_path, already_stored)
+        """
+        with self._session_lock(upload_id):
+            session = self._load(upload_id)
+            writer = self._writer(upload_id)
+            if writer.size != session["size"]:
+                raise UploadError(f"Upload incomplete: {writer.size} of {session['size']} bytes received.", 409)
+            content_hash = writer.hexdigest()
+            if session["sha256"] and session["sha256"] != content_hash:
+                self._discard(upload_id)
+                raise UploadError("Checksum mismatch; upload discarded.", 422)
+            self._drop_writer(upload_id)
+            blob_path, already_stored = self.store.commit(
+                self._part_path(upload_id), content_hash, Path(session["filename"]).suffix
+            )
+            self._discard(upload_id)
+            return session, content_hash, blob_path, already_stored
+
+    def abort(self, upload_id: str):
+        with self._session_lock(upload_id):
+            self._load(upload_id)
+            self._discard(upload_id)
+
+    def expire(self, max_age: float) -> Tuple[int, int]:
+        """
+        Discard sessions that have not received data for max_age seconds.
+
+        Returns:
+            Tuple of (sessions removed, bytes reclaimed)
+        """
+        now = time.time()
+        removed, reclaimed = 0, 0
+        for meta_path in self.root.glob("*.json"):
+            upload_id = meta_path.stem
+            part_path = self._part_path(upload_id)
+            try:
+                last_write = max(meta_path.stat().st_mtime, part_path.stat().st_mtime if part_path.exists() else 0)
+            except FileNotFoundError:
+                continue
+            if now - last_write <= max_age:
+                continue
+            try:
+                with self._session_lock(upload_id):
+                    if not meta_path.exists():
+                        continue  # completed or aborted while this sweep waited for the lock
+                    size = part_path.stat().st_size if part_path.exists() else 0
+                    self._discard(upload_id)
+            except UploadError:
+                continue  # completed or aborted by another worker since the glob
+            removed += 1
+            reclaimed += size
+        for lock_path in self.root.glob("*.lock"):
+            try:
+                if not self._meta_path(lock_path.stem).exists() and now - lock_path.stat().st_mtime > max_age:
+                    lock_path.unlink()
+            except OSError:
+                continue
+        return removed, reclaimed
+
+    def _discard(self, upload_id: str):
+        self._drop_writer(upload_id)
+        for path in (self._part_path(upload_id), self._meta_path(upload_id)):
+            if path.exists():
+                os.unlink(path)
+        try:
+            os.unlink(self._lock_path(upload_id))
+        except OSError:
+            pass  # still open (Windows) or already gone; expire() removes leftovers
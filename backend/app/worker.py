@@ -0,0 +1,187 @@
+"""
+Background job worker processes.
+
+Run standalone next to the API (from backend/):
+
+    python -m app.worker --workers 4
+
+or let the API start JOB_WORKERS of them on startup. Each worker leases one
+job at a time from the SQLite job queue, renews the lease while the job runs
+and writes progress into the shared state backend, where the existing parse
+and narration status endpoints read it.
+
+Each worker converts legacy .ppt files with a single LibreOffice instance
+whose port and user profile are derived from the worker index, so worker
+processes never share one. When standalone workers run next to workers the
+API started, pass --first-index JOB_WORKERS so their indexes do not overlap.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+def _run_parse(api, payload: Dict, attempt: int):
+    api.background_parse_ppt(payload["file_id"], payload["save_path"], retry=attempt > 1, raise_transient=True)
+
+
+def _abandon_parse(api, payload: Dict, error: str):
+    api.state.transition_parse_status(
+        payload["file_id"], ("pending", "processing"), {"status": "failed", "progress": 0, "message": error}
+    )
+
+
+def _run_narration(api, payload: Dict, attempt: int):
+    asyncio.run(api.run_narrated_pptx_task(**payload, raise_transient=True))
+
+
+def _abandon_narration(api, payload: Dict, error: str):
+    api.state.transition_ppt_job(payload["job_id"], ("processing",), {"status": "failed", "message": f"Error: {error}"})
+
+
+def _run_batch(api, payload: Dict, attempt: int):
+    asyncio.run(api.run_batch_generation_task(**payload))
+
+
+# kind -> (run(api, payload, attempt), abandon(api, payload, error) once retries are used up)
+HANDLERS: Dict[str, Tuple[Callable, Callable]] = {
+    "parse": (_run_parse, _abandon_parse),
+    "narrate": (_run_narration, _abandon_narration),
+    # Same failure bookkeeping as narration: both live in the job store
+    "batch": (_run_batch, _abandon_narration),
+}
+
+
+class _LeaseKeeper(threading.Thread):
+    """Renews a job lease until the job finishes"""
+
+    def __init__(self, queue, job_id: int, owner: str):
+        super().__init__(name=f"lease-{job_id}", daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.owner = owner
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.queue.lease_seconds / 3):
+            if not self.queue.renew(self.job_id, self.owner):
+                print(f"[Worker] Lost lease on job {self.job_id}")
+                return
+
+
+def run_job(api, job: Dict, owner: str):
+    """Run one leased job and record the outcome in the queue"""
+    queue = api.job_queue
+    job_id, kind, payload = job["job_id"], job["kind"], job["payload"]
+    run, abandon = HANDLERS.get(kind, (None, None))
+    if run is None:
+        queue.fail(job_id, owner, f"Unknown job kind: {kind}", retry=False)
+        return
+    if job["attempts"] > job["max_attempts"]:
+        # The previous worker died mid-job on the last attempt
+        error = "Job was interrupted too many times"
+        print(f"[Worker] Giving up {kind} job {job_id}: {error}")
+        abandon(api, payload, error)
+        queue.fail(job_id, owner, error, retry=False)
+        return
+
+    print(f"[Worker {owner}] Running {kind} job {job_id} (attempt {job['attempts']}/{job['max_attempts']})")
+    keeper = _LeaseKeeper(queue, job_id, owner)
+    keeper.start()
+    try:
+        run(api, payload, job["attempts"])
+    except Exception as exc:
+        print(f"[Worker {owner}] {kind} job {job_id} failed:")
+        print(traceback.format_exc())
+        if queue.fail(job_id, owner, str(exc)) == "failed":
+            abandon(api, payload, str(exc))
+    else:
+        queue.complete(job_id, owner)
+    finally:
+        keeper.done.set()
+
+
+def run_worker(index: int = 0, parent_pid: Optional[int] = None):
+    """Worker process main loop (exits on SIGTERM/SIGINT or when the parent API process is gone)"""
+    from app import main as api  # services and task functions, shared with the API
+
+    if api.job_queue is None:
+        raise SystemExit("[Worker] Job queue disabled (JOB_BACKEND=inline or STATE_BACKEND=memory)")
+    api.init_script_generator()
+    # A worker runs one job at a time, so one LibreOffice instance is enough. Slots after the
+    # API's own pool keep its soffice port and user profile apart from every other process.
+    api.ppt_converter = api.create_ppt_converter(workers=1, first_slot=settings.LEGACY_CONVERTER_WORKERS + index)
+    owner = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    print(f"[Worker {owner}] Started")
+    while not stop.is_set():
+        if parent_pid is not None and os.getppid() != parent_pid:
+            break
+        job = api.job_queue.lease(owner)
+        if job is None:
+            stop.wait(settings.JOB_POLL_INTERVAL)
+            continue
+        run_job(api, job, owner)
+    api.ppt_parser.shutdown()
+    api.ppt_converter.shutdown()
+    print(f"[Worker {owner}] Stopped")
+
+
+def start_workers(count: int, first_index: int = 0) -> List[multiprocessing.Process]:
+    """Spawn worker processes owned by the current process"""
+    # Not daemonic: workers use their own process pool for large decks
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for index in range(first_index, first_index + count):
+        process = context.Process(target=run_worker, args=(index, os.getpid()), name=f"job-worker-{index}")
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def stop_workers(processes: List[multiprocessing.Process], timeout: float = 30):
+    """Ask workers to finish their current job; kill the ones that do not stop in time"""
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            # Its job's lease expires and another worker retries it
+            process.kill()
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--workers", type=int, default=max(1, settings.JOB_WORKERS), help="number of worker processes")
+    parser.add_argument(
+        "--first-index", type=int, default=0,
+        help="index of the first worker; give each launcher on a host its own range (e.g. JOB_WORKERS when the API also starts workers)",
+    )
+    args = parser.parse_args()
+
+    if args.workers == 1:
+        run_worker(args.first_index)
+        return
+    processes = start_workers(args.workers, args.first_index)
+    stopping = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stopping.set())
+    while not stopping.is_set() and any(p.is_alive() for p in processes):
+        stopping.wait(1)
+    stop_workers(processes)
+
+
+if __name__ == "__main__":
+    main()
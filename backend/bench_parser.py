@@ -0,0 +1,300 @@
+"""
+Benchmark PPTParser over a corpus of decks.
+
+Reports per-file wall time, a phase split (zip load / shape walk / notes),
+parse memory and slides per second, writes the results as JSON and
+fails when a stored baseline is exceeded by more than the threshold.
+
+Usage (from backend/):
+    python bench_parser.py uploads --engine xml --output bench.json
+    python bench_parser.py uploads --save-baseline bench_baseline.json
+    python bench_parser.py uploads --baseline bench_baseline.json --threshold 0.25
+
+Parse memory is how far parsing the deck once raises the peak resident set
+size of a fresh process above its peak after imports, so lxml/libxml2
+allocations are included (tracemalloc only sees the Python heap) and the
+interpreter baseline is not. With --parallel-min-slides the pool's worker
+processes are not included. On Windows this needs psutil; without it the
+memory metric is skipped.
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lxml import etree
+from pptx import Presentation
+
+from app.services.ppt_parser import PPTParser
+from app.services.ppt_xml_reader import XmlSlidePackage
+
+# Metrics compared against the baseline (higher is worse)
+REGRESSION_METRICS = ("wall_time", "parse_rss")
+
+
+def _proc_status_kb(field: str) -> Optional[int]:
+    """A VmRSS/VmHWM value from /proc/self/status (Linux), in kilobytes"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> Optional[int]:
+    """
+    Start a new peak RSS measurement and return the baseline in bytes.
+
+    ru_maxrss survives exec on Linux, so a child started from a large parent
+    inherits the parent's peak. Where the kernel allows it the high-water
+    mark is reset instead and the baseline is the current RSS.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        rss = _proc_status_kb("VmRSS")
+        if rss is not None:
+            return rss * 1024
+    except OSError:
+        pass
+    return current_peak_rss()
+
+
+def current_peak_rss() -> Optional[int]:
+    """Peak resident set size of this process in bytes (None without resource or psutil)"""
+    hwm = _proc_status_kb("VmHWM")
+    if hwm is not None:
+        return hwm * 1024
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure_parse_rss(path: Path, engine: str, parallel_min_slides: int) -> Optional[int]:
+    """Parse the deck once in a fresh interpreter and return how much it raised the peak RSS"""
+    output = subprocess.run(
+        [sys.executable, __file__, str(path), "--engine", engine,
+         "--parallel-min-slides", str(parallel_min_slides), "--measure-rss"],
+        check=True, capture_output=True, text=True, cwd=Path(__file__).parent,
+    ).stdout
+    value = output.strip().splitlines()[-1]
+    return None if value == "none" else int(value)
+
+
+def format_mb(value: Optional[int]) -> str:
+    return "   n/a" if value is None else f"{value / 1024 / 1024:6.1f}"
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def collect_corpus(corpus: Path) -> List[Path]:
+    """Unique decks in the corpus (identical copies are benchmarked once)"""
+    seen = set()
+    decks = []
+    for path in sorted(corpus.glob("*.pptx")):
+        digest = file_digest(path)
+        if digest not in seen:
+            seen.add(digest)
+            decks.append(path)
+    return decks
+
+
+def phases_xml(path: Path) -> Dict[str, float]:
+    """Phase split for the zip/lxml engine"""
+    t0 = time.perf_counter()
+    with XmlSlidePackage(str(path)) as package:
+        threshold = package.slide_height * 0.25
+        partnames = package.slide_partnames()
+        roots = [(p, etree.fromstring(package.read_part(p))) for p in partnames]
+        t1 = time.perf_counter()
+        visible = [p for p, root in roots if not package.is_hidden(root)]
+        for partname, root in roots:
+            if not package.is_hidden(root):
+                package.extract_slide_root(partname, root, threshold)
+        t2 = time.perf_counter()
+        for partname in visible:
+            package.extract_notes(partname)
+        t3 = time.perf_counter()
+    return {"zip_load": t1 - t0, "shape_walk": t2 - t1, "notes": t3 - t2}
+
+
+def phases_pptx(path: Path, parse_time: float) -> Dict[str, float]:
+    """Phase split for the python-pptx engine (shape walk is the remainder)"""
+    t0 = time.perf_counter()
+    prs = Presentation(str(path))
+    t1 = time.perf_counter()
+    for slide in prs.slides:
+        if slide.element.get('show') in ('0', 'false'):
+            continue
+        try:
+            if slide.has_notes_slide:
+                slide.notes_slide.notes_text_frame.text.strip()
+        except Exception:
+            pass
+    t2 = time.perf_counter()
+    load, notes = t1 - t0, t2 - t1
+    return {"zip_load": load, "shape_walk": max(0.0, parse_time - load - notes), "notes": notes}
+
+
+def bench_file(parser: PPTParser, path: Path, repeat: int, measure_rss: bool) -> Dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        times = []
+        slides = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            slides = parser.parse(str(path))
+            times.append(time.perf_counter() - t0)
+        wall_time = min(times)
+
+        if parser.engine == "xml":
+            phases = phases_xml(path)
+        else:
+            phases = phases_pptx(path, wall_time)
+
+    # Separate process, so the peak reflects this deck alone
+    parse_rss = measure_parse_rss(path, parser.engine, parser.parallel_min_slides) if measure_rss else None
+
+    return {
+        "file": path.name,
+        "size_bytes": path.stat().st_size,
+        "slides": len(slides),
+        "wall_time": wall_time,
+        "wall_time_median": statistics.median(times),
+        "phases": phases,
+        "parse_rss": parse_rss,
+        "slides_per_sec": len(slides) / wall_time if wall_time > 0 else 0.0,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return a message for every metric that regressed beyond the threshold"""
+    previous = {f["file"]: f for f in baseline.get("files", [])}
+    regressions = []
+    for current in results["files"]:
+        base = previous.get(current["file"])
+        if not base:
+            continue
+        for metric in REGRESSION_METRICS:
+            if base.get(metric) and current.get(metric) and current[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{current['file']}: {metric} {current[metric]:.4g} > baseline {base[metric]:.4g} "
+                    f"(+{(current[metric] / base[metric] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("corpus", type=Path, help="Directory containing .pptx decks")
+    ap.add_argument("--measure-rss", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--engine", choices=PPTParser.ENGINES, default="xml")
+    ap.add_argument("--repeat", type=int, default=3, help="Timed runs per file (best is reported)")
+    ap.add_argument("--parallel-min-slides", type=int, default=0, help="Parallel threshold (0 = serial)")
+    ap.add_argument("--output", type=Path, help="Write results JSON here")
+    ap.add_argument("--baseline", type=Path, help="Compare against this results JSON")
+    ap.add_argument("--threshold", type=float, default=0.2, help="Allowed regression ratio (0.2 = +20%%)")
+    ap.add_argument("--save-baseline", type=Path, help="Store these results as the new baseline")
+    args = ap.parse_args(argv)
+
+    if args.measure_rss:
+        # Child mode of measure_peak_rss(): corpus is a single deck
+        parser = PPTParser(engine=args.engine, parallel_min_slides=args.parallel_min_slides)
+        # Everything is imported by now; only growth beyond this point is the parser's
+        baseline = reset_peak_rss()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                parser.parse(str(args.corpus))
+        finally:
+            parser.shutdown()
+        peak = current_peak_rss()
+        print("none" if peak is None else max(peak - baseline, 0))
+        return 0
+
+    decks = collect_corpus(args.corpus)
+    if not decks:
+        print(f"No .pptx files found in {args.corpus}")
+        return 2
+
+    measure_rss = current_peak_rss() is not None
+    if not measure_rss:
+        print("psutil is not installed; parse memory is not measured (pip install psutil)")
+
+    parser = PPTParser(engine=args.engine, parallel_min_slides=args.parallel_min_slides)
+    files = []
+    try:
+        for path in decks:
+            result = bench_file(parser, path, args.repeat, measure_rss)
+            files.append(result)
+            ph = result["phases"]
+            print(
+                f"{result['file'][:40]:40} {result['slides']:5d} slides  {result['wall_time'] * 1000:8.1f} ms  "
+                f"load {ph['zip_load'] * 1000:7.1f}  walk {ph['shape_walk'] * 1000:7.1f}  "
+                f"notes {ph['notes'] * 1000:7.1f}  parse RSS {format_mb(result['parse_rss'])} MB  "
+                f"{result['slides_per_sec']:8.0f} slides/s"
+            )
+    finally:
+        parser.shutdown()
+
+    total_slides = sum(f["slides"] for f in files)
+    total_time = sum(f["wall_time"] for f in files)
+    results = {
+        "engine": args.engine,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "files": files,
+        "totals": {
+            "files": len(files),
+            "slides": total_slides,
+            "wall_time": total_time,
+            "slides_per_sec": total_slides / total_time if total_time > 0 else 0.0,
+            "max_parse_rss": max((f["parse_rss"] for f in files if f["parse_rss"] is not None), default=None),
+        },
+    }
+    print(
+        f"Total: {len(files)} files, {total_slides} slides, {total_time * 1000:.1f} ms, "
+        f"{results['totals']['slides_per_sec']:.0f} slides/s"
+    )
+
+    for target in (args.output, args.save_baseline):
+        if target:
+            target.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"REGRESSION (threshold +{args.threshold * 100:.0f}%):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""Which ScriptGenerator serves a request when only some providers are configured"""
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+import app.main as main
+from app.services.script import MockProvider, ScriptGenerator
+
+PROMPTS_DIR = Path(__file__).resolve().parents[1] / "prompts"
+
+
+@pytest.fixture
+def mock_only(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    generator = ScriptGenerator(
+        prompts_dir=str(PROMPTS_DIR), providers={"mock": MockProvider(latency=0, tokens_per_second=0)}
+    )
+    monkeypatch.setattr(main, "script_generator", generator)
+    return generator
+
+
+def test_mock_requests_use_the_global_generator(mock_only):
+    assert main.ensure_generator(None, "mock") is mock_only
+
+
+def test_translation_uses_the_request_key_instead_of_the_mock(mock_only):
+    generator = main.ensure_generator("user-key")
+    assert generator is not mock_only
+    assert generator.translator is generator.providers["gemini"]
+
+
+def test_translation_without_gemini_or_key_is_rejected(mock_only):
+    with pytest.raises(HTTPException) as error:
+        main.ensure_generator(None)
+    assert error.value.status_code == 400
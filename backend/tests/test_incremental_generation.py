@@ -0,0 +1,108 @@
+"""Incremental regeneration after slides were moved, inserted, edited or deleted"""
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app.models.slide_record import SlideRecord
+from app.services.script import MockProvider, PromptPlanner, ScriptGenerator
+
+PROMPTS_DIR = Path(__file__).resolve().parents[1] / "prompts"
+
+
+def deck(*titles):
+    return [SlideRecord(number, title, (f"{title} detail",)) for number, title in enumerate(titles, 1)]
+
+
+@pytest.fixture
+def mock():
+    return MockProvider(latency=0, tokens_per_second=0)
+
+
+def make_generator(mock, **planner_options):
+    return ScriptGenerator(
+        prompts_dir=str(PROMPTS_DIR), providers={"mock": mock}, planner=PromptPlanner(**planner_options)
+    )
+
+
+def regenerate(generator, previous_slides, slides, **options):
+    """Generate the previous deck in full, then regenerate the new one from it"""
+    previous = generator.generate_full_script(previous_slides, provider="mock", language="English")
+    fingerprints = [slide.content_fingerprint() for slide in previous_slides]
+    result = asyncio.run(generator.regenerate_changed_async(
+        slides, previous, fingerprints, provider="mock", language="English", **options
+    ))
+    return previous, result
+
+
+def calls(provider):
+    return provider.scheduler.stats()["calls"]
+
+
+def scripts_by_title(result, slides):
+    return {slide.title: item["script"] for slide, item in zip(slides, result["slide_scripts"])}
+
+
+def test_moved_inserted_and_deleted_slides(mock):
+    generator = make_generator(mock)
+    before = deck("Intro", "Market", "Plan", "Risks", "Budget", "Summary")
+    # Plan and Market swapped, Risks deleted, Hiring inserted
+    after = deck("Intro", "Plan", "Market", "Hiring", "Budget", "Summary")
+    previous, result = regenerate(generator, before, after)
+
+    old = scripts_by_title(previous, before)
+    new = scripts_by_title(result, after)
+    for title in ("Intro", "Plan", "Market", "Budget", "Summary"):
+        assert new[title] == old[title]
+    assert "Hiring" in new["Hiring"]
+    assert [item["slide_no"] for item in result["slide_scripts"]] == ["1", "2", "3", "4", "5", "6"]
+    assert result["opening"] == previous["opening"]
+    assert result["metadata"]["regenerated_slides"] == [4]
+    assert result["metadata"]["reused_slides"] == 5
+    assert "--- Slide 4 ---" in result["full_script"]
+
+
+def test_edited_slide_is_regenerated(mock):
+    generator = make_generator(mock)
+    before = deck("Intro", "Market", "Plan", "Summary")
+    after = deck("Intro", "Market", "Plan", "Summary")
+    after[1] = SlideRecord(2, "Market", ("New market numbers",))
+    previous, result = regenerate(generator, before, after)
+
+    assert result["metadata"]["regenerated_slides"] == [2]
+    assert result["slide_scripts"][0]["script"] == previous["slide_scripts"][0]["script"]
+
+
+def test_unchanged_deck_makes_no_call(mock):
+    generator = make_generator(mock)
+    slides = deck("Intro", "Market", "Plan")
+    previous = generator.generate_full_script(slides, provider="mock", language="English")
+    before = calls(mock)
+    result = asyncio.run(generator.regenerate_changed_async(
+        slides, previous, [slide.content_fingerprint() for slide in slides], provider="mock", language="English"
+    ))
+    assert calls(mock) == before
+    assert result["metadata"]["regenerated_slides"] == []
+    assert result["full_script"].strip() == previous["full_script"].strip()
+
+
+def test_too_many_changes_fall_back_to_full_generation(mock):
+    generator = make_generator(mock)
+    before = deck("Intro", "Market", "Plan", "Summary")
+    after = deck("Intro", "Hiring", "Office", "Travel")
+    _, result = regenerate(generator, before, after, max_changed_ratio=0.5)
+    assert result is None
+
+
+def test_changed_slides_are_split_by_the_planner(mock):
+    generator = make_generator(mock, max_window=2)
+    before = deck(*(f"Topic {i}" for i in range(8)))
+    after = deck(*(f"Topic {i}" for i in range(5)), "New A", "New B", "New C")
+    previous = generator.generate_full_script(before, provider="mock", language="English")
+    start = calls(mock)
+    result = asyncio.run(generator.regenerate_changed_async(
+        after, previous, [slide.content_fingerprint() for slide in before], provider="mock", language="English"
+    ))
+    # Three changed slides in windows of at most two
+    assert calls(mock) - start == 2
+    assert result["metadata"]["regenerated_slides"] == [6, 7, 8]
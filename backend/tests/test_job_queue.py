@@ -0,0 +1,73 @@
+"""JobQueue leases, expiry and retries"""
+import time
+
+import pytest
+
+from app.utils.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.db", lease_seconds=0.2, max_attempts=2, retry_delay=0)
+
+
+def test_leased_job_is_not_handed_out_twice(queue):
+    job_id = queue.enqueue("parse", {"file_id": "a"})
+    job = queue.lease("worker-1")
+    assert job["job_id"] == job_id
+    assert job["payload"] == {"file_id": "a"}
+    assert job["attempts"] == 1
+    assert queue.lease("worker-2") is None
+    assert queue.complete(job_id, "worker-1")
+    assert queue.stats()["done"] == 1
+
+
+def test_expired_lease_is_taken_over(queue):
+    job_id = queue.enqueue("parse", {})
+    queue.lease("worker-1")
+    time.sleep(0.3)
+    job = queue.lease("worker-2")
+    assert job["job_id"] == job_id
+    assert job["attempts"] == 2
+    # The first worker lost the job and can no longer finish or renew it
+    assert not queue.renew(job_id, "worker-1")
+    assert not queue.complete(job_id, "worker-1")
+    assert queue.fail(job_id, "worker-1", "late") == ""
+    assert queue.complete(job_id, "worker-2")
+
+
+def test_renew_keeps_the_lease(queue):
+    job_id = queue.enqueue("parse", {})
+    queue.lease("worker-1")
+    for _ in range(3):
+        time.sleep(0.1)
+        assert queue.renew(job_id, "worker-1")
+    assert queue.lease("worker-2") is None
+
+
+def test_failed_attempt_is_retried_until_max_attempts(queue):
+    job_id = queue.enqueue("parse", {})
+    queue.lease("worker-1")
+    assert queue.fail(job_id, "worker-1", "timeout") == "queued"
+    job = queue.lease("worker-2")
+    assert job["job_id"] == job_id and job["attempts"] == 2
+    assert queue.fail(job_id, "worker-2", "timeout") == "failed"
+    assert queue.lease("worker-3") is None
+    assert queue.stats()["failed"] == 1
+
+
+def test_permanent_failure_is_not_retried(queue):
+    job_id = queue.enqueue("parse", {})
+    queue.lease("worker-1")
+    assert queue.fail(job_id, "worker-1", "bad zip", retry=False) == "failed"
+    assert queue.lease("worker-2") is None
+
+
+def test_retry_waits_for_backoff(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.db", max_attempts=3, retry_delay=0.2)
+    job_id = queue.enqueue("parse", {})
+    queue.lease("worker-1")
+    queue.fail(job_id, "worker-1", "timeout")
+    assert queue.lease("worker-2") is None
+    time.sleep(0.3)
+    assert queue.lease("worker-2")["job_id"] == job_id
@@ -0,0 +1,88 @@
+"""QuotaScheduler budgets, 429 backoff and the shared SQLite budget"""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.services.script.quota_scheduler import QuotaExceededError, QuotaScheduler, retry_after_hint
+
+
+def test_retry_after_hint_is_read_from_the_error():
+    assert retry_after_hint(QuotaExceededError("429", retry_after=3)) == 3
+    assert retry_after_hint(Exception("Please retry in 1.5s")) == 1.5
+    assert retry_after_hint(Exception("Please retry in 250ms")) == 0.25
+    assert retry_after_hint(Exception("retry_delay { seconds: 12 }")) == 12
+    assert retry_after_hint(Exception("quota exceeded")) is None
+
+
+def test_throttled_call_is_retried_and_halves_the_window():
+    scheduler = QuotaScheduler(max_concurrency=8, max_retries=2, base_delay=0.01, max_delay=0.05)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise QuotaExceededError("429")
+        return "ok"
+
+    assert scheduler.call(call) == "ok"
+    stats = scheduler.stats()
+    assert stats["throttled"] == 1 and stats["retries"] == 1
+    assert stats["concurrency_limit"] == 4
+
+
+def test_retries_are_bounded():
+    scheduler = QuotaScheduler(max_retries=1, base_delay=0.01, max_delay=0.05)
+
+    def call():
+        raise QuotaExceededError("429")
+
+    with pytest.raises(QuotaExceededError):
+        scheduler.call(call)
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_processes_sharing_a_budget_draw_from_one_quota(tmp_path):
+    path = str(tmp_path / "quota.db")
+    first = QuotaScheduler(requests_per_minute=60, shared_path=path)
+    second = QuotaScheduler(requests_per_minute=60, shared_path=path)
+    for _ in range(30):
+        first.call(lambda: None)
+        second.call(lambda: None)
+    # The 61st call waits for the bucket to refill (one request per second)
+    started = time.monotonic()
+    first.call(lambda: None)
+    assert time.monotonic() - started >= 0.5
+    assert first.stats()["shared_budget"]
+
+
+def test_server_pause_applies_to_every_sharing_scheduler(tmp_path):
+    path = str(tmp_path / "quota.db")
+    first = QuotaScheduler(shared_path=path)
+    second = QuotaScheduler(shared_path=path)
+    first._budget.pause(0.3)
+    assert second.stats()["paused_for_sec"] > 0
+    started = time.monotonic()
+    second.call(lambda: None)
+    assert time.monotonic() - started >= 0.2
+
+
+def test_waiting_on_the_shared_database_does_not_block_other_threads(tmp_path):
+    path = str(tmp_path / "quota.db")
+    scheduler = QuotaScheduler(requests_per_minute=60, shared_path=path)
+    other_process = sqlite3.connect(path, isolation_level=None)
+    other_process.execute("BEGIN IMMEDIATE")
+    caller = threading.Thread(target=scheduler.call, args=(lambda: None,))
+    caller.start()
+    time.sleep(0.1)
+    # The caller is stuck in the budget's write transaction, not holding the scheduler lock
+    started = time.monotonic()
+    assert scheduler._cond.acquire(timeout=0.5)
+    scheduler._cond.release()
+    assert scheduler.stats()["in_flight"] == 1
+    assert time.monotonic() - started < 0.5
+    other_process.execute("COMMIT")
+    caller.join(timeout=5)
+    assert not caller.is_alive()
+    assert scheduler.stats()["calls"] == 1
@@ -0,0 +1,83 @@
+"""Splitting scripts into sections and reassembling translated sections"""
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app.models.slide_record import SlideRecord
+from app.services.script import MockProvider, ScriptGenerator
+from app.services.script.parser import ScriptParser
+from app.utils.translation_memory import TranslationMemory
+
+PROMPTS_DIR = Path(__file__).resolve().parents[1] / "prompts"
+
+SLIDES = [SlideRecord(1, "Intro"), SlideRecord(2, "Market"), SlideRecord(3, "Summary")]
+SCRIPT = ScriptParser.compose("Welcome, everyone.\nToday is short.", [
+    ScriptParser.slide_item(1, SLIDES[0], "We start here."),
+    ScriptParser.slide_item(2, SLIDES[1], "The market grew.\n\nIt grew twice."),
+    ScriptParser.slide_item(3, SLIDES[2], "Thank you."),
+])
+
+
+@pytest.fixture
+def mock():
+    return MockProvider(latency=0, tokens_per_second=0)
+
+
+def make_generator(mock, memory=None):
+    return ScriptGenerator(prompts_dir=str(PROMPTS_DIR), providers={"mock": mock}, translation_memory=memory)
+
+
+def test_split_sections_keeps_markers_and_bodies():
+    sections = ScriptParser.split_sections(SCRIPT)
+    assert sections == [
+        ("=== Opening ===", "Welcome, everyone.\nToday is short."),
+        ("--- Slide 1 ---", "We start here."),
+        ("--- Slide 2 ---", "The market grew.\n\nIt grew twice."),
+        ("--- Slide 3 ---", "Thank you."),
+    ]
+    assert "\n\n".join(f"{marker}\n{body}" for marker, body in sections) == SCRIPT
+
+
+def test_split_sections_keeps_text_before_the_first_marker():
+    sections = ScriptParser.split_sections("Preamble\n--- Slide 1 ---\nBody")
+    assert sections == [("", "Preamble"), ("--- Slide 1 ---", "Body")]
+
+
+def test_untranslated_sections_round_trip(mock):
+    generator = make_generator(mock)
+    sections = ScriptParser.split_sections(SCRIPT)
+    result = generator._translated_result(sections, {}, {}, "English", SLIDES)
+    original = ScriptParser.parse_script(SCRIPT, SLIDES)
+    assert result["opening"] == original["opening"]
+    assert result["slide_scripts"] == original["slide_scripts"]
+    assert result["full_script"] == SCRIPT
+
+
+def test_translated_sections_stay_under_their_markers(mock):
+    generator = make_generator(mock)
+    sections = ScriptParser.split_sections(SCRIPT)
+    fresh = {"We start here.": "Wir beginnen hier."}
+    known = {"Thank you.": "Danke."}
+    result = generator._translated_result(sections, known, fresh, "German", None)
+    assert [item["slide_no"] for item in result["slide_scripts"]] == ["1", "2", "3"]
+    assert [item["script"] for item in result["slide_scripts"]] == [
+        "Wir beginnen hier.", "The market grew.\n\nIt grew twice.", "Danke."
+    ]
+    assert result["metadata"]["translation"]["from_memory"] == 1
+    assert result["metadata"]["translation"]["translated"] == 1
+
+
+def test_translation_memory_reuses_unchanged_sections(mock, tmp_path):
+    generator = make_generator(mock, TranslationMemory(tmp_path / "tm.db"))
+    first = asyncio.run(generator.translate_and_parse_async(SCRIPT, "German", slides=SLIDES))
+    assert first["metadata"]["translation"]["translated"] == 4
+    assert first["slide_scripts"][0]["script"] == "[German] We start here."
+
+    edited = SCRIPT.replace("Thank you.", "Thanks for listening.")
+    calls = mock.scheduler.stats()["calls"]
+    second = generator.translate_and_parse(edited, "German", slides=SLIDES)
+    assert mock.scheduler.stats()["calls"] - calls == 1
+    assert second["metadata"]["translation"]["from_memory"] == 3
+    assert second["slide_scripts"][2]["script"] == "[German] Thanks for listening."
+    assert second["opening"] == first["opening"]
@@ -0,0 +1,99 @@
+"""SingleFlight coalescing, error sharing and leader cancellation"""
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+def test_identical_calls_share_one_run():
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+        return flights, calls, results
+
+    flights, calls, results = asyncio.run(scenario())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flights.stats() == {"leaders": 1, "followers": 4, "in_flight": 0}
+
+
+def test_followers_receive_the_leaders_exception():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            raise ValueError("quota")
+
+        return await asyncio.gather(*(flights.do("key", work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_follower_takes_over_when_the_leader_is_cancelled():
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return len(calls)
+
+        leader = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        result = await follower
+        return flights, calls, result
+
+    flights, calls, result = asyncio.run(scenario())
+    # The follower ran the call itself as the new leader
+    assert result == 2
+    assert len(calls) == 2
+    assert flights.stats()["leaders"] == 2
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_cancelled_follower_does_not_cancel_the_leader():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(scenario()) == "result"
+
+
+def test_leader_leaving_without_result_cancels_the_flight():
+    async def scenario():
+        flights = SingleFlight()
+        with flights.lead("key") as future:
+            pass
+        return flights, future
+
+    flights, future = asyncio.run(scenario())
+    assert future.cancelled()
+    assert flights.running("key") is None
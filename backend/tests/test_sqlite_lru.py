@@ -0,0 +1,56 @@
+"""Running size total and LRU eviction of the SQLite stores"""
+import os
+import sqlite3
+
+from app.utils.llm_cache import LLMCache
+from app.utils.translation_memory import TranslationMemory
+
+
+def stored_size(db_path, table):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+
+
+def noise(seed: int, length: int = 400) -> str:
+    """Text zlib cannot shrink much"""
+    return os.urandom(length).hex() + str(seed)
+
+
+def test_running_total_follows_inserts_replacements_and_evictions(tmp_path):
+    path = tmp_path / "cache.db"
+    cache = LLMCache(path, max_bytes=10_000)
+    for i in range(40):
+        cache.set("model", f"prompt {i}", noise(i))
+    cache.set("model", "prompt 39", "short")
+    stats = cache.stats()
+    assert stats["evictions"] > 0
+    assert stats["size_bytes"] == stored_size(path, "responses") <= 10_000
+    assert cache.get("model", "prompt 39") == "short"
+    assert cache.get("model", "prompt 0") is None
+
+
+def test_recently_used_entries_survive_eviction(tmp_path):
+    cache = LLMCache(tmp_path / "cache.db", max_bytes=4_000)
+    cache.set("model", "keep", noise(0))
+    for i in range(1, 20):
+        assert cache.get("model", "keep") is not None
+        cache.set("model", f"prompt {i}", noise(i))
+    assert cache.get("model", "keep") is not None
+
+
+def test_total_is_shared_between_instances(tmp_path):
+    path = tmp_path / "tm.db"
+    first = TranslationMemory(path, max_bytes=1_000_000)
+    second = TranslationMemory(path, max_bytes=1_000_000)
+    first.set_many({"a": noise(1), "b": noise(2)}, "German")
+    second.set_many({"a": noise(3), "c": noise(4)}, "German")
+    assert first.stats()["size_bytes"] == second.stats()["size_bytes"] == stored_size(path, "translations")
+    assert first.stats()["entries"] == 3
+
+
+def test_existing_store_is_summed_once(tmp_path):
+    path = tmp_path / "cache.db"
+    LLMCache(path).set("model", "prompt", noise(0))
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP TABLE lru_totals")
+    assert LLMCache(path).stats()["size_bytes"] == stored_size(path, "responses") > 0
@@ -0,0 +1,39 @@
+"""In-process StateManager eviction"""
+import time
+
+from app.utils.state_manager import StateManager
+
+
+def add_parsed_file(state, file_id):
+    state.add_uploaded_file(file_id, {"filename": f"{file_id}.pptx", "path": f"{file_id}.pptx", "status": "completed"})
+    state.set_parse_status(file_id, {"status": "completed", "progress": 100})
+
+
+def test_parse_status_lives_as_long_as_its_file():
+    state = StateManager(ttl=0.2)
+    add_parsed_file(state, "deck")
+    # The file stays in use; its status must not expire on its own
+    for _ in range(4):
+        time.sleep(0.1)
+        assert state.get_uploaded_file("deck")
+    assert state.get_parse_status("deck")["status"] == "completed"
+
+    time.sleep(0.3)
+    assert state.get_uploaded_file("deck") is None
+    assert state.get_parse_status("deck") is None
+
+
+def test_deleting_a_file_drops_its_status():
+    state = StateManager()
+    add_parsed_file(state, "deck")
+    state.delete_uploaded_file("deck")
+    assert state.get_parse_status("deck") is None
+
+
+def test_evicting_a_file_by_count_drops_its_status():
+    state = StateManager(max_files=1)
+    add_parsed_file(state, "old")
+    add_parsed_file(state, "new")
+    assert state.get_uploaded_file("old") is None
+    assert state.get_parse_status("old") is None
+    assert state.get_parse_status("new")["status"] == "completed"
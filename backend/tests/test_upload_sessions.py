@@ -0,0 +1,111 @@
+"""Chunked upload sessions shared by several processes"""
+import hashlib
+
+import pytest
+
+from app.utils.content_store import ContentStore
+from app.utils.upload_sessions import UploadError, UploadSessionManager
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentStore(tmp_path / "store")
+
+
+def manager(store):
+    return UploadSessionManager(store, max_size=len(DATA) * 2, chunk_size=1024)
+
+
+def upload(sessions, upload_id, chunks):
+    offset = 0
+    for chunk in chunks:
+        offset = sessions[offset // 1024 % len(sessions)].append(upload_id, offset, chunk)
+    return offset
+
+
+def chunks_of(data, size=1024):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_chunks_alternating_between_processes_give_the_right_hash(store):
+    first, second = manager(store), manager(store)
+    digest = hashlib.sha256(DATA).hexdigest()
+    upload_id = first.create("deck.pptx", len(DATA), sha256=digest)["upload_id"]
+    assert upload([first, second], upload_id, chunks_of(DATA)) == len(DATA)
+    assert second.status(upload_id)["received_bytes"] == len(DATA)
+    session, content_hash, blob_path, already_stored = first.complete(upload_id)
+    assert content_hash == digest
+    assert blob_path.read_bytes() == DATA
+    assert not already_stored
+    with pytest.raises(UploadError) as error:
+        second.status(upload_id)
+    assert error.value.status_code == 404
+
+
+def test_offset_must_match_the_received_bytes(store):
+    sessions = manager(store)
+    upload_id = sessions.create("deck.pptx", len(DATA))["upload_id"]
+    sessions.append(upload_id, 0, DATA[:1024])
+    with pytest.raises(UploadError) as error:
+        sessions.append(upload_id, 0, DATA[:1024])
+    assert error.value.status_code == 409
+
+
+def test_oversized_chunks_and_overflows_are_rejected(store):
+    sessions = manager(store)
+    upload_id = sessions.create("deck.pptx", 1500)["upload_id"]
+    with pytest.raises(UploadError) as error:
+        sessions.append(upload_id, 0, DATA[:2048])
+    assert error.value.status_code == 413
+    sessions.append(upload_id, 0, DATA[:1024])
+    with pytest.raises(UploadError) as error:
+        sessions.append(upload_id, 1024, DATA[:1024])
+    assert error.value.status_code == 413
+
+
+def test_checksum_mismatch_discards_the_upload(store):
+    sessions = manager(store)
+    upload_id = sessions.create("deck.pptx", 1024, sha256="0" * 64)["upload_id"]
+    sessions.append(upload_id, 0, DATA[:1024])
+    with pytest.raises(UploadError) as error:
+        sessions.complete(upload_id)
+    assert error.value.status_code == 422
+    assert not list(sessions.root.iterdir())
+
+
+def test_unknown_ids_are_rejected_without_touching_disk(store):
+    sessions = manager(store)
+    for upload_id in ("missing", "../escape"):
+        with pytest.raises(UploadError) as error:
+            sessions.status(upload_id)
+        assert error.value.status_code == 404
+    assert not list(sessions.root.iterdir())
+
+
+def test_idle_sessions_expire(store):
+    sessions = manager(store)
+    upload_id = sessions.create("deck.pptx", len(DATA))["upload_id"]
+    sessions.append(upload_id, 0, DATA[:1024])
+    assert sessions.expire(max_age=3600) == (0, 0)
+    assert sessions.expire(max_age=-1) == (1, 1024)
+    assert not list(sessions.root.iterdir())
+
+
+def test_sessions_finished_by_another_process_during_expiry_are_skipped(store, monkeypatch):
+    sessions, other = manager(store), manager(store)
+    finished = sessions.create("deck.pptx", len(DATA))["upload_id"]
+    idle = sessions.create("deck.pptx", len(DATA))["upload_id"]
+    sessions.append(idle, 0, DATA[:1024])
+    session_lock = sessions._session_lock
+
+    def abort_first(upload_id):
+        # The other worker aborts `finished` between the glob and the lock
+        if upload_id == finished and other._meta_path(finished).exists():
+            other.abort(finished)
+        return session_lock(upload_id)
+
+    monkeypatch.setattr(sessions, "_session_lock", abort_first)
+    assert sessions.expire(max_age=-1) == (1, 1024)
+    assert not list(sessions.root.iterdir())